@@ -0,0 +1,174 @@
+# activos.py
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import time
+
+from flask import request, send_from_directory
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import brotli
+except ImportError:  # opcional: sin el paquete solo se generan variantes .gz
+    brotli = None
+
+EXTENSIONES = ('.css', '.js')
+DIRECTORIO_SALIDA = 'dist'
+MANIFIESTO = 'manifiesto.json'
+ARCHIVO_CANDADO = '.construir.lock'  # una sola construcción a la vez entre procesos
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+# Respuestas dinámicas que vale la pena comprimir al vuelo
+TIPOS_COMPRIMIBLES = ('text/html', 'application/json')
+TAMANO_MINIMO_COMPRESION = 512  # bytes; por debajo la cabecera gzip no compensa
+NIVEL_GZIP_DINAMICO = 5
+
+def _huella(contenido):
+    return hashlib.sha256(contenido).hexdigest()[:12]
+
+def _escribir(ruta, contenido):
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+def _bloquear(archivo):
+    """Espera el bloqueo exclusivo del archivo; se suelta al cerrarlo (o si el proceso muere)"""
+    if fcntl is not None:
+        fcntl.flock(archivo, fcntl.LOCK_EX)
+    else:
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+
+class ActivosEstaticos:
+    """Copias de static/ con el hash del contenido en el nombre.
+
+    Cada .css/.js se publica como dist/<nombre>.<hash>.<ext> junto con sus
+    variantes precomprimidas (.gz y, si está instalado brotli, .br). Como el
+    nombre cambia cuando cambia el contenido, el navegador puede guardarlos
+    un año sin volver a preguntar.
+
+    Cada worker de un servidor WSGI construye al importar app.py; el
+    candado de dist/ hace que lo hagan de a uno, y el que llega después
+    encuentra todo publicado y solo relee los originales.
+    """
+
+    def __init__(self, directorio_static, recargar=False):
+        self.origen = directorio_static
+        self.destino = os.path.join(directorio_static, DIRECTORIO_SALIDA)
+        self.recargar = recargar
+        self.manifiesto = {}
+        self._modificados = {}
+
+    def construir(self):
+        """Genera todos los archivos con huella y borra los que quedaron viejos"""
+        os.makedirs(self.destino, exist_ok=True)
+        with open(os.path.join(self.destino, ARCHIVO_CANDADO), 'a+') as candado:
+            _bloquear(candado)
+            return self._construir()
+
+    def _construir(self):
+        inicio = time.time()
+        manifiesto = {}
+        for carpeta, subcarpetas, archivos in os.walk(self.origen):
+            if os.path.abspath(carpeta) == os.path.abspath(self.destino):
+                subcarpetas[:] = []
+                continue
+            for nombre in archivos:
+                if nombre.endswith(EXTENSIONES):
+                    ruta = os.path.relpath(os.path.join(carpeta, nombre), self.origen).replace(os.sep, '/')
+                    manifiesto[ruta] = self._publicar(ruta)
+
+        # Nunca se borra lo que otro proceso puede estar escribiendo o acaba de publicar
+        vigentes = set(manifiesto.values())
+        for nombre in os.listdir(self.destino):
+            ruta = os.path.join(self.destino, nombre)
+            base = nombre[:-3] if nombre.endswith(('.gz', '.br')) else nombre
+            if base in vigentes or base in (MANIFIESTO, ARCHIVO_CANDADO) or nombre.endswith('.tmp'):
+                continue
+            try:
+                if os.path.getmtime(ruta) < inicio:
+                    os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+        self.manifiesto = manifiesto
+        _escribir(os.path.join(self.destino, MANIFIESTO),
+                  json.dumps(manifiesto, indent=2, sort_keys=True).encode('utf-8'))
+        return manifiesto
+
+    def _publicar(self, ruta):
+        origen = os.path.join(self.origen, ruta)
+        with open(origen, 'rb') as archivo:
+            contenido = archivo.read()
+        self._modificados[ruta] = os.path.getmtime(origen)
+
+        raiz, extension = os.path.splitext(ruta.replace('/', '.'))
+        nombre = f'{raiz}.{_huella(contenido)}{extension}'
+        destino = os.path.join(self.destino, nombre)
+        # Mismo nombre = mismo contenido: lo ya publicado no se vuelve a comprimir
+        if not os.path.exists(destino):
+            _escribir(destino + '.gz', gzip.compress(contenido, 9, mtime=0))
+            if brotli is not None:
+                _escribir(destino + '.br', brotli.compress(contenido, quality=11))
+            _escribir(destino, contenido)
+        return nombre
+
+    def nombre_de(self, ruta):
+        """Nombre con huella de static/<ruta>, o None si no es un activo publicado"""
+        if self.recargar and ruta in self.manifiesto:
+            origen = os.path.join(self.origen, ruta)
+            if os.path.getmtime(origen) != self._modificados.get(ruta):
+                self.manifiesto[ruta] = self._publicar(ruta)
+        return self.manifiesto.get(ruta)
+
+    def enviar(self, nombre):
+        """Sirve un activo con huella eligiendo la variante que acepta el cliente"""
+        tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+        archivo, codificacion = nombre, None
+        for cod, extension in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[cod] and os.path.isfile(os.path.join(self.destino, nombre + extension)):
+                archivo, codificacion = nombre + extension, cod
+                break
+
+        respuesta = send_from_directory(self.destino, archivo, mimetype=tipo)
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.vary.add('Accept-Encoding')
+        respuesta.headers['Cache-Control'] = CACHE_INMUTABLE
+        return respuesta
+
+def comprimir_respuesta(respuesta):
+    """Comprime con gzip las respuestas HTML/JSON si el cliente lo acepta"""
+    if (respuesta.status_code != 200 or respuesta.direct_passthrough or respuesta.is_streamed
+            or respuesta.mimetype not in TIPOS_COMPRIMIBLES
+            or 'Content-Encoding' in respuesta.headers):
+        return respuesta
+
+    respuesta.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return respuesta
+
+    contenido = respuesta.get_data()
+    if len(contenido) < TAMANO_MINIMO_COMPRESION:
+        return respuesta
+
+    respuesta.set_data(gzip.compress(contenido, NIVEL_GZIP_DINAMICO))
+    respuesta.headers['Content-Encoding'] = 'gzip'
+    return respuesta
+
+if __name__ == '__main__':
+    # Publica los activos sin arrancar la aplicación: python activos.py [directorio static]
+    directorio = sys.argv[1] if len(sys.argv) > 1 else 'static'
+    activos = ActivosEstaticos(directorio)
+    manifiesto = activos.construir()
+    for ruta, nombre in sorted(manifiesto.items()):
+        print(f"📦 {ruta} -> {DIRECTORIO_SALIDA}/{nombre}")
+    print(f"✅ {len(manifiesto)} activos publicados" + ("" if brotli else " (sin brotli: solo .gz)"))
@@ -1,45 +1,33 @@
 # actualizar_db.py
+# Los cambios de esquema viven en database.aplicar_migraciones; este script
+# los aplica a la base de la aplicación (o a la de cada sede, ver almacen.py)
+import argparse
 import sqlite3
+import almacen
 
-def get_db_connection():
-    conn = sqlite3.connect('turnos.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def actualizar_base_datos():
-    conn = get_db_connection()
+def actualizar_base_datos(sede_id=None):
+    """Migra la base de una sede, o la de todas si sede_id es None"""
     try:
-        # Agregar columna estado_detallado si no existe
-        conn.execute('''
-            ALTER TABLE doctores ADD COLUMN estado_detallado TEXT DEFAULT "DISPONIBLE"
-        ''')
-        conn.commit()
-        print("✅ Base de datos actualizada: columna 'estado_detallado' agregada")
-        
-        # Actualizar los valores existentes
-        conn.execute('UPDATE doctores SET estado_detallado = "DISPONIBLE" WHERE activo = 1')
-        conn.execute('UPDATE doctores SET estado_detallado = "AUSENTE" WHERE activo = 0')
-        conn.commit()
-        print("✅ Valores actualizados en doctores existentes")
-        
+        sedes = almacen.enrutador()
+        for destino in ([sedes.almacen(sede_id)] if sede_id else sedes.almacenes.values()):
+            destino.preparar()
+            print(f"✅ Base de datos actualizada: {destino!r}")
         return True
         
     except sqlite3.OperationalError as e:
-        if "duplicate column name" in str(e):
-            print("ℹ️ La columna 'estado_detallado' ya existe")
-            return True
-        else:
-            print(f"❌ Error: {e}")
-            return False
+        print(f"❌ Error: {e}")
+        return False
     except Exception as e:
         print(f"❌ Error inesperado: {e}")
         return False
-    finally:
-        conn.close()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Aplica las migraciones pendientes')
+    parser.add_argument('--sede', default=None, help='id de la sede; por defecto todas')
+    args = parser.parse_args()
+
     print("🔄 Actualizando base de datos...")
-    if actualizar_base_datos():
+    if actualizar_base_datos(args.sede):
         print("🎉 Base de datos actualizada exitosamente!")
     else:
-        print("💥 Error al actualizar la base de datos")
\ No newline at end of file
+        print("💥 Error al actualizar la base de datos")
@@ -0,0 +1,264 @@
+# almacen.py
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Ajustes de la base en disco: WAL deja leer mientras se escribe y con
+# synchronous=NORMAL cada commit no espera al fsync del disco
+PRAGMAS_ARCHIVO = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-8000',  # KiB
+    'PRAGMA temp_store=MEMORY',
+)
+
+SEDE_PREDETERMINADA = 'principal'
+ARCHIVO_SEDES = 'sedes.json'
+MAX_HILOS_SEDES = 8
+
+_numeros_memoria = itertools.count(1)
+
+class ErrorSede(Exception):
+    pass
+
+class AlmacenArchivo:
+    """SQLite en un archivo; es el almacenamiento de la aplicación.
+
+    fabrica es la clase de las conexiones que entrega conectar(); perfilado.py
+    la reemplaza por una que mide cada sentencia. doctores son los que
+    init_db siembra en una base nueva (None: los de database.py).
+    """
+
+    tipo = 'archivo'
+
+    def __init__(self, ruta='turnos.db', timeout=30, doctores=None):
+        self.ruta = ruta
+        self.timeout = timeout
+        self.doctores = doctores
+        self.fabrica = sqlite3.Connection
+
+    def conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=self.timeout, factory=self.fabrica)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS_ARCHIVO:
+            conn.execute(pragma)
+        return conn
+
+    def preparar(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        return _preparar(self)
+
+    def cerrar(self):
+        pass
+
+    def __repr__(self):
+        return f'AlmacenArchivo({self.ruta!r})'
+
+class AlmacenMemoria:
+    """SQLite en memoria, compartida por todas las conexiones del proceso.
+
+    Sirve para pruebas y para medir la lógica sin disco de por medio. La base
+    existe mientras el almacén mantenga abierta su conexión ancla; cerrar()
+    la descarta. Con cache compartida dos escrituras simultáneas fallan con
+    "database table is locked" en lugar de esperar, así que es para un solo
+    hilo escritor.
+    """
+
+    tipo = 'memoria'
+
+    def __init__(self, nombre=None, doctores=None):
+        self.nombre = nombre or f'turnero_{os.getpid()}_{next(_numeros_memoria)}'
+        self.uri = f'file:{self.nombre}?mode=memory&cache=shared'
+        self._ancla = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        self.doctores = doctores
+        self.fabrica = sqlite3.Connection
+
+    def conectar(self):
+        conn = sqlite3.connect(self.uri, uri=True, timeout=30, factory=self.fabrica)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def preparar(self):
+        return _preparar(self)
+
+    def cerrar(self):
+        self._ancla.close()
+
+    def __repr__(self):
+        return f'AlmacenMemoria({self.nombre!r})'
+
+def _preparar(almacen):
+    """Crea el esquema si la base está vacía o aplica las migraciones pendientes"""
+    from database import init_db, aplicar_migraciones
+
+    conn = almacen.conectar()
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'turnos'").fetchone():
+            aplicar_migraciones(conn=conn)
+        else:
+            init_db(conn=conn, doctores=almacen.doctores)
+    finally:
+        conn.close()
+    return almacen
+
+# SEDES: una base por clínica. La sede de la petición en curso se guarda por
+# hilo; actual() y conectar() la usan sin que los módulos tengan que saberlo.
+
+_local = threading.local()
+
+class EnrutadorSedes:
+    """Reparte las conexiones entre las bases de cada sede.
+
+    Cada sede tiene su propio archivo y por lo tanto su propio bloqueo de
+    escritura: dos clínicas no se esperan entre sí.
+    """
+
+    def __init__(self, almacenes, nombres=None, predeterminada=None):
+        if not almacenes:
+            raise ErrorSede('Se necesita al menos una sede')
+        self.almacenes = dict(almacenes)
+        self.nombres = nombres or {}
+        self.predeterminada = predeterminada or next(iter(self.almacenes))
+        if self.predeterminada not in self.almacenes:
+            raise ErrorSede(f'Sede predeterminada desconocida: {self.predeterminada}')
+
+    def ids(self):
+        return list(self.almacenes)
+
+    def almacen(self, sede_id):
+        try:
+            return self.almacenes[sede_id]
+        except KeyError:
+            raise ErrorSede(f'Sede desconocida: {sede_id}') from None
+
+    def actual(self):
+        return self.almacenes[getattr(_local, 'sede', None) or self.predeterminada]
+
+    def preparar(self):
+        """Crea o migra la base de cada sede"""
+        for almacen in self.almacenes.values():
+            almacen.preparar()
+        return self
+
+    def usar_fabrica(self, fabrica):
+        for almacen in self.almacenes.values():
+            almacen.fabrica = fabrica
+
+    def cerrar(self):
+        for almacen in self.almacenes.values():
+            almacen.cerrar()
+
+    def sedes(self):
+        return [{'id': sede_id, 'nombre': self.nombres.get(sede_id, sede_id), 'almacen': almacen.tipo,
+                 'predeterminada': sede_id == self.predeterminada}
+                for sede_id, almacen in self.almacenes.items()]
+
+    def en_paralelo(self, funcion, max_hilos=MAX_HILOS_SEDES):
+        """{sede_id: funcion()} ejecutando funcion en cada sede a la vez.
+
+        SQLite suelta el GIL mientras consulta, así que los hilos alcanzan
+        para leer varias bases al mismo tiempo.
+        """
+        def en_una(sede_id):
+            with en_sede(sede_id):
+                return sede_id, funcion()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_hilos, len(self.almacenes))),
+                                thread_name_prefix='sede') as hilos:
+            return dict(hilos.map(en_una, self.almacenes))
+
+def _almacen_desde_ruta(ruta, doctores=None):
+    return AlmacenMemoria(doctores=doctores) if ruta == ':memory:' else AlmacenArchivo(ruta, doctores=doctores)
+
+def cargar_sedes(ruta=ARCHIVO_SEDES):
+    """Enrutador a partir de un JSON como:
+
+    {"predeterminada": "centro",
+     "sedes": [{"id": "centro", "nombre": "Clínica Centro", "db": "sedes/centro.db"},
+               {"id": "norte", "nombre": "Clínica Norte", "db": "sedes/norte.db",
+                "doctores": [["Dra. Ruiz", "Consultorio 1", 1]]}]}
+
+    "db" es opcional (sedes/<id>.db) y "doctores" también (los de database.py).
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        configuracion = json.load(archivo)
+    almacenes = {}
+    nombres = {}
+    for sede in configuracion['sedes']:
+        sede_id = sede['id']
+        if sede_id in almacenes:
+            raise ErrorSede(f'Sede repetida en {ruta}: {sede_id}')
+        doctores = [tuple(doctor) for doctor in sede['doctores']] if sede.get('doctores') else None
+        almacenes[sede_id] = _almacen_desde_ruta(sede.get('db', os.path.join('sedes', f'{sede_id}.db')), doctores)
+        nombres[sede_id] = sede.get('nombre', sede_id)
+    return EnrutadorSedes(almacenes, nombres, configuracion.get('predeterminada'))
+
+def desde_entorno():
+    """Sedes de TURNERO_SEDES (o sedes.json si existe); si no, una sola sede en
+    TURNERO_DB, que puede ser una ruta de archivo o :memory:"""
+    archivo_sedes = os.environ.get('TURNERO_SEDES') or (ARCHIVO_SEDES if os.path.exists(ARCHIVO_SEDES) else None)
+    if archivo_sedes:
+        return cargar_sedes(archivo_sedes)
+    ruta = os.environ.get('TURNERO_DB', 'turnos.db')
+    return EnrutadorSedes({SEDE_PREDETERMINADA: _almacen_desde_ruta(ruta)})
+
+_enrutador = None
+
+def enrutador():
+    global _enrutador
+    if _enrutador is None:
+        _enrutador = desde_entorno()
+    return _enrutador
+
+def actual():
+    """Almacén de la sede en curso"""
+    return enrutador().actual()
+
+def configurar(almacen):
+    """Cambia el almacén (o el enrutador de sedes) que usan todos los módulos"""
+    global _enrutador
+    _enrutador = almacen if isinstance(almacen, EnrutadorSedes) else EnrutadorSedes({SEDE_PREDETERMINADA: almacen})
+    return almacen
+
+def sede_actual():
+    return getattr(_local, 'sede', None) or enrutador().predeterminada
+
+def cambiar_sede(sede_id):
+    """Fija la sede del hilo actual; None vuelve a la predeterminada"""
+    if sede_id is not None:
+        enrutador().almacen(sede_id)
+    _local.sede = sede_id
+
+@contextmanager
+def en_sede(sede_id):
+    anterior = getattr(_local, 'sede', None)
+    cambiar_sede(sede_id)
+    try:
+        yield enrutador().almacen(sede_actual())
+    finally:
+        _local.sede = anterior
+
+def conectar():
+    return actual().conectar()
+
+def agregar_opcion_sede(parser):
+    """--sede para los scripts de mantenimiento; sin ella se usa la predeterminada"""
+    parser.add_argument('--sede', default=None, help=f'id de la sede (ver {ARCHIVO_SEDES}), por defecto la predeterminada')
+    return parser
+
+def usar_sede_de_argumentos(parser, args):
+    try:
+        cambiar_sede(args.sede)
+    except ErrorSede as e:
+        parser.error(str(e))
+
+if __name__ == '__main__':
+    # Crea o migra la base de cada sede: python almacen.py
+    for sede in enrutador().preparar().sedes():
+        print(f"✅ Sede {sede['id']} ({sede['nombre']}): {enrutador().almacen(sede['id'])!r}")
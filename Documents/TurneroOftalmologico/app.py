@@ -1,58 +1,245 @@
 # app.py
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, url_for, Response, redirect
+import os
+import heapq
 import sqlite3
-from estadisticas import registrar_historial, obtener_estadisticas_dia, obtener_estadisticas_mensual
-from datetime import datetime
+from estadisticas import (registrar_historial, registrar_historial_lote, obtener_historial,
+                          calcular_estadisticas_dia, calcular_estadisticas_mensual, sumar_estadisticas_sedes,
+                          EVENTOS, BANDERA_VUELVE_CONMIGO)
+import almacen
+import repositorio
+import reloj
+from utilizacion import registrar_estado_doctor, obtener_utilizacion_dia, obtener_utilizacion_mensual
+from cache import CacheResultados
+from respaldo import ServicioRespaldos, INTERVALO_RESPALDO, directorio_de_sede
+import citas
+from activos import ActivosEstaticos, comprimir_respuesta
+from perfilado import PerfiladorPeticiones, ConexionMedida, sin_binarios
 
-notificaciones_recepcion = []
+# Estaciones con significado fijo dentro del flujo del paciente
+ESTACION_RECEPCION = 1
+ESTACION_CONSULTA = 4
+ESTACION_SALIDA = 8
+
+# Destinos posibles al finalizar una consulta
+DESTINOS_ESTACION = {
+    'FARMACIA': 5,
+    'ASESORIA_VISUAL': 6,
+    'ESTUDIOS_ESPECIALES': 7,
+    'SALIDA': ESTACION_SALIDA
+}
+
+# Estados en los que un turno sigue esperando en su estación
+ESTADOS_EN_COLA = ('PENDIENTE', 'EN_ATENCION', 'FINALIZADO')
+
+# Estados de los que un turno ya no se mueve de estación
+ESTADOS_CERRADOS = {'CANCELADO': 'El turno está cancelado', 'FINALIZADO': 'El turno ya finalizó'}
+
+# Turnos por petición en las operaciones en lote
+MAX_LOTE = 500
+
+TTL_LECTURAS = 5       # segundos, listas que consultan las pantallas
+TTL_ESTADISTICAS = 60  # segundos, estadísticas del día o mes en curso
+# Días y meses cerrados: la cache es de cada proceso y una corrección (edición, importación,
+# migración) solo invalida la del proceso que la hizo; los demás la ven al expirar
+TTL_PERIODOS_CERRADOS = 600
+
+# Sede de cada petición: ?sede=, cabecera X-Sede o la cookie que deja /sede/<id>
+PARAMETRO_SEDE = 'sede'
+CABECERA_SEDE = 'X-Sede'
+COOKIE_SEDE = 'sede'
 
 app = Flask(__name__)
+# Una base por sede: sedes.json / TURNERO_SEDES, o una sola en TURNERO_DB (ver almacen.py)
+sedes = almacen.enrutador().preparar()
+
+# Cache de lecturas por sede: lo del día se invalida al escribir, los periodos cerrados expiran
+# en TTL_PERIODOS_CERRADOS
+caches_por_sede = {sede_id: CacheResultados(max_entradas=256) for sede_id in sedes.ids()}
+
+def cache_resultados():
+    return caches_por_sede[almacen.sede_actual()]
+
+# Respaldos en caliente de la base de cada sede en archivo (ver respaldo.py).
+# TURNERO_INTERVALO_RESPALDO en segundos; 0 deja solo los respaldos manuales
+intervalo_respaldos = int(os.environ.get('TURNERO_INTERVALO_RESPALDO') or INTERVALO_RESPALDO)
+servicios_respaldos = {
+    sede_id: ServicioRespaldos(origen=destino.ruta, intervalo=intervalo_respaldos,
+                               directorio=directorio_de_sede(sede_id, sedes.ids()))
+    for sede_id, destino in sedes.almacenes.items() if destino.tipo == 'archivo'
+}
+# Se programan al crear la app, con python app.py, flask run o un servidor WSGI;
+# si hay varios procesos solo uno los ejecuta (el que toma el candado)
+for servicio in servicios_respaldos.values():
+    servicio.iniciar()
+
+@app.before_request
+def elegir_sede():
+    sede_id = request.args.get(PARAMETRO_SEDE) or request.headers.get(CABECERA_SEDE)
+    if sede_id is None and request.cookies.get(COOKIE_SEDE) in sedes.ids():
+        # Una cookie de una sede que ya no existe se ignora
+        sede_id = request.cookies.get(COOKIE_SEDE)
+    try:
+        almacen.cambiar_sede(sede_id)
+    except almacen.ErrorSede as e:
+        almacen.cambiar_sede(None)
+        return jsonify({'success': False, 'error': str(e)}), 404
+
+@app.after_request
+def recordar_sede(response):
+    # Con ?sede= se deja la cookie, así los fetch de la página van a la misma sede
+    sede_id = request.args.get(PARAMETRO_SEDE)
+    if sede_id in sedes.ids() and request.cookies.get(COOKIE_SEDE) != sede_id:
+        response.set_cookie(COOKIE_SEDE, sede_id, samesite='Lax')
+    return response
+
+@app.teardown_request
+def soltar_sede(error=None):
+    almacen.cambiar_sede(None)
+
+# CSS/JS con huella de contenido y precomprimidos (ver activos.py); con
+# python app.py (debug) los cambios en static/ se publican sin reiniciar
+activos_estaticos = ActivosEstaticos(app.static_folder, recargar=__name__ == '__main__')
+activos_estaticos.construir()
+
+@app.template_global()
+def activo(ruta):
+    """URL de un archivo de static/ con huella; si no está publicado, la URL normal"""
+    nombre = activos_estaticos.nombre_de(ruta)
+    if nombre is None:
+        return url_for('static', filename=ruta)
+    return url_for('servir_activo', nombre=nombre)
+
+@app.route('/activos/<path:nombre>')
+def servir_activo(nombre):
+    return activos_estaticos.enviar(nombre)
+
+@app.after_request
+def comprimir(response):
+    return comprimir_respuesta(response)
+
+# Perfilado bajo demanda y captura de peticiones lentas (ver perfilado.py).
+# Se configura con TURNERO_UMBRAL_LENTO_MS, TURNERO_MUESTREO_PERFIL y
+# TURNERO_TOKEN_ADMIN; con umbral 0, sin muestreo ni token no se mide nada.
+# Sin token no se perfila a pedido ni se pueden leer las capturas
+perfilador = PerfiladorPeticiones.desde_entorno()
+if perfilador.activo:
+    sedes.usar_fabrica(ConexionMedida)
+    app.before_request(perfilador.iniciar)
+    app.after_request(perfilador.terminar)
+    app.teardown_request(perfilador.descartar)
 
 def get_db_connection():
-    conn = sqlite3.connect('turnos.db', timeout=30)
-    conn.row_factory = sqlite3.Row
-    conn.execute('PRAGMA journal_mode=WAL')
-    return conn
+    return almacen.conectar()
+
+def obtener_periodo(clave, calcular, abierto):
+    """Resultado de un día o mes desde la cache de la sede; abierto si es el periodo en curso o futuro"""
+    if abierto:
+        return cache_resultados().obtener(clave, calcular, TTL_ESTADISTICAS)
+    return cache_resultados().obtener(clave, calcular, TTL_PERIODOS_CERRADOS, volatil=False)
+
+def invalidar_cache_turno(conn, turno_id):
+    """Invalida lo del día y, si el turno es de otro día, también sus estadísticas"""
+    invalidar_cache_lote(conn, [turno_id])
+
+def invalidar_cache_lote(conn, turno_ids):
+    """Como invalidar_cache_turno, con una sola consulta para todos los turnos"""
+    for fecha in repositorio.fechas_de_turnos(conn, turno_ids):
+        cache_resultados().invalidar(('estadisticas_dia', fecha), ('estadisticas_mes', fecha[:7]))
+    cache_resultados().invalidar_volatiles()
 
 @app.route('/')
 def recepcion():
     return render_template('recepcion.html')
 
+# Elegir la sede de este navegador (queda en una cookie)
+@app.route('/sede/<sede_id>')
+def elegir_sede_navegador(sede_id):
+    if sede_id not in sedes.ids():
+        return jsonify({'success': False, 'error': f'Sede desconocida: {sede_id}'}), 404
+    respuesta = redirect(url_for('recepcion'))
+    respuesta.set_cookie(COOKIE_SEDE, sede_id, samesite='Lax')
+    return respuesta
+
+# API: Sedes configuradas y la de esta petición
+@app.route('/api/sedes')
+def get_sedes():
+    return jsonify({'sedes': sedes.sedes(), 'actual': almacen.sede_actual()})
+
 # API SIMPLIFICADA - SOLO ESTACIÓN ACTUAL
 @app.route('/api/turnos')
 def get_turnos():
+    return jsonify(cache_resultados().obtener(('turnos',), consultar_turnos_activos, TTL_LECTURAS))
+
+def consultar_turnos_activos():
     conn = get_db_connection()
-    turnos = conn.execute('''
-        SELECT t.*, 
-               e.nombre as estacion_actual_nombre,
-               d.nombre as doctor_nombre
-        FROM turnos t
-        LEFT JOIN estaciones e ON t.estacion_actual = e.id
-        LEFT JOIN doctores d ON t.doctor_asignado = d.id
-        WHERE t.estado != "FINALIZADO" AND t.estado != "CANCELADO"
-        ORDER BY t.timestamp_creacion DESC
-    ''').fetchall()
+    turnos = repositorio.turnos_activos(conn)
     conn.close()
     
     # DEBUG: Ver datos
     for turno in turnos:
-        print(f"DEBUG: Turno {dict(turno)['numero']} - Doctor: {dict(turno)['doctor_nombre']}")
+        print(f"DEBUG: Turno {turno['numero']} - Doctor: {turno['doctor_nombre']}")
     
-    return jsonify([dict(turno) for turno in turnos])
+    return turnos
 
 @app.route('/api/doctores')
 def get_doctores():
+    return jsonify(cache_resultados().obtener(('doctores',), consultar_doctores_activos, TTL_LECTURAS))
+
+def consultar_doctores_activos():
     conn = get_db_connection()
-    doctores = conn.execute('SELECT * FROM doctores WHERE activo = 1').fetchall()
+    doctores = repositorio.doctores_activos(conn)
     conn.close()
-    return jsonify([dict(d) for d in doctores])
+    return doctores
 
 @app.route('/api/estaciones')
 def get_estaciones_disponibles():
     conn = get_db_connection()
-    estaciones = conn.execute('SELECT * FROM estaciones WHERE id != 1 AND id != 8').fetchall()
+    estaciones = repositorio.estaciones_excepto(conn, (ESTACION_RECEPCION, ESTACION_SALIDA))
+    conn.close()
+    return jsonify(estaciones)
+
+# API: Cola de pacientes de una estación (solo turnos del día)
+@app.route('/api/estaciones/<int:estacion_id>/cola')
+def get_cola_estacion(estacion_id):
+    cola = cache_resultados().obtener(('cola', estacion_id), lambda: consultar_cola_estacion(estacion_id), TTL_LECTURAS)
+    if cola is None:
+        return jsonify({'success': False, 'error': 'Estación no encontrada'}), 404
+    return jsonify(cola)
+
+def consultar_cola_estacion(estacion_id):
+    conn = get_db_connection()
+
+    estacion = repositorio.obtener_estacion(conn, estacion_id)
+    if not estacion:
+        conn.close()
+        return None
+
+    turnos = repositorio.cola_estacion(conn, estacion_id, ESTADOS_EN_COLA, reloj.hoy())
     conn.close()
-    return jsonify([dict(e) for e in estaciones])
+
+    return {
+        'success': True,
+        'estacion': dict(estacion),
+        'turnos': turnos,
+        'total': len(turnos)
+    }
+
+def insertar_turno(conn, paciente_nombre, paciente_edad, tipo, estacion_inicial, doctor_asignado):
+    """Crea un turno con el siguiente número del día y su evento CREADO, sin hacer commit"""
+    # Fecha y hora de la clínica (no la UTC de CURRENT_TIMESTAMP)
+    ahora = reloj.ahora()
+    fecha_actual = ahora.strftime('%Y-%m-%d')
+    
+    # Siguiente número después del último turno de HOY
+    nuevo_numero = repositorio.siguiente_numero_del_dia(conn, fecha_actual)
+    turno_id = repositorio.insertar_turno(conn, nuevo_numero, paciente_nombre, paciente_edad, tipo,
+                                          estacion_inicial, doctor_asignado, fecha_actual, ahora.hour)
+    
+    # Registrar en historial
+    registrar_historial(turno_id, 'CREADO', doctor_id=doctor_asignado,
+                        estacion_destino=estacion_inicial, conn=conn)
+    return turno_id, nuevo_numero
 
 @app.route('/api/turnos/nuevo', methods=['POST'])
 def crear_turno():
@@ -61,39 +248,14 @@ def crear_turno():
     try:
         conn = get_db_connection()
         
-        # Obtener fecha actual
-        fecha_actual = datetime.now().strftime('%Y-%m-%d')
-        
-        # Buscar último turno de HOY
-        ultimo_turno = conn.execute(
-            'SELECT numero FROM turnos WHERE DATE(timestamp_creacion) = ? ORDER BY id DESC LIMIT 1',
-            (fecha_actual,)
-        ).fetchone()
-        
-        if ultimo_turno:
-            # Extraer número del formato A001, A002, etc.
-            ultimo_numero = int(ultimo_turno['numero'][1:])
-            nuevo_numero = f"A{ultimo_numero + 1:03d}"
-        else:
-            # Primer turno del día
-            nuevo_numero = "A001"
-        
-        estacion_inicial = data.get('estacion_inicial', 1)
-        doctor_asignado = data.get('doctor_asignado') if estacion_inicial == 4 else None
+        estacion_inicial = data.get('estacion_inicial', ESTACION_RECEPCION)
+        doctor_asignado = data.get('doctor_asignado') if estacion_inicial == ESTACION_CONSULTA else None
         
-        # INSERT SIMPLIFICADO - sin estacion_siguiente
-        conn.execute('''
-            INSERT INTO turnos (numero, paciente_nombre, paciente_edad, tipo, estacion_actual, doctor_asignado)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (nuevo_numero, data['paciente_nombre'], data['paciente_edad'], data['tipo'], estacion_inicial, doctor_asignado))
-        
-        # Obtener el ID del turno recién creado
-        turno_id = conn.execute('SELECT last_insert_rowid() as id').fetchone()['id']
-        
-        # Registrar en historial
-        registrar_historial(turno_id, 'CREADO', f'Tipo: {data["tipo"]}, Estación: {estacion_inicial}')
+        turno_id, nuevo_numero = insertar_turno(conn, data['paciente_nombre'], data['paciente_edad'],
+                                                data['tipo'], estacion_inicial, doctor_asignado)
         
         conn.commit()
+        cache_resultados().invalidar_volatiles()
         
         return jsonify({'success': True, 'numero_turno': nuevo_numero, 'turno_id': turno_id})
         
@@ -114,16 +276,16 @@ def cancelar_turno(turno_id):
     razon = data.get('razon', 'No especificada') if data else 'No especificada'
     
     conn = get_db_connection()
-    conn.execute('''
-        UPDATE turnos 
-        SET estado = "CANCELADO", timestamp_cancelado = CURRENT_TIMESTAMP, razon_cancelacion = ?
-        WHERE id = ?
-    ''', (razon, turno_id))
-    conn.commit()
-    conn.close()
+    turno = repositorio.obtener_turno(conn, turno_id)
+    repositorio.cancelar_turnos(conn, [turno_id], razon)
     
     # Registrar en historial para estadísticas
-    registrar_historial(turno_id, 'CANCELADO', f'Razón: {razon}', 'recepcion')
+    if turno:
+        registrar_historial(turno_id, 'CANCELADO', razon, 'recepcion', doctor_id=turno['doctor_asignado'],
+                            estacion_origen=turno['estacion_actual'], conn=conn)
+    conn.commit()
+    invalidar_cache_turno(conn, turno_id)
+    conn.close()
     
     return jsonify({'success': True})
 
@@ -132,22 +294,390 @@ def editar_turno(turno_id):
     data = request.json
     conn = get_db_connection()
     
-    conn.execute('''
-        UPDATE turnos 
-        SET paciente_nombre = ?, paciente_edad = ?, tipo = ?, estacion_actual = ?, doctor_asignado = ?
-        WHERE id = ?
-    ''', (data['paciente_nombre'], data['paciente_edad'], data['tipo'], data['estacion_actual'], data.get('doctor_asignado'), turno_id))
+    repositorio.editar_turno(conn, turno_id, data['paciente_nombre'], data['paciente_edad'], data['tipo'],
+                             data['estacion_actual'], data.get('doctor_asignado'))
     
     conn.commit()
+    invalidar_cache_turno(conn, turno_id)
     conn.close()
     return jsonify({'success': True})
 
+def es_id(valor):
+    """Un id del cuerpo JSON: entero, sin aceptar true/false (bool es subclase de int)"""
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+# API para mover un turno a otra estación
+@app.route('/api/turnos/<int:turno_id>/mover', methods=['PUT'])
+def mover_turno(turno_id):
+    data = request.json or {}
+    estacion_destino = data.get('estacion_id')
+    if not es_id(estacion_destino):
+        return jsonify({'success': False, 'error': 'estacion_id debe ser un número'}), 400
+
+    conn = get_db_connection()
+
+    turno = repositorio.obtener_turno(conn, turno_id)
+    if not turno:
+        conn.close()
+        return jsonify({'success': False, 'error': 'Turno no encontrado'}), 404
+    if turno['estado'] in ESTADOS_CERRADOS:
+        conn.close()
+        return jsonify({'success': False, 'error': ESTADOS_CERRADOS[turno['estado']]}), 409
+
+    estacion = repositorio.obtener_estacion(conn, estacion_destino)
+    if not estacion:
+        conn.close()
+        return jsonify({'success': False, 'error': 'Estación no encontrada'}), 400
+
+    # En consulta se conserva el doctor salvo que se indique otro
+    if estacion_destino == ESTACION_CONSULTA:
+        doctor_asignado = data.get('doctor_asignado', turno['doctor_asignado'])
+    else:
+        doctor_asignado = turno['doctor_asignado']
+
+    repositorio.mover_turnos(conn, [(turno_id, estacion_destino, doctor_asignado)])
+    registrar_historial(turno_id, 'MOVIDO', usuario='recepcion', doctor_id=doctor_asignado,
+                        estacion_origen=turno['estacion_actual'], estacion_destino=estacion_destino, conn=conn)
+    conn.commit()
+    invalidar_cache_turno(conn, turno_id)
+    conn.close()
+
+    return jsonify({'success': True, 'estacion_anterior': turno['estacion_actual'], 'estacion_actual': estacion_destino})
+
+# OPERACIONES EN LOTE: una transacción y un resultado por turno
+
+def leer_ids_lote(data):
+    """Lista de turno_ids del cuerpo de la petición, sin repetidos y en el orden recibido"""
+    turno_ids = data.get('turno_ids')
+    if not isinstance(turno_ids, list) or not all(es_id(t) for t in turno_ids):
+        raise ValueError('turno_ids debe ser una lista de números')
+    if len(turno_ids) > MAX_LOTE:
+        raise ValueError(f'Máximo {MAX_LOTE} turnos por lote')
+    return list(dict.fromkeys(turno_ids))
+
+def respuesta_lote(resultados):
+    procesados = sum(1 for r in resultados if r['success'])
+    return jsonify({'success': True, 'procesados': procesados,
+                    'fallidos': len(resultados) - procesados, 'resultados': resultados})
+
+# API: Reasignar los turnos pendientes de un doctor a uno o varios doctores
+@app.route('/api/turnos/lote/reasignar', methods=['POST'])
+def reasignar_turnos_lote():
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Se esperaba un objeto JSON'}), 400
+    doctor_origen = data.get('doctor_origen')
+    destinos = data.get('doctores_destino') or ([data['doctor_destino']] if data.get('doctor_destino') else [])
+
+    if not es_id(doctor_origen) or not isinstance(destinos, list) or not all(es_id(d) for d in destinos):
+        return jsonify({'success': False, 'error': 'doctor_origen y doctores_destino deben ser números'}), 400
+    destinos = list(dict.fromkeys(destinos))
+    if not destinos or doctor_origen in destinos:
+        return jsonify({'success': False, 'error': 'Indique doctores de destino distintos del de origen'}), 400
+    try:
+        turno_ids = leer_ids_lote(data) if 'turno_ids' in data else None
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        doctores = repositorio.nombres_de_doctores(conn, destinos + [doctor_origen])
+        faltantes = [d for d in destinos + [doctor_origen] if d not in doctores]
+        if faltantes:
+            conn.rollback()
+            return jsonify({'success': False, 'error': f'Doctores no encontrados: {faltantes}'}), 400
+
+        pendientes = repositorio.pendientes_de_doctor(conn, doctor_origen)
+
+        resultados = []
+        if turno_ids is not None:
+            seleccion = set(turno_ids)
+            pendientes = [t for t in pendientes if t['id'] in seleccion]
+            encontrados = {t['id'] for t in pendientes}
+            resultados.extend({'turno_id': t, 'success': False,
+                               'error': 'El turno no está pendiente con el doctor de origen'}
+                              for t in turno_ids if t not in encontrados)
+
+        # Cada turno, del más antiguo al más nuevo, va al destino con menos pendientes
+        carga = repositorio.contar_pendientes(conn, destinos)
+        cola = [(carga[d], orden, d) for orden, d in enumerate(destinos)]
+        heapq.heapify(cola)
+
+        cambios = []
+        for turno in pendientes:
+            pendientes_destino, orden, destino = heapq.heappop(cola)
+            heapq.heappush(cola, (pendientes_destino + 1, orden, destino))
+            cambios.append((turno['id'], destino))
+            resultados.append({'turno_id': turno['id'], 'numero': turno['numero'], 'success': True,
+                               'doctor_asignado': destino, 'doctor_nombre': doctores[destino]})
+
+        repositorio.reasignar_turnos(conn, cambios)
+        registrar_historial_lote(conn, [{
+            'turno_id': turno['id'], 'accion': 'REASIGNADO', 'usuario': 'recepcion',
+            'doctor_id': destino, 'estacion_origen': turno['estacion_actual'],
+            'detalles': f'Reasignado desde {doctores[doctor_origen]}'
+        } for turno, (_, destino) in zip(pendientes, cambios)])
+        conn.commit()
+        invalidar_cache_lote(conn, [turno_id for turno_id, _ in cambios])
+        return respuesta_lote(resultados)
+
+    except Exception as e:
+        print(f"Error al reasignar turnos: {e}")
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        conn.close()
+
+# API: Cancelar una selección de turnos con la misma razón
+@app.route('/api/turnos/lote/cancelar', methods=['PUT'])
+def cancelar_turnos_lote():
+    data = request.json or {}
+    razon = data.get('razon') or 'No especificada'
+    try:
+        turno_ids = leer_ids_lote(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        turnos = repositorio.turnos_por_ids(conn, turno_ids)
+
+        resultados = []
+        cancelados = []
+        for turno_id in turno_ids:
+            turno = turnos.get(turno_id)
+            if not turno:
+                resultados.append({'turno_id': turno_id, 'success': False, 'error': 'Turno no encontrado'})
+            elif turno['estado'] in ('CANCELADO', 'FINALIZADO'):
+                resultados.append({'turno_id': turno_id, 'numero': turno['numero'], 'success': False,
+                                   'error': f'El turno ya está {turno["estado"].lower()}'})
+            else:
+                cancelados.append(turno)
+                resultados.append({'turno_id': turno_id, 'numero': turno['numero'], 'success': True})
+
+        repositorio.cancelar_turnos(conn, [turno['id'] for turno in cancelados], razon)
+        registrar_historial_lote(conn, [{
+            'turno_id': turno['id'], 'accion': 'CANCELADO', 'detalles': razon, 'usuario': 'recepcion',
+            'doctor_id': turno['doctor_asignado'], 'estacion_origen': turno['estacion_actual']
+        } for turno in cancelados])
+        conn.commit()
+        invalidar_cache_lote(conn, [turno['id'] for turno in cancelados])
+        return respuesta_lote(resultados)
+
+    except Exception as e:
+        print(f"Error al cancelar turnos: {e}")
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        conn.close()
+
+# API: Mover una selección de turnos a otra estación
+@app.route('/api/turnos/lote/mover', methods=['PUT'])
+def mover_turnos_lote():
+    data = request.json or {}
+    estacion_destino = data.get('estacion_id')
+    if not es_id(estacion_destino):
+        return jsonify({'success': False, 'error': 'estacion_id debe ser un número'}), 400
+    try:
+        turno_ids = leer_ids_lote(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        estacion = repositorio.obtener_estacion(conn, estacion_destino)
+        if not estacion:
+            conn.rollback()
+            return jsonify({'success': False, 'error': 'Estación no encontrada'}), 400
+
+        turnos = repositorio.turnos_por_ids(conn, turno_ids)
+        resultados = []
+        movidos = []
+        for turno_id in turno_ids:
+            turno = turnos.get(turno_id)
+            if not turno:
+                resultados.append({'turno_id': turno_id, 'success': False, 'error': 'Turno no encontrado'})
+                continue
+            if turno['estado'] in ESTADOS_CERRADOS:
+                resultados.append({'turno_id': turno_id, 'numero': turno['numero'], 'success': False,
+                                   'error': ESTADOS_CERRADOS[turno['estado']]})
+                continue
+            # Igual que mover_turno: en consulta se puede indicar otro doctor
+            doctor_asignado = turno['doctor_asignado']
+            if estacion_destino == ESTACION_CONSULTA:
+                doctor_asignado = data.get('doctor_asignado', doctor_asignado)
+            movidos.append((turno, doctor_asignado))
+            resultados.append({'turno_id': turno_id, 'numero': turno['numero'], 'success': True,
+                               'estacion_anterior': turno['estacion_actual'], 'estacion_actual': estacion_destino})
+
+        repositorio.mover_turnos(conn, [(turno['id'], estacion_destino, doctor) for turno, doctor in movidos])
+        registrar_historial_lote(conn, [{
+            'turno_id': turno['id'], 'accion': 'MOVIDO', 'usuario': 'recepcion', 'doctor_id': doctor,
+            'estacion_origen': turno['estacion_actual'], 'estacion_destino': estacion_destino
+        } for turno, doctor in movidos])
+        conn.commit()
+        invalidar_cache_lote(conn, [turno['id'] for turno, _ in movidos])
+        return respuesta_lote(resultados)
+
+    except Exception as e:
+        print(f"Error al mover turnos: {e}")
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        conn.close()
+
+# AGENDA DE CITAS (ver citas.py)
+
+# API: Horario semanal de un doctor
+@app.route('/api/doctores/<int:doctor_id>/horario')
+def get_horario_doctor(doctor_id):
+    conn = get_db_connection()
+    horario = citas.obtener_horario(conn, doctor_id)
+    conn.close()
+    return jsonify({'success': True, 'doctor_id': doctor_id, 'bloques': horario})
+
+@app.route('/api/doctores/<int:doctor_id>/horario', methods=['PUT'])
+def guardar_horario_doctor(doctor_id):
+    data = request.json or {}
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        if not repositorio.obtener_doctor(conn, doctor_id):
+            conn.rollback()
+            return jsonify({'success': False, 'error': 'Doctor no encontrado'}), 404
+        citas.guardar_horario(conn, doctor_id, data.get('bloques', []))
+        conn.commit()
+        return jsonify({'success': True})
+    except citas.ErrorCita as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 409
+    finally:
+        conn.close()
+
+# API: Horarios libres de uno o todos los doctores entre dos fechas
+@app.route('/api/citas/disponibilidad')
+def get_disponibilidad():
+    hoy = reloj.hoy()
+    conn = get_db_connection()
+    try:
+        # Los días que faltan se guardan aquí: misma transacción inmediata que al reservar
+        conn.execute('BEGIN IMMEDIATE')
+        dias = citas.buscar_disponibilidad(conn, request.args.get('desde', hoy), request.args.get('hasta'),
+                                           request.args.get('doctor_id', type=int))
+        conn.commit()
+        return jsonify({'success': True, 'disponibilidad': dias})
+    except citas.ErrorCita as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 409
+    finally:
+        conn.close()
+
+# API: Citas de un día
+@app.route('/api/citas')
+def get_citas():
+    fecha = request.args.get('fecha', reloj.hoy())
+    conn = get_db_connection()
+    lista = citas.citas_del_dia(conn, fecha, request.args.get('doctor_id', type=int), request.args.get('estado'))
+    conn.close()
+    return jsonify({'success': True, 'fecha': fecha, 'citas': lista})
+
+# API: Reservar una cita
+@app.route('/api/citas', methods=['POST'])
+def reservar_cita():
+    data = request.json or {}
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        cita_id = citas.reservar_cita(conn, data.get('doctor_id'), data.get('fecha'), data.get('hora'),
+                                      data.get('paciente_nombre'), data.get('paciente_edad'), data.get('telefono'))
+        conn.commit()
+        return jsonify({'success': True, 'cita_id': cita_id})
+    except citas.ErrorCita as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': f'El horario ya está reservado: {e}'}), 409
+    finally:
+        conn.close()
+
+# API: Importar las citas del día (JSON {"citas": [...]} o CSV con encabezado)
+@app.route('/api/citas/importar', methods=['POST'])
+def importar_citas():
+    if request.is_json:
+        filas = (request.json or {}).get('citas', [])
+    else:
+        filas = citas.leer_csv(request.get_data(as_text=True))
+
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        resultados = citas.importar_citas(conn, filas)
+        conn.commit()
+        return respuesta_lote(resultados)
+    except Exception as e:
+        print(f"Error al importar citas: {e}")
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@app.route('/api/citas/<int:cita_id>/cancelar', methods=['PUT'])
+def cancelar_cita(cita_id):
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        citas.cancelar_cita(conn, cita_id)
+        conn.commit()
+        return jsonify({'success': True})
+    except citas.ErrorCita as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 409
+    finally:
+        conn.close()
+
+# API: Llegada del paciente: la cita reservada se convierte en turno de consulta
+@app.route('/api/citas/<int:cita_id>/llegada', methods=['POST'])
+def registrar_llegada_cita(cita_id):
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        cita = citas.cita_para_llegada(conn, cita_id)
+        turno_id, numero = insertar_turno(conn, cita['paciente_nombre'], cita['paciente_edad'], 'CITA',
+                                          ESTACION_CONSULTA, cita['doctor_id'])
+        citas.marcar_llegada(conn, cita_id, turno_id)
+        conn.commit()
+        cache_resultados().invalidar_volatiles()
+        return jsonify({'success': True, 'numero_turno': numero, 'turno_id': turno_id})
+    except citas.ErrorCita as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 409
+    finally:
+        conn.close()
+
 # API: Obtener estadísticas del día
 @app.route('/api/estadisticas/dia')
 @app.route('/api/estadisticas/dia/<fecha>')
 def get_estadisticas_dia(fecha=None):
     try:
-        stats = obtener_estadisticas_dia(fecha)
+        hoy = reloj.hoy()
+        fecha = fecha or hoy
+        stats = obtener_periodo(('estadisticas_dia', fecha), lambda: calcular_estadisticas_dia(fecha), fecha >= hoy)
         print(f"📊 Estadísticas del día {fecha}: {stats}")  # Debug
         return jsonify(stats)
     except Exception as e:
@@ -159,23 +689,172 @@ def get_estadisticas_dia(fecha=None):
 @app.route('/api/estadisticas/mes/<mes>/<anio>')
 def get_estadisticas_mes(mes=None, anio=None):
     try:
-        mes = int(mes) if mes else None
-        anio = int(anio) if anio else None
-        stats = obtener_estadisticas_mensual(mes, anio)
+        ahora = reloj.ahora()
+        mes = int(mes) if mes else ahora.month
+        anio = int(anio) if anio else ahora.year
+        periodo = f'{anio}-{mes:02d}'
+        stats = obtener_periodo(('estadisticas_mes', periodo), lambda: calcular_estadisticas_mensual(mes, anio),
+                                periodo >= ahora.strftime('%Y-%m'))
         print(f"Estadísticas del mes {mes}/{anio}: {stats}")  # Debug
         return jsonify(stats)
     except Exception as e:
         print(f"Error en API estadísticas mes: {e}")
         return jsonify({'error': str(e)}), 500
-    
+
+# API: Estadísticas del día sumando todas las sedes (cada base se lee en su hilo)
+@app.route('/api/estadisticas/sedes/dia')
+@app.route('/api/estadisticas/sedes/dia/<fecha>')
+def get_estadisticas_sedes_dia(fecha=None):
+    try:
+        hoy = reloj.hoy()
+        fecha = fecha or hoy
+        por_sede = sedes.en_paralelo(lambda: obtener_periodo(
+            ('estadisticas_dia', fecha), lambda: calcular_estadisticas_dia(fecha), fecha >= hoy))
+        return jsonify(dict(sumar_estadisticas_sedes(por_sede), fecha=fecha))
+    except Exception as e:
+        print(f"Error en API estadísticas de sedes por día: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# API: Estadísticas del mes sumando todas las sedes
+@app.route('/api/estadisticas/sedes/mes')
+@app.route('/api/estadisticas/sedes/mes/<mes>/<anio>')
+def get_estadisticas_sedes_mes(mes=None, anio=None):
+    try:
+        ahora = reloj.ahora()
+        mes = int(mes) if mes else ahora.month
+        anio = int(anio) if anio else ahora.year
+        periodo = f'{anio}-{mes:02d}'
+        por_sede = sedes.en_paralelo(lambda: obtener_periodo(
+            ('estadisticas_mes', periodo), lambda: calcular_estadisticas_mensual(mes, anio),
+            periodo >= ahora.strftime('%Y-%m')))
+        return jsonify(dict(sumar_estadisticas_sedes(por_sede), mes=periodo))
+    except Exception as e:
+        print(f"Error en API estadísticas de sedes por mes: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# API: Utilización de consultorios (ocupado/libre/ausente) de un día
+@app.route('/api/estadisticas/utilizacion/dia')
+@app.route('/api/estadisticas/utilizacion/dia/<fecha>')
+def get_utilizacion_dia(fecha=None):
+    try:
+        hoy = reloj.hoy()
+        fecha = fecha or hoy
+        return jsonify(obtener_periodo(('utilizacion_dia', fecha), lambda: obtener_utilizacion_dia(fecha),
+                                       fecha >= hoy))
+    except Exception as e:
+        print(f"Error en API utilización día: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# API: Utilización de consultorios de un mes, a partir de los días precalculados
+@app.route('/api/estadisticas/utilizacion/mes')
+@app.route('/api/estadisticas/utilizacion/mes/<mes>/<anio>')
+def get_utilizacion_mes(mes=None, anio=None):
+    try:
+        ahora = reloj.ahora()
+        mes = int(mes) if mes else ahora.month
+        anio = int(anio) if anio else ahora.year
+        periodo = f'{anio}-{mes:02d}'
+        return jsonify(obtener_periodo(('utilizacion_mes', periodo), lambda: obtener_utilizacion_mensual(mes, anio),
+                                       periodo >= ahora.strftime('%Y-%m')))
+    except Exception as e:
+        print(f"Error en API utilización mes: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# API: Eventos del historial por turno, doctor, tipo o rango de fechas
+@app.route('/api/historial')
+def get_historial():
+    accion = request.args.get('accion')
+    if accion is not None and accion not in EVENTOS:
+        return jsonify({'success': False, 'error': f'Acción desconocida: {accion}'}), 400
+    try:
+        eventos = obtener_historial(
+            turno_id=request.args.get('turno_id', type=int),
+            doctor_id=request.args.get('doctor_id', type=int),
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta'),
+            accion=accion,
+            limite=min(request.args.get('limite', 500, type=int), 5000)
+        )
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Las fechas van como AAAA-MM-DD'}), 400
+    return jsonify({'success': True, 'eventos': eventos, 'total': len(eventos)})
+
+# API: Contadores de la cache de lecturas
+@app.route('/api/cache/estadisticas')
+def get_estadisticas_cache():
+    return jsonify(cache_resultados().estadisticas())
+
+def servicio_respaldos():
+    return servicios_respaldos.get(almacen.sede_actual())
+
+# API: Estado de los respaldos de la base de datos de la sede
+@app.route('/api/respaldos')
+def get_respaldos():
+    if servicio_respaldos() is None:
+        return jsonify({'success': False, 'error': 'La sede no guarda sus datos en archivo'}), 400
+    return jsonify(servicio_respaldos().estado())
+
+# API: Crear un respaldo ahora, sin detener el servidor
+@app.route('/api/respaldos', methods=['POST'])
+def crear_respaldo():
+    if servicio_respaldos() is None:
+        return jsonify({'success': False, 'error': 'La sede no guarda sus datos en archivo'}), 400
+    try:
+        resultado = servicio_respaldos().ejecutar_ahora()
+        return jsonify({'success': True, 'respaldo': resultado})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# API: Capturas de perfilado y peticiones lentas (solo administración)
+@app.route('/api/perfiles')
+def get_perfiles():
+    if not perfilador.es_administrador():
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+    return jsonify({'success': True, 'estado': perfilador.estado(), 'capturas': perfilador.listar()})
+
+@app.route('/api/perfiles', methods=['DELETE'])
+def limpiar_perfiles():
+    if not perfilador.es_administrador():
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+    return jsonify({'success': True, 'eliminadas': perfilador.limpiar()})
+
+@app.route('/api/perfiles/<int:captura_id>')
+def get_perfil(captura_id):
+    if not perfilador.es_administrador():
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+    captura = perfilador.obtener(captura_id)
+    if captura is None:
+        return jsonify({'success': False, 'error': 'Captura no encontrada'}), 404
+    return jsonify({'success': True, 'captura': sin_binarios(captura)})
+
+# Descarga: el .prof de cProfile (se abre con pstats o snakeviz) o, si la
+# petición no se perfiló, la captura en JSON
+@app.route('/api/perfiles/<int:captura_id>/descargar')
+def descargar_perfil(captura_id):
+    if not perfilador.es_administrador():
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+    captura = perfilador.obtener(captura_id)
+    if captura is None:
+        return jsonify({'success': False, 'error': 'Captura no encontrada'}), 404
+    if captura['_pstats'] is not None:
+        respuesta = Response(captura['_pstats'], mimetype='application/octet-stream')
+        extension = 'prof'
+    else:
+        respuesta = jsonify(sin_binarios(captura))
+        extension = 'json'
+    respuesta.headers['Content-Disposition'] = f'attachment; filename=perfil_{captura_id}.{extension}'
+    return respuesta
 
     # API: Obtener TODOS los doctores (activos e inactivos)
 @app.route('/api/doctores/todos')
 def get_todos_doctores():
+    return jsonify(cache_resultados().obtener(('doctores_todos',), consultar_todos_doctores, TTL_LECTURAS))
+
+def consultar_todos_doctores():
     conn = get_db_connection()
-    doctores = conn.execute('SELECT * FROM doctores ORDER BY nombre').fetchall()
+    doctores = repositorio.todos_los_doctores(conn)
     conn.close()
-    return jsonify([dict(d) for d in doctores])
+    return doctores
 
 
 # API: Agregar nuevo doctor
@@ -183,12 +862,10 @@ def get_todos_doctores():
 def agregar_doctor():
     data = request.json
     conn = get_db_connection()
-    conn.execute('''
-        INSERT INTO doctores (nombre, especialidad)
-        VALUES (?, ?)
-    ''', (data['nombre'], data['especialidad']))
+    repositorio.insertar_doctor(conn, data['nombre'], data['especialidad'])
     conn.commit()
     conn.close()
+    cache_resultados().invalidar_volatiles()
     return jsonify({'success': True})
 
 # API: Eliminar doctor
@@ -196,22 +873,21 @@ def agregar_doctor():
 def eliminar_doctor(doctor_id):
     conn = get_db_connection()
     
-    turnos_activos = conn.execute('''
-        SELECT COUNT(*) as count FROM turnos 
-        WHERE doctor_asignado = ? AND estado IN ("PENDIENTE", "EN_ATENCION")
-    ''', (doctor_id,)).fetchone()
+    turnos_activos = repositorio.contar_turnos_activos_doctor(conn, doctor_id)
 
-    if turnos_activos['count'] > 0:
+    if turnos_activos > 0:
         conn.close()
         return jsonify({
             'success': False, 
-            'error': f'No se puede eliminar doctor con {turnos_activos["count"]} turnos activos'
+            'error': f'No se puede eliminar doctor con {turnos_activos} turnos activos'
         })
     
     
-    conn.execute('DELETE FROM doctores WHERE id = ?', (doctor_id,))
+    repositorio.eliminar_doctor(conn, doctor_id)
+    citas.eliminar_horario(conn, doctor_id)
     conn.commit()
     conn.close()
+    cache_resultados().invalidar_volatiles()
     
     return jsonify({'success': True})
 
@@ -227,17 +903,17 @@ def doctor_login():
     
     try:
         estado = data.get('estado', 'DISPONIBLE')
-        activo = 0 if estado == 'AUSENTE' else 1
         
         # Actualizar estado del doctor
-        conn.execute('UPDATE doctores SET activo = ?, estado_detallado = ? WHERE id = ?', 
-                    (activo, estado, data['doctor_id']))
+        repositorio.cambiar_estado_doctor(conn, data['doctor_id'], estado)
+        registrar_estado_doctor(conn, data['doctor_id'], estado)
         
         # Obtener nombre del doctor para la respuesta
-        doctor = conn.execute('SELECT nombre FROM doctores WHERE id = ?', (data['doctor_id'],)).fetchone()
+        doctor = repositorio.obtener_doctor(conn, data['doctor_id'])
         
         conn.commit()
         conn.close()
+        cache_resultados().invalidar_volatiles()
         
         return jsonify({
             'success': True, 
@@ -256,18 +932,14 @@ def doctor_dashboard():
 @app.route('/api/doctor/turnos')
 def get_turnos_doctor():
     doctor_id = request.args.get('doctor_id')
+    return jsonify(cache_resultados().obtener(('doctor_turnos', doctor_id),
+                                            lambda: consultar_turnos_doctor(doctor_id), TTL_LECTURAS))
+
+def consultar_turnos_doctor(doctor_id):
     conn = get_db_connection()
-    
-    turnos = conn.execute('''
-        SELECT t.*, e.nombre as estacion_actual_nombre
-        FROM turnos t
-        LEFT JOIN estaciones e ON t.estacion_actual = e.id
-        WHERE t.doctor_asignado = ? AND t.estado = "PENDIENTE"
-        ORDER BY t.timestamp_creacion ASC
-    ''', (doctor_id,)).fetchall()
-    
+    turnos = repositorio.pendientes_de_doctor(conn, doctor_id)
     conn.close()
-    return jsonify([dict(turno) for turno in turnos])
+    return [dict(turno) for turno in turnos]
 
 # API para llamar siguiente paciente
 @app.route('/api/doctor/llamar-siguiente', methods=['POST'])
@@ -278,27 +950,18 @@ def llamar_siguiente_paciente():
     conn = get_db_connection()
     
     # Obtener el siguiente turno en cola para este doctor
-    turno = conn.execute('''
-        SELECT t.*, e.nombre as estacion_actual_nombre
-        FROM turnos t
-        LEFT JOIN estaciones e ON t.estacion_actual = e.id
-        WHERE t.doctor_asignado = ? AND t.estado = "PENDIENTE"
-        ORDER BY t.timestamp_creacion ASC
-        LIMIT 1
-    ''', (doctor_id,)).fetchone()
+    siguientes = repositorio.pendientes_de_doctor(conn, doctor_id, limite=1)
     
-    if not turno:
+    if not siguientes:
         conn.close()
         return jsonify({'success': False, 'error': 'No hay pacientes en espera'})
     
     # Actualizar estado del turno a "EN_ATENCION"
-    conn.execute('''
-        UPDATE turnos 
-        SET estado = "EN_ATENCION", timestamp_atencion = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (turno['id'],))
+    turno = siguientes[0]
+    repositorio.iniciar_atencion(conn, turno['id'])
     
     conn.commit()
+    invalidar_cache_turno(conn, turno['id'])
     conn.close()
     
     return jsonify({
@@ -315,17 +978,13 @@ def cambiar_estado_doctor():
     
     conn = get_db_connection()
     
-    # Convertir estado a valor activo/inactivo
-    activo = 0 if estado == 'AUSENTE' else 1
-    
-    conn.execute('''
-        UPDATE doctores 
-        SET activo = ?, estado_detallado= ?
-        WHERE id = ?
-    ''', (activo, estado, doctor_id))
+    # AUSENTE deja al doctor inactivo
+    repositorio.cambiar_estado_doctor(conn, doctor_id, estado)
+    registrar_estado_doctor(conn, doctor_id, estado)
     
     conn.commit()
     conn.close()
+    cache_resultados().invalidar_volatiles()
     
     return jsonify({'success': True})
 
@@ -341,29 +1000,21 @@ def finalizar_consulta():
     conn = get_db_connection()
     
     # Mapear destino a estación
-    destinos = {
-        'FARMACIA': 5,
-        'ASESORIA_VISUAL': 6,
-        'ESTUDIOS_ESPECIALES': 7,
-        'SALIDA': 8
-    }
+    estacion_destino = DESTINOS_ESTACION.get(destino, ESTACION_SALIDA)  # Por defecto salida
     
-    estacion_destino = destinos.get(destino, 8)  # Por defecto salida
+    turno = repositorio.obtener_turno(conn, turno_id)
     
     # Actualizar turno
-    conn.execute('''
-        UPDATE turnos 
-        SET estado = "FINALIZADO", 
-            estacion_actual = ?,
-            tiempo_total = CAST((julianday('now') - julianday(timestamp_atencion)) * 24 * 60 AS INTEGER)
-        WHERE id = ?
-    ''', (estacion_destino, turno_id))
+    repositorio.finalizar_turno(conn, turno_id, estacion_destino)
     
     # Registrar en historial
-    registrar_historial(turno_id, 'FINALIZADO', 
-                       f'Destino: {destino}, Vuelve: {vuelve_conmigo}, Notas: {notas}')
+    registrar_historial(turno_id, 'FINALIZADO', notas,
+                        doctor_id=turno['doctor_asignado'] if turno else None,
+                        estacion_origen=ESTACION_CONSULTA, estacion_destino=estacion_destino,
+                        banderas=BANDERA_VUELVE_CONMIGO if vuelve_conmigo else 0, conn=conn)
     
     conn.commit()
+    invalidar_cache_turno(conn, turno_id)
     conn.close()
     
     return jsonify({'success': True})
@@ -381,33 +1032,21 @@ def notificar_recepcion():
             if not data.get(field):
                 return jsonify({'success': False, 'error': f'Campo requerido: {field}'}), 400
         
-        notificacion = {
-            'id': len(notificaciones_recepcion) + 1,
-            'doctor_id': data['doctor_id'],
-            'doctor_nombre': data['doctor_nombre'],
-            'consultorio': data.get('consultorio', 'No especificado'),
-            'mensaje': data['mensaje'],
-            'timestamp': datetime.now().isoformat(),
-            'leida': False,
-            'tipo': 'CONSULTORIO_RECEPCION'
-        }
-        
-        # Guardar notificación
-        notificaciones_recepcion.append(notificacion)
-        
-        # Mantener solo las últimas 50 notificaciones
-        if len(notificaciones_recepcion) > 50:
-            notificaciones_recepcion.pop(0)
+        # Guardar notificación (se conservan las últimas 50) y registrarla en el historial
+        conn = get_db_connection()
+        notificacion = repositorio.insertar_notificacion(conn, data['doctor_id'], data['doctor_nombre'],
+                                                         data.get('consultorio', 'No especificado'),
+                                                         data['mensaje'])
+        registrar_historial(None, 'NOTIFICACION_RECEPCION', data['mensaje'],
+                            doctor_id=data['doctor_id'], conn=conn)
+        conn.commit()
+        conn.close()
         
         print(f"🔔 NUEVA NOTIFICACIÓN - Doctor: {data['doctor_nombre']}")
         print(f"📝 Mensaje: {data['mensaje']}")
         print(f"⏰ Hora: {notificacion['timestamp']}")
         print("-" * 50)
         
-        # Registrar en historial del sistema
-        registrar_historial(0, 'NOTIFICACION_RECEPCION', 
-                           f"Doctor: {data['doctor_nombre']} - {data['mensaje']}")
-        
         return jsonify({
             'success': True, 
             'message': 'Notificación enviada correctamente',
@@ -422,19 +1061,10 @@ def notificar_recepcion():
 @app.route('/api/recepcion/notificaciones')
 def obtener_notificaciones_recepcion():
     try:
-        # Devolver notificaciones no leídas primero
-        notificaciones_ordenadas = sorted(
-            [n for n in notificaciones_recepcion if not n['leida']],
-            key=lambda x: x['timestamp'],
-            reverse=True
-        )
-        
-        # Agregar algunas notificaciones leídas recientes
-        notificaciones_leidas = sorted(
-            [n for n in notificaciones_recepcion if n['leida']],
-            key=lambda x: x['timestamp'],
-            reverse=True
-        )[:5]  # Máximo 5 notificaciones leídas
+        # No leídas primero, seguidas de hasta 5 leídas recientes
+        conn = get_db_connection()
+        notificaciones_ordenadas, notificaciones_leidas = repositorio.notificaciones_recientes(conn)
+        conn.close()
         
         todas_notificaciones = notificaciones_ordenadas + notificaciones_leidas
         
@@ -452,10 +1082,12 @@ def obtener_notificaciones_recepcion():
 @app.route('/api/recepcion/notificaciones/<int:notificacion_id>/leer', methods=['PUT'])
 def marcar_notificacion_leida(notificacion_id):
     try:
-        for notificacion in notificaciones_recepcion:
-            if notificacion['id'] == notificacion_id:
-                notificacion['leida'] = True
-                return jsonify({'success': True})
+        conn = get_db_connection()
+        encontrada = repositorio.marcar_notificacion_leida(conn, notificacion_id)
+        conn.commit()
+        conn.close()
+        if encontrada:
+            return jsonify({'success': True})
         
         return jsonify({'success': False, 'error': 'Notificación no encontrada'}), 404
         
@@ -467,11 +1099,11 @@ def marcar_notificacion_leida(notificacion_id):
 @app.route('/api/recepcion/notificaciones/limpiar-todas', methods=['DELETE'])
 def limpiar_todas_notificaciones():
     try:
-        # Contar cuántas se van a eliminar
-        cantidad_eliminadas = len(notificaciones_recepcion)
-        
-        # Limpiar todas las notificaciones
-        notificaciones_recepcion.clear()
+        # Limpiar todas las notificaciones contando cuántas había
+        conn = get_db_connection()
+        cantidad_eliminadas = repositorio.eliminar_notificaciones(conn)
+        conn.commit()
+        conn.close()
         
         print(f"🗑️ Se limpiaron {cantidad_eliminadas} notificaciones")
         return jsonify({
@@ -488,16 +1120,16 @@ def limpiar_todas_notificaciones():
 @app.route('/api/recepcion/notificaciones/<int:notificacion_id>', methods=['DELETE'])
 def eliminar_notificacion(notificacion_id):
     try:
-        # Buscar la notificación
-        for i, notificacion in enumerate(notificaciones_recepcion):
-            if notificacion['id'] == notificacion_id:
-                # Eliminar la notificación
-                notificacion_eliminada = notificaciones_recepcion.pop(i)
-                print(f"🗑️ Notificación eliminada: {notificacion_eliminada['mensaje']}")
-                return jsonify({
-                    'success': True, 
-                    'message': 'Notificación eliminada'
-                })
+        conn = get_db_connection()
+        notificacion_eliminada = repositorio.eliminar_notificacion(conn, notificacion_id)
+        conn.commit()
+        conn.close()
+        if notificacion_eliminada:
+            print(f"🗑️ Notificación eliminada: {notificacion_eliminada['mensaje']}")
+            return jsonify({
+                'success': True, 
+                'message': 'Notificación eliminada'
+            })
         
         return jsonify({'success': False, 'error': 'Notificación no encontrada'}), 404
         
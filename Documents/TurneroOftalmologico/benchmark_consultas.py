@@ -0,0 +1,357 @@
+# benchmark_consultas.py
+import argparse
+import inspect
+import json
+import os
+import statistics
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import almacen
+import citas
+import estadisticas
+import reloj
+import repositorio
+import utilizacion
+from database import aplicar_migraciones
+from estadisticas import (registrar_historial, registrar_historial_lote, obtener_historial,
+                          calcular_estadisticas_dia, calcular_estadisticas_mensual)
+from generar_datos import generar_datos
+from utilizacion import (registrar_estado_doctor, calcular_utilizacion_dia, guardar_utilizacion_dia,
+                         obtener_utilizacion_mensual)
+
+DIRECTORIO_DATOS = 'bench_data'
+TAMANOS = [10000, 100000, 1000000]
+REPETICIONES = 5
+
+# Tablas que crecen con el uso; un SCAN sobre ellas en una consulta caliente es un error
+TABLAS_GRANDES = {'turnos', 't', 'historial_turnos', 'h'}
+
+# Las bases generadas no traen agenda: se le arma una a este doctor con una cita hoy y otra mañana
+DOCTOR_AGENDA = 1
+OTROS_DOCTORES = [2, 3]
+HORARIO_AGENDA = [{'dia_semana': dia, 'hora_inicio': '08:00', 'hora_fin': '14:00', 'duracion_minutos': 20}
+                  for dia in range(7)]
+
+# Módulos con el SQL de la aplicación. Cada función pública que recibe conn tiene que
+# ejecutarse en alguna operación del catálogo o figurar en SIN_MEDIR con su motivo.
+MODULOS = (repositorio, citas, estadisticas, utilizacion)
+SIN_MEDIR = {
+    'repositorio.todos_los_turnos': 'solo limpiar_turnos.py',
+    'repositorio.eliminar_todos_los_turnos': 'solo limpiar_turnos.py',
+    'repositorio.todas_las_estaciones': 'solo ver_estaciones.py',
+    'repositorio.nombres_de_tablas': 'solo ver_bd.py',
+    'repositorio.filas_de_tabla': 'solo ver_bd.py (lee tablas completas a propósito)',
+}
+
+# Recorridos completos aceptados en consultas calientes, {operación: motivo}. El benchmark
+# los reporta pero no falla por ellos; al indexar una consulta hay que sacarla de aquí.
+# turnos_activos estuvo aquí hasta idx_turnos_activos (índice parcial, ver database.py).
+SCANS_CONOCIDOS = {}
+
+def _hoy():
+    return reloj.hoy()
+
+def _dia(fecha, dias):
+    return (datetime.strptime(fecha, '%Y-%m-%d') + timedelta(days=dias)).strftime('%Y-%m-%d')
+
+# Catálogo de operaciones: (nombre, operación, caliente). Cada operación llama a las mismas
+# funciones que usa app.py, así las sentencias medidas son las del código y no una copia.
+# Las calientes se ejecutan en cada carga de pantalla o en cada turno nuevo.
+OPERACIONES = [
+    # Turnos
+    ('turnos_activos', lambda conn, d: repositorio.turnos_activos(conn), True),
+    ('obtener_turno', lambda conn, d: repositorio.obtener_turno(conn, d['turno']), True),
+    ('turnos_lote', lambda conn, d: repositorio.turnos_por_ids(conn, d['lote']), True),
+    ('fechas_lote', lambda conn, d: repositorio.fechas_de_turnos(conn, d['lote']), True),
+    ('cola_estacion', lambda conn, d: repositorio.cola_estacion(
+        conn, 5, ('PENDIENTE', 'EN_ATENCION', 'FINALIZADO'), d['hoy']), True),
+    ('cola_doctor', lambda conn, d: repositorio.pendientes_de_doctor(conn, DOCTOR_AGENDA), True),
+    ('siguiente_paciente', lambda conn, d: repositorio.pendientes_de_doctor(conn, DOCTOR_AGENDA, limite=1), True),
+    ('carga_doctores', lambda conn, d: repositorio.contar_pendientes(conn, OTROS_DOCTORES), True),
+    ('turnos_activos_doctor', lambda conn, d: repositorio.contar_turnos_activos_doctor(conn, DOCTOR_AGENDA), False),
+    ('ultimo_turno_hoy', lambda conn, d: repositorio.siguiente_numero_del_dia(conn, d['hoy']), True),
+    ('insertar_turno', lambda conn, d: repositorio.insertar_turno(
+        conn, 'A999', 'Benchmark', 40, 'CITA', 4, DOCTOR_AGENDA, d['hoy'], 9), True),
+    ('editar_turno', lambda conn, d: repositorio.editar_turno(
+        conn, d['turno'], 'Benchmark', 41, 'CITA', 4, DOCTOR_AGENDA), True),
+    ('cancelar_turno', lambda conn, d: repositorio.cancelar_turnos(conn, [d['turno']], 'Benchmark'), True),
+    ('mover_turnos', lambda conn, d: repositorio.mover_turnos(
+        conn, [(turno_id, 5, DOCTOR_AGENDA) for turno_id in d['lote']]), True),
+    ('reasignar_turnos', lambda conn, d: repositorio.reasignar_turnos(
+        conn, [(turno_id, OTROS_DOCTORES[0]) for turno_id in d['lote']]), True),
+    ('iniciar_consulta', lambda conn, d: repositorio.iniciar_atencion(conn, d['turno']), True),
+    ('finalizar_consulta', lambda conn, d: repositorio.finalizar_turno(conn, d['turno'], 8), True),
+
+    # Doctores y estaciones
+    ('doctores_activos', lambda conn, d: repositorio.doctores_activos(conn), True),
+    ('doctores_todos', lambda conn, d: repositorio.todos_los_doctores(conn), True),
+    ('obtener_doctor', lambda conn, d: repositorio.obtener_doctor(conn, DOCTOR_AGENDA), True),
+    ('nombres_doctores', lambda conn, d: repositorio.nombres_de_doctores(
+        conn, [DOCTOR_AGENDA] + OTROS_DOCTORES), False),
+    ('cambiar_estado_doctor', lambda conn, d: (
+        repositorio.cambiar_estado_doctor(conn, DOCTOR_AGENDA, 'EN_CONSULTA'),
+        registrar_estado_doctor(conn, DOCTOR_AGENDA, 'EN_CONSULTA')), True),
+    ('insertar_doctor', lambda conn, d: repositorio.insertar_doctor(conn, 'Dr. Benchmark', 'General'), False),
+    ('eliminar_doctor', lambda conn, d: (
+        repositorio.eliminar_doctor(conn, DOCTOR_AGENDA),
+        citas.eliminar_horario(conn, DOCTOR_AGENDA)), False),
+    ('estaciones', lambda conn, d: repositorio.estaciones_excepto(conn, (1, 8)), True),
+    ('obtener_estacion', lambda conn, d: repositorio.obtener_estacion(conn, 5), True),
+
+    # Notificaciones
+    ('insertar_notificacion', lambda conn, d: repositorio.insertar_notificacion(
+        conn, DOCTOR_AGENDA, 'Dr. Benchmark', 'Consultorio 1', 'Benchmark'), True),
+    ('notificaciones_recientes', lambda conn, d: repositorio.notificaciones_recientes(conn), True),
+    ('marcar_notificacion_leida', lambda conn, d: repositorio.marcar_notificacion_leida(conn, 1), True),
+    ('eliminar_notificacion', lambda conn, d: repositorio.eliminar_notificacion(conn, 1), False),
+    ('eliminar_notificaciones', lambda conn, d: repositorio.eliminar_notificaciones(conn), False),
+
+    # Historial
+    ('registrar_historial', lambda conn, d: registrar_historial(
+        d['turno'], 'FINALIZADO', doctor_id=DOCTOR_AGENDA, estacion_origen=4, estacion_destino=8,
+        conn=conn), True),
+    ('registrar_historial_lote', lambda conn, d: registrar_historial_lote(conn, [
+        {'turno_id': turno_id, 'accion': 'MOVIDO', 'doctor_id': DOCTOR_AGENDA} for turno_id in d['lote']]), True),
+    ('historial_turno', lambda conn, d: obtener_historial(turno_id=d['turno'], conn=conn), True),
+    ('historial_doctor', lambda conn, d: obtener_historial(
+        doctor_id=DOCTOR_AGENDA, desde=d['inicio_mes'], hasta=d['manana'], conn=conn), True),
+    ('historial_rango', lambda conn, d: obtener_historial(
+        accion='CANCELADO', desde=d['inicio_mes'], hasta=d['manana'], conn=conn), True),
+
+    # Agenda de citas
+    ('horario_doctor', lambda conn, d: citas.obtener_horario(conn, DOCTOR_AGENDA), False),
+    ('guardar_horario', lambda conn, d: citas.guardar_horario(conn, DOCTOR_AGENDA, HORARIO_AGENDA), False),
+    ('disponibilidad_rango', lambda conn, d: citas.buscar_disponibilidad(conn, d['hoy'], _dia(d['hoy'], 30)), True),
+    ('reservar_cita', lambda conn, d: citas.reservar_cita(
+        conn, DOCTOR_AGENDA, d['manana'], '08:20', 'Benchmark'), True),
+    ('importar_citas', lambda conn, d: citas.importar_citas(conn, [
+        {'doctor_id': DOCTOR_AGENDA, 'fecha': d['manana'], 'hora': '08:40', 'paciente_nombre': 'Benchmark'}]), False),
+    ('cancelar_cita', lambda conn, d: citas.cancelar_cita(conn, d['cita_manana']), True),
+    ('citas_dia', lambda conn, d: citas.citas_del_dia(conn, d['hoy']), True),
+    ('llegada_cita', lambda conn, d: (
+        citas.cita_para_llegada(conn, d['cita_hoy']),
+        citas.marcar_llegada(conn, d['cita_hoy'], d['turno'])), True),
+
+    # Estadísticas y utilización (las de estadisticas.py abren su propia conexión con almacen)
+    ('estadisticas_dia', lambda conn, d: calcular_estadisticas_dia(d['hoy']), True),
+    ('estadisticas_mes', lambda conn, d: calcular_estadisticas_mensual(), True),
+    ('utilizacion_dia', lambda conn, d: calcular_utilizacion_dia(conn, d['hoy']), False),
+    ('guardar_utilizacion', lambda conn, d: guardar_utilizacion_dia(
+        conn, d['ayer'], calcular_utilizacion_dia(conn, d['ayer'])), False),
+    ('utilizacion_mes', lambda conn, d: obtener_utilizacion_mensual(), False),
+]
+
+# Sentencias y funciones vistas durante la primera ejecución de cada operación
+_sentencias = None
+_funciones = None
+
+class ConexionRegistrada(sqlite3.Connection):
+    """Conexión que anota (sql, parámetros) de cada sentencia mientras hay un registro abierto"""
+
+    def execute(self, sql, parametros=()):
+        if _sentencias is not None:
+            _sentencias.append((sql, parametros))
+        return super().execute(sql, parametros)
+
+    def executemany(self, sql, filas):
+        filas = list(filas)
+        if _sentencias is not None and filas:
+            _sentencias.append((sql, filas[0]))
+        return super().executemany(sql, filas)
+
+def _anotar_llamada(frame, evento, argumento):
+    if evento == 'call':
+        modulo = frame.f_globals.get('__name__')
+        if modulo in _funciones:
+            _funciones[modulo].add(frame.f_code.co_name)
+
+@contextmanager
+def registrar():
+    """Junta las sentencias ejecutadas y las funciones de MODULOS llamadas dentro del bloque"""
+    global _sentencias, _funciones
+    _sentencias, _funciones = [], {modulo.__name__: set() for modulo in MODULOS}
+    sentencias, funciones = _sentencias, _funciones
+    sys.setprofile(_anotar_llamada)
+    try:
+        yield sentencias, funciones
+    finally:
+        sys.setprofile(None)
+        _sentencias = _funciones = None
+
+def funciones_con_sql():
+    """Nombres 'modulo.funcion' de las funciones públicas de MODULOS que reciben conn"""
+    nombres = set()
+    for modulo in MODULOS:
+        for nombre, funcion in inspect.getmembers(modulo, inspect.isfunction):
+            if (funcion.__module__ == modulo.__name__ and not nombre.startswith('_')
+                    and 'conn' in inspect.signature(funcion).parameters):
+                nombres.add(f'{modulo.__name__}.{nombre}')
+    return nombres
+
+def _es_consulta(sql):
+    return sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+def plan_de_consulta(conn, sql, parametros):
+    return [fila[3] for fila in conn.execute(f'EXPLAIN QUERY PLAN {sql}', parametros).fetchall()]
+
+def indices_parciales(conn):
+    """Índices con WHERE: recorrerlos solo lee las filas que cumplen su condición"""
+    return {fila['name'] for fila in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")}
+
+def es_scan_completo(plan, parciales=()):
+    """True si el plan recorre completa alguna de las tablas grandes"""
+    for detalle in plan:
+        partes = detalle.split()
+        if len(partes) >= 2 and partes[0] == 'SCAN' and partes[1] in TABLAS_GRANDES:
+            if 'INDEX' in partes and partes[partes.index('INDEX') + 1] in parciales:
+                continue
+            return True
+    return False
+
+def medir_operacion(conn, operacion, datos, repeticiones=REPETICIONES):
+    """(tiempo mediano en ms, sentencias, funciones llamadas).
+
+    Cada ejecución corre dentro de un savepoint que se deshace; la primera
+    solo registra qué se ejecutó y no entra en la medición.
+    """
+    tiempos = []
+    for repeticion in range(repeticiones + 1):
+        conn.execute('SAVEPOINT benchmark')
+        try:
+            if repeticion == 0:
+                with registrar() as (sentencias, funciones):
+                    operacion(conn, datos)
+            else:
+                inicio = time.perf_counter()
+                operacion(conn, datos)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            conn.execute('ROLLBACK TO benchmark')
+            conn.execute('RELEASE benchmark')
+    return statistics.median(tiempos), sentencias, funciones
+
+def preparar_agenda(conn):
+    """Horario de DOCTOR_AGENDA con una cita reservada hoy y otra mañana"""
+    if citas.obtener_horario(conn, DOCTOR_AGENDA):
+        return
+    hoy = _hoy()
+    citas.guardar_horario(conn, DOCTOR_AGENDA, HORARIO_AGENDA)
+    # La de hoy se reserva como si fuera medianoche, así existe aunque las 08:00 ya pasaron
+    citas.reservar_cita(conn, DOCTOR_AGENDA, hoy, '08:00', 'Benchmark hoy',
+                        ahora=datetime.strptime(hoy, '%Y-%m-%d'))
+    citas.reservar_cita(conn, DOCTOR_AGENDA, _dia(hoy, 1), '08:00', 'Benchmark mañana')
+    conn.commit()
+
+def datos_de_referencia(conn):
+    """Ids y fechas existentes en la base con los que se arman las operaciones"""
+    hoy = _hoy()
+    lote = [fila['id'] for fila in conn.execute('SELECT id FROM turnos ORDER BY id DESC LIMIT 3')]
+
+    def cita(fecha):
+        return conn.execute('SELECT id FROM citas WHERE doctor_id = ? AND fecha = ? AND estado = ?',
+                            (DOCTOR_AGENDA, fecha, citas.RESERVADA)).fetchone()['id']
+
+    return {
+        'hoy': hoy,
+        'ayer': _dia(hoy, -1),
+        'manana': _dia(hoy, 1),
+        'inicio_mes': hoy[:8] + '01',
+        'turno': lote[0],
+        'lote': lote,
+        'cita_hoy': cita(hoy),
+        'cita_manana': cita(_dia(hoy, 1)),
+    }
+
+def preparar_base(tamano, semilla):
+    os.makedirs(DIRECTORIO_DATOS, exist_ok=True)
+    ruta = os.path.join(DIRECTORIO_DATOS, f'turnos_{tamano}_{semilla}_{_hoy()}.db')
+    if not os.path.exists(ruta):
+        print(f"🔄 Generando {tamano} turnos en {ruta}...")
+        generar_datos(ruta, tamano, semilla=semilla)
+    else:
+        # Una base generada con un esquema anterior recibe las columnas e índices nuevos
+        aplicar_migraciones(ruta)
+    return ruta
+
+def ejecutar_benchmark(tamanos, semilla=42):
+    resultados = []
+    regresiones = []
+    llamadas = set()
+
+    for tamano in tamanos:
+        # Todas las conexiones, también las que abren estadisticas.py y utilizacion.py, se registran
+        destino = almacen.AlmacenArchivo(preparar_base(tamano, semilla))
+        destino.fabrica = ConexionRegistrada
+        almacen.configurar(destino)
+        conn = destino.conectar()
+        preparar_agenda(conn)
+        datos = datos_de_referencia(conn)
+        parciales = indices_parciales(conn)
+
+        print(f"\n📊 {tamano} turnos")
+        print("-" * 70)
+        for nombre, operacion, caliente in OPERACIONES:
+            ms, sentencias, funciones = medir_operacion(conn, operacion, datos)
+            llamadas.update(f'{modulo}.{funcion}' for modulo, nombres in funciones.items() for funcion in nombres)
+
+            detalle = []
+            vistas = set()
+            for sql, parametros in sentencias:
+                if not _es_consulta(sql) or sql in vistas:
+                    continue
+                vistas.add(sql)
+                plan = plan_de_consulta(conn, sql, parametros)
+                detalle.append({'sql': ' '.join(sql.split()), 'plan': plan,
+                                'scan_completo': es_scan_completo(plan, parciales)})
+            scan = any(s['scan_completo'] for s in detalle)
+
+            marca = ''
+            if scan and caliente and nombre not in SCANS_CONOCIDOS:
+                marca = '❌ SCAN'
+                regresiones.append((tamano, nombre))
+            elif scan:
+                marca = '⚠️ scan'
+            print(f"   {nombre:26} {ms:10.2f} ms  {marca}")
+
+            resultados.append({
+                'tamano': tamano,
+                'operacion': nombre,
+                'caliente': caliente,
+                'mediana_ms': round(ms, 3),
+                'scan_completo': scan,
+                'sentencias': detalle
+            })
+        conn.close()
+
+    sin_medir = sorted(funciones_con_sql() - llamadas - set(SIN_MEDIR))
+    return resultados, regresiones, sin_medir
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Micro-benchmark de las consultas SQL del turnero')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', default=os.path.join(DIRECTORIO_DATOS, 'resultados.json'))
+    args = parser.parse_args()
+
+    resultados, regresiones, sin_medir = ejecutar_benchmark(args.tamanos, args.semilla)
+
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados y planes guardados en {args.salida}")
+
+    if sin_medir:
+        print("\n💥 Funciones con SQL que ninguna operación del catálogo ejecuta:")
+        for nombre in sin_medir:
+            print(f"   {nombre}")
+    if regresiones:
+        print("\n💥 Consultas calientes con recorrido completo:")
+        for tamano, nombre in regresiones:
+            print(f"   {nombre} ({tamano} turnos)")
+    if sin_medir or regresiones:
+        sys.exit(1)
+    print("✅ Ninguna consulta caliente nueva recorre tablas completas")
@@ -0,0 +1,128 @@
+# cache.py
+import threading
+import time
+from collections import OrderedDict
+
+class _Calculo:
+    """Cálculo en curso compartido por las peticiones que piden la misma clave"""
+
+    def __init__(self, volatil):
+        self.volatil = volatil
+        self.evento = threading.Event()
+        self.valor = None
+        self.error = None
+        self.invalidado = False
+
+class CacheResultados:
+    """Cache LRU de resultados con expiración opcional y cálculo compartido.
+
+    Las entradas con ttl=None no expiran; las demás se descartan al expirar.
+    Las volátiles (por defecto, las que tienen ttl) además se descartan
+    cuando una escritura llama a invalidar_volatiles. Un periodo cerrado se
+    guarda con ttl y volatil=False: no lo invalida cada escritura del día,
+    pero una corrección hecha por otro proceso se ve al expirar.
+    Si varias peticiones piden la misma clave a la vez, solo la primera
+    calcula y las demás esperan su resultado.
+
+    Solo se guarda lo que calcular() devuelve: si falla debe lanzar la
+    excepción, no devolver un valor de reemplazo, o ese valor quedaría en
+    la cache (hasta que expire).
+    """
+
+    def __init__(self, max_entradas=256):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # clave -> (valor, expira_en o None, volatil)
+        self._en_curso = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.compartidos = 0
+        self.descartados = 0
+
+    def obtener(self, clave, calcular, ttl=None, volatil=None):
+        if volatil is None:
+            volatil = ttl is not None
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                valor, expira_en, _ = entrada
+                if expira_en is None or expira_en > time.monotonic():
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._entradas[clave]
+
+            calculo = self._en_curso.get(clave)
+            if calculo is not None:
+                self.compartidos += 1
+                propio = False
+            else:
+                calculo = _Calculo(volatil)
+                self._en_curso[clave] = calculo
+                self.fallos += 1
+                propio = True
+
+        if not propio:
+            calculo.evento.wait()
+            if calculo.error is not None:
+                raise calculo.error
+            return calculo.valor
+
+        try:
+            calculo.valor = calcular()
+        except Exception as e:
+            calculo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+                if calculo.error is None and not calculo.invalidado:
+                    self._guardar(clave, calculo.valor, ttl, volatil)
+            calculo.evento.set()
+
+        return calculo.valor
+
+    def _guardar(self, clave, valor, ttl, volatil):
+        expira_en = time.monotonic() + ttl if ttl is not None else None
+        self._entradas[clave] = (valor, expira_en, volatil)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.descartados += 1
+
+    def invalidar(self, *claves):
+        """Descarta claves concretas, aunque no tengan expiración"""
+        with self._lock:
+            for clave in claves:
+                self._entradas.pop(clave, None)
+                if clave in self._en_curso:
+                    self._en_curso[clave].invalidado = True
+
+    def invalidar_volatiles(self):
+        """Descarta todas las entradas volátiles (datos del día en curso)"""
+        with self._lock:
+            for clave in [c for c, (_, _, volatil) in self._entradas.items() if volatil]:
+                del self._entradas[clave]
+            for calculo in self._en_curso.values():
+                if calculo.volatil:
+                    calculo.invalidado = True
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            for calculo in self._en_curso.values():
+                calculo.invalidado = True
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos + self.compartidos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'en_curso': len(self._en_curso),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'compartidos': self.compartidos,
+                'descartados': self.descartados,
+                'tasa_aciertos': ((self.aciertos + self.compartidos) / consultas * 100) if consultas > 0 else 0
+            }
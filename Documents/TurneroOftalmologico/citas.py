@@ -0,0 +1,319 @@
+# citas.py
+import almacen
+import reloj
+import argparse
+import csv
+import io
+import sqlite3
+from datetime import datetime, timedelta
+
+# Un día de agenda es un entero de 64 bits con un bit por horario libre
+MAX_HORARIOS_DIA = 63
+MAX_DIAS_BUSQUEDA = 92
+
+RESERVADA = 'RESERVADA'
+PRESENTE = 'PRESENTE'
+CANCELADA = 'CANCELADA'
+
+def get_db_connection():
+    return almacen.conectar()
+
+class ErrorCita(Exception):
+    pass
+
+def _minutos(hora):
+    horas, minutos = hora.split(':')
+    return int(horas) * 60 + int(minutos)
+
+def _hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+def _fecha(texto):
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ErrorCita(f'Fecha inválida: {texto}')
+
+def horas_del_dia(bloques):
+    """Horas de inicio de cada turno de agenda a partir de los bloques de un día"""
+    horas = []
+    for bloque in sorted(bloques, key=lambda b: b['hora_inicio']):
+        inicio, fin = _minutos(bloque['hora_inicio']), _minutos(bloque['hora_fin'])
+        while inicio + bloque['duracion_minutos'] <= fin:
+            horas.append(_hora(inicio))
+            inicio += bloque['duracion_minutos']
+    return horas
+
+def cargar_horarios(conn, doctor_id=None):
+    """{(doctor_id, dia_semana): [horas]} de todos los doctores con horario o de uno"""
+    condicion, parametros = ('WHERE doctor_id = ?', (doctor_id,)) if doctor_id is not None else ('', ())
+    bloques = {}
+    for fila in conn.execute(f'SELECT * FROM horarios_doctor {condicion}', parametros):
+        bloques.setdefault((fila['doctor_id'], fila['dia_semana']), []).append(fila)
+    return {clave: horas_del_dia(lista) for clave, lista in bloques.items()}
+
+def obtener_horario(conn, doctor_id):
+    return [dict(fila) for fila in conn.execute('''
+        SELECT dia_semana, hora_inicio, hora_fin, duracion_minutos FROM horarios_doctor
+        WHERE doctor_id = ? ORDER BY dia_semana, hora_inicio
+    ''', (doctor_id,))]
+
+def guardar_horario(conn, doctor_id, bloques):
+    """Reemplaza el horario semanal de un doctor.
+
+    Cada bloque es {dia_semana (0 = lunes), hora_inicio, hora_fin, duracion_minutos}.
+    La disponibilidad ya calculada desde hoy se descarta y se vuelve a armar
+    con el horario nuevo la próxima vez que se consulte.
+    """
+    filas = []
+    for bloque in bloques:
+        try:
+            dia = int(bloque['dia_semana'])
+            inicio, fin = _minutos(bloque['hora_inicio']), _minutos(bloque['hora_fin'])
+            duracion = int(bloque['duracion_minutos'])
+        except (KeyError, TypeError, ValueError):
+            raise ErrorCita(f'Bloque de horario inválido: {bloque}')
+        if not 0 <= dia <= 6 or duracion <= 0 or not 0 <= inicio < fin <= 24 * 60:
+            raise ErrorCita(f'Bloque de horario inválido: {bloque}')
+        filas.append((doctor_id, dia, _hora(inicio), _hora(fin), duracion))
+
+    for dia in range(7):
+        horas = horas_del_dia([{'hora_inicio': f[2], 'hora_fin': f[3], 'duracion_minutos': f[4]}
+                               for f in filas if f[1] == dia])
+        if len(horas) != len(set(horas)):
+            raise ErrorCita('Hay bloques superpuestos en el mismo día')
+        if len(horas) > MAX_HORARIOS_DIA:
+            raise ErrorCita(f'Máximo {MAX_HORARIOS_DIA} turnos de agenda por día')
+
+    conn.execute('DELETE FROM horarios_doctor WHERE doctor_id = ?', (doctor_id,))
+    conn.executemany('''
+        INSERT INTO horarios_doctor (doctor_id, dia_semana, hora_inicio, hora_fin, duracion_minutos)
+        VALUES (?, ?, ?, ?, ?)
+    ''', filas)
+    conn.execute('DELETE FROM disponibilidad_dia WHERE doctor_id = ? AND fecha >= ?',
+                 (doctor_id, reloj.hoy()))
+
+def eliminar_horario(conn, doctor_id):
+    conn.execute('DELETE FROM horarios_doctor WHERE doctor_id = ?', (doctor_id,))
+    conn.execute('DELETE FROM disponibilidad_dia WHERE doctor_id = ?', (doctor_id,))
+
+def materializar_disponibilidad(conn, desde, hasta, horarios, doctor_id=None):
+    """Calcula los mapas de bits de los días del rango que todavía no están guardados"""
+    doctores = sorted({d for d, _ in horarios if doctor_id is None or d == doctor_id})
+    if not doctores:
+        return 0
+
+    condicion, parametros = ('AND doctor_id = ?', (doctor_id,)) if doctor_id is not None else ('', ())
+    guardados = {(fila['doctor_id'], fila['fecha']) for fila in conn.execute(f'''
+        SELECT doctor_id, fecha FROM disponibilidad_dia WHERE fecha BETWEEN ? AND ? {condicion}
+    ''', (desde.isoformat(), hasta.isoformat()) + parametros)}
+
+    faltantes = []
+    dia = desde
+    while dia <= hasta:
+        faltantes.extend((d, dia) for d in doctores if (d, dia.isoformat()) not in guardados)
+        dia += timedelta(days=1)
+    if not faltantes:
+        return 0
+
+    reservadas = {}
+    for fila in conn.execute(f'''
+        SELECT doctor_id, fecha, hora FROM citas
+        WHERE fecha BETWEEN ? AND ? AND estado != '{CANCELADA}' {condicion}
+    ''', (desde.isoformat(), hasta.isoformat()) + parametros):
+        reservadas.setdefault((fila['doctor_id'], fila['fecha']), set()).add(fila['hora'])
+
+    filas = []
+    for doctor, dia in faltantes:
+        ocupadas = reservadas.get((doctor, dia.isoformat()), set())
+        libres = 0
+        for indice, hora in enumerate(horarios.get((doctor, dia.weekday()), [])):
+            if hora not in ocupadas:
+                libres |= 1 << indice
+        filas.append((doctor, dia.isoformat(), libres))
+
+    conn.executemany('INSERT OR IGNORE INTO disponibilidad_dia (doctor_id, fecha, libres) VALUES (?, ?, ?)', filas)
+    return len(filas)
+
+def buscar_disponibilidad(conn, desde, hasta=None, doctor_id=None, ahora=None):
+    """Horarios libres por doctor y día entre dos fechas (AAAA-MM-DD).
+
+    Los días sin calcular se arman una vez y quedan guardados; después cada
+    búsqueda es una lectura por rango de disponibilidad_dia y decodificar bits.
+    """
+    ahora = ahora or reloj.ahora()
+    desde = max(_fecha(desde), ahora.date())
+    hasta = _fecha(hasta) if hasta else desde
+    if (hasta - desde).days >= MAX_DIAS_BUSQUEDA:
+        raise ErrorCita(f'El rango de búsqueda no puede superar {MAX_DIAS_BUSQUEDA} días')
+    if hasta < desde:
+        return []
+
+    horarios = cargar_horarios(conn, doctor_id)
+    materializar_disponibilidad(conn, desde, hasta, horarios, doctor_id)
+
+    condicion, parametros = ('AND d.doctor_id = ?', (doctor_id,)) if doctor_id is not None else ('', ())
+    resultado = []
+    for fila in conn.execute(f'''
+        SELECT d.doctor_id, doc.nombre as doctor_nombre, d.fecha, d.libres
+        FROM disponibilidad_dia d
+        JOIN doctores doc ON d.doctor_id = doc.id
+        WHERE d.fecha BETWEEN ? AND ? AND d.libres != 0 {condicion}
+        ORDER BY d.fecha, d.doctor_id
+    ''', (desde.isoformat(), hasta.isoformat()) + parametros):
+        horas_dia = horarios.get((fila['doctor_id'], _fecha(fila['fecha']).weekday()), [])
+        libres = fila['libres']
+        horas = [hora for indice, hora in enumerate(horas_dia) if libres >> indice & 1]
+        if fila['fecha'] == ahora.date().isoformat():
+            horas = [hora for hora in horas if hora > ahora.strftime('%H:%M')]
+        if horas:
+            resultado.append({'doctor_id': fila['doctor_id'], 'doctor_nombre': fila['doctor_nombre'],
+                              'fecha': fila['fecha'], 'horas': horas})
+    return resultado
+
+def _marcar(conn, doctor_id, fecha, hora, libre):
+    """Prende o apaga el bit de una hora; devuelve False si ya estaba en ese estado"""
+    horas = cargar_horarios(conn, doctor_id).get((doctor_id, _fecha(fecha).weekday()), [])
+    if hora not in horas:
+        if libre:
+            return True  # la hora quedó fuera del horario actual
+        raise ErrorCita(f'{hora} no es un horario de atención del doctor ese día')
+    bit = 1 << horas.index(hora)
+
+    if libre:
+        cursor = conn.execute('''
+            UPDATE disponibilidad_dia SET libres = libres | ?
+            WHERE doctor_id = ? AND fecha = ? AND libres & ? = 0
+        ''', (bit, doctor_id, fecha, bit))
+    else:
+        cursor = conn.execute('''
+            UPDATE disponibilidad_dia SET libres = libres & ~?
+            WHERE doctor_id = ? AND fecha = ? AND libres & ? != 0
+        ''', (bit, doctor_id, fecha, bit))
+    return cursor.rowcount == 1
+
+def reservar_cita(conn, doctor_id, fecha, hora, paciente_nombre, paciente_edad=None, telefono=None, ahora=None):
+    """Reserva un horario libre en la transacción de quien llama y devuelve el id de la cita"""
+    ahora = ahora or reloj.ahora()
+    dia = _fecha(fecha)
+    if not isinstance(doctor_id, int) or isinstance(doctor_id, bool):
+        raise ErrorCita(f'Doctor inválido: {doctor_id}')
+    if not paciente_nombre:
+        raise ErrorCita('Falta el nombre del paciente')
+    if dia < ahora.date():
+        raise ErrorCita('No se pueden reservar citas en fechas pasadas')
+    if not isinstance(hora, str) or len(hora) != 5 or hora[2] != ':':
+        raise ErrorCita(f'Hora inválida: {hora}')
+    # Igual que buscar_disponibilidad: hoy solo quedan los horarios posteriores a la hora actual
+    if dia == ahora.date() and hora <= ahora.strftime('%H:%M'):
+        raise ErrorCita(f'El horario {fecha} {hora} ya pasó')
+
+    materializar_disponibilidad(conn, dia, dia, cargar_horarios(conn, doctor_id), doctor_id)
+    if not _marcar(conn, doctor_id, fecha, hora, libre=False):
+        raise ErrorCita(f'El horario {fecha} {hora} ya está reservado')
+
+    cursor = conn.execute('''
+        INSERT INTO citas (doctor_id, fecha, hora, paciente_nombre, paciente_edad, telefono)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (doctor_id, fecha, hora, paciente_nombre, paciente_edad, telefono))
+    return cursor.lastrowid
+
+def cancelar_cita(conn, cita_id):
+    cita = conn.execute('SELECT * FROM citas WHERE id = ?', (cita_id,)).fetchone()
+    if not cita:
+        raise ErrorCita('Cita no encontrada')
+    if cita['estado'] != RESERVADA:
+        raise ErrorCita(f'La cita ya está {cita["estado"].lower()}')
+    conn.execute(f"UPDATE citas SET estado = '{CANCELADA}' WHERE id = ?", (cita_id,))
+    _marcar(conn, cita['doctor_id'], cita['fecha'], cita['hora'], libre=True)
+
+def importar_citas(conn, filas):
+    """Reserva muchas citas en la transacción de quien llama, con un resultado por fila.
+
+    Cada fila se intenta dentro de un savepoint: las que fallan no dejan
+    rastro y no impiden importar las demás.
+    """
+    resultados = []
+    for numero, fila in enumerate(filas, 1):
+        conn.execute('SAVEPOINT fila_cita')
+        try:
+            doctor_id = int(fila['doctor_id'])
+            edad = int(fila['paciente_edad']) if fila.get('paciente_edad') not in (None, '') else None
+            cita_id = reservar_cita(conn, doctor_id, fila.get('fecha'), fila.get('hora'),
+                                    fila.get('paciente_nombre'), edad, fila.get('telefono') or None)
+            conn.execute('RELEASE fila_cita')
+            resultados.append({'fila': numero, 'success': True, 'cita_id': cita_id})
+        except (ErrorCita, sqlite3.IntegrityError, KeyError, TypeError, ValueError) as e:
+            conn.execute('ROLLBACK TO fila_cita')
+            conn.execute('RELEASE fila_cita')
+            resultados.append({'fila': numero, 'success': False,
+                               'error': str(e) if isinstance(e, (ErrorCita, sqlite3.IntegrityError))
+                               else f'Fila inválida: {e}'})
+    return resultados
+
+def leer_csv(texto):
+    """Filas de un CSV con encabezado doctor_id,fecha,hora,paciente_nombre[,paciente_edad,telefono]"""
+    return list(csv.DictReader(io.StringIO(texto.lstrip('\ufeff'))))
+
+def citas_del_dia(conn, fecha, doctor_id=None, estado=None):
+    condiciones, parametros = ['c.fecha = ?'], [fecha]
+    if doctor_id is not None:
+        condiciones.append('c.doctor_id = ?')
+        parametros.append(doctor_id)
+    if estado is not None:
+        condiciones.append('c.estado = ?')
+        parametros.append(estado)
+    return [dict(fila) for fila in conn.execute(f'''
+        SELECT c.*, d.nombre as doctor_nombre, t.numero as numero_turno
+        FROM citas c
+        LEFT JOIN doctores d ON c.doctor_id = d.id
+        LEFT JOIN turnos t ON c.turno_id = t.id
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY c.hora, c.doctor_id
+    ''', parametros)]
+
+def cita_para_llegada(conn, cita_id):
+    """La cita que se va a convertir en turno; falla si no es de hoy o ya se usó"""
+    cita = conn.execute('SELECT * FROM citas WHERE id = ?', (cita_id,)).fetchone()
+    if not cita:
+        raise ErrorCita('Cita no encontrada')
+    if cita['estado'] != RESERVADA:
+        raise ErrorCita(f'La cita ya está {cita["estado"].lower()}')
+    if cita['fecha'] != reloj.hoy():
+        raise ErrorCita(f'La cita es del {cita["fecha"]}')
+    return cita
+
+def marcar_llegada(conn, cita_id, turno_id):
+    conn.execute(f'''
+        UPDATE citas SET estado = '{PRESENTE}', turno_id = ?, timestamp_llegada = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (turno_id, cita_id))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Agenda de citas del turnero')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    importar = sub.add_parser('importar', help='Reserva las citas de un CSV')
+    importar.add_argument('archivo')
+    disponibles = sub.add_parser('disponibles', help='Muestra los horarios libres')
+    disponibles.add_argument('desde')
+    disponibles.add_argument('hasta', nargs='?')
+    disponibles.add_argument('--doctor', type=int)
+    almacen.agregar_opcion_sede(parser)
+    args = parser.parse_args()
+    almacen.usar_sede_de_argumentos(parser, args)
+
+    conn = get_db_connection()
+    if args.comando == 'importar':
+        with open(args.archivo, encoding='utf-8') as archivo:
+            resultados = importar_citas(conn, leer_csv(archivo.read()))
+        conn.commit()
+        for r in resultados:
+            if not r['success']:
+                print(f"❌ Fila {r['fila']}: {r['error']}")
+        print(f"✅ {sum(r['success'] for r in resultados)} de {len(resultados)} citas importadas")
+    else:
+        dias = buscar_disponibilidad(conn, args.desde, args.hasta, args.doctor)
+        conn.commit()
+        for dia in dias:
+            print(f"📅 {dia['fecha']} {dia['doctor_nombre']}: {', '.join(dia['horas'])}")
+    conn.close()
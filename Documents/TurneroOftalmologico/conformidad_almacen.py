@@ -0,0 +1,483 @@
+# conformidad_almacen.py
+# Verifica que cada almacén de almacen.py se comporte igual: el mismo guion de
+# operaciones del repositorio debe dar los mismos resultados en disco y en memoria.
+#
+#   python conformidad_almacen.py              # archivo temporal y memoria
+#   python conformidad_almacen.py --turnos 2000
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import almacen
+import reloj
+import repositorio
+from database import completar_fecha_local
+from utilizacion import calcular_utilizacion_dia, precalcular_utilizacion
+from estadisticas import (registrar_historial, registrar_historial_lote, obtener_historial,
+                          obtener_estadisticas_dia, calcular_estadisticas_dia, EVENTOS)
+from cache import CacheResultados
+
+ESTACION_RECEPCION = 1
+ESTACION_CONSULTA = 4
+ESTACION_SALIDA = 8
+
+class FalloConformidad(Exception):
+    pass
+
+def verificar(condicion, mensaje):
+    if not condicion:
+        raise FalloConformidad(mensaje)
+
+def _nuevo_turno(conn, nombre, estacion=ESTACION_CONSULTA, doctor=None):
+    ahora = reloj.ahora()
+    fecha = ahora.strftime('%Y-%m-%d')
+    numero = repositorio.siguiente_numero_del_dia(conn, fecha)
+    turno_id = repositorio.insertar_turno(conn, numero, nombre, 40, 'CONSULTA', estacion, doctor, fecha, ahora.hour)
+    registrar_historial(turno_id, 'CREADO', doctor_id=doctor, estacion_destino=estacion, conn=conn)
+    return turno_id, numero
+
+# Cada prueba recibe una conexión sobre una base recién preparada
+
+def prueba_esquema(conn):
+    verificar(len(repositorio.estaciones_excepto(conn, (ESTACION_RECEPCION, ESTACION_SALIDA))) > 0,
+              'no hay estaciones sembradas')
+    verificar(len(repositorio.doctores_activos(conn)) >= 2, 'se esperaban al menos dos doctores activos')
+    verificar(repositorio.turnos_activos(conn) == [], 'la base nueva tiene turnos')
+
+def prueba_numeracion(conn):
+    doctor = repositorio.doctores_activos(conn)[0]['id']
+    numeros = [_nuevo_turno(conn, f'Paciente {i}', doctor=doctor)[1] for i in range(3)]
+    conn.commit()
+    verificar(numeros == ['A001', 'A002', 'A003'], f'numeración inesperada: {numeros}')
+    activos = repositorio.turnos_activos(conn)
+    verificar(len(activos) == 3 and all(t['doctor_nombre'] for t in activos), 'turnos activos sin doctor')
+
+def prueba_cancelar_y_editar(conn):
+    turno_id, _ = _nuevo_turno(conn, 'Cancelable', estacion=ESTACION_RECEPCION)
+    repositorio.editar_turno(conn, turno_id, 'Editado', 51, 'CONTROL', ESTACION_RECEPCION, None)
+    turno = repositorio.obtener_turno(conn, turno_id)
+    verificar(turno['paciente_nombre'] == 'Editado' and turno['paciente_edad'] == 51, 'la edición no se guardó')
+    repositorio.cancelar_turnos(conn, [turno_id], 'Prueba')
+    conn.commit()
+    turno = repositorio.obtener_turno(conn, turno_id)
+    verificar(turno['estado'] == 'CANCELADO' and turno['razon_cancelacion'] == 'Prueba', 'no quedó cancelado')
+    verificar(turno['timestamp_cancelado'] is not None, 'falta la hora de cancelación')
+    verificar(all(t['id'] != turno_id for t in repositorio.turnos_activos(conn)), 'sigue en la lista de activos')
+
+def prueba_mover_y_cola(conn):
+    turno_id, _ = _nuevo_turno(conn, 'Viajero', estacion=ESTACION_RECEPCION)
+    repositorio.mover_turnos(conn, [(turno_id, 5, None)])
+    conn.commit()
+    cola = repositorio.cola_estacion(conn, 5, ('PENDIENTE', 'EN_ATENCION', 'FINALIZADO'), reloj.hoy())
+    verificar([t['id'] for t in cola] == [turno_id], f'cola de la estación 5: {[t["id"] for t in cola]}')
+    verificar(repositorio.turnos_por_ids(conn, [turno_id, 999999]).keys() == {turno_id}, 'turnos_por_ids')
+    verificar(repositorio.fechas_de_turnos(conn, [turno_id, turno_id]) == [reloj.hoy()], 'fechas_de_turnos')
+
+def prueba_reasignar(conn):
+    origen, destino = [d['id'] for d in repositorio.doctores_activos(conn)[:2]]
+    ids = [_nuevo_turno(conn, f'Reasignado {i}', doctor=origen)[0] for i in range(4)]
+    verificar(repositorio.contar_pendientes(conn, [origen, destino]) == {origen: 4, destino: 0},
+              'carga inicial')
+    repositorio.reasignar_turnos(conn, [(turno_id, destino) for turno_id in ids[:3]])
+    registrar_historial_lote(conn, [{'turno_id': t, 'accion': 'REASIGNADO', 'doctor_id': destino}
+                                    for t in ids[:3]])
+    conn.commit()
+    verificar(repositorio.contar_pendientes(conn, [origen, destino]) == {origen: 1, destino: 3},
+              'carga después de reasignar')
+    pendientes = repositorio.pendientes_de_doctor(conn, destino)
+    verificar([t['id'] for t in pendientes] == ids[:3], 'orden de llegada de los pendientes')
+    verificar(len(obtener_historial(conn=conn, doctor_id=destino, accion='REASIGNADO')) == 3,
+              'eventos REASIGNADO en el historial')
+
+def prueba_atencion(conn):
+    doctor = repositorio.doctores_activos(conn)[0]['id']
+    turno_id, _ = _nuevo_turno(conn, 'Atendido', doctor=doctor)
+    siguiente = repositorio.pendientes_de_doctor(conn, doctor, limite=1)
+    verificar([t['id'] for t in siguiente] == [turno_id], 'siguiente paciente')
+    repositorio.iniciar_atencion(conn, turno_id)
+    verificar(repositorio.contar_turnos_activos_doctor(conn, doctor) == 1, 'turno en atención')
+    repositorio.finalizar_turno(conn, turno_id, ESTACION_SALIDA)
+    registrar_historial(turno_id, 'FINALIZADO', 'ok', doctor_id=doctor, estacion_origen=ESTACION_CONSULTA,
+                        estacion_destino=ESTACION_SALIDA, conn=conn)
+    conn.commit()
+    turno = repositorio.obtener_turno(conn, turno_id)
+    verificar(turno['estado'] == 'FINALIZADO' and turno['tiempo_total'] == 0, 'finalización')
+    acciones = [e['accion'] for e in obtener_historial(conn=conn, turno_id=turno_id)]
+    verificar(sorted(acciones) == ['CREADO', 'FINALIZADO'], f'historial del turno: {acciones}')
+
+def prueba_doctores(conn):
+    doctor_id = repositorio.insertar_doctor(conn, 'Dra. Conformidad', 'Retina')
+    repositorio.cambiar_estado_doctor(conn, doctor_id, 'AUSENTE')
+    conn.commit()
+    doctor = repositorio.obtener_doctor(conn, doctor_id)
+    verificar(doctor['activo'] == 0 and doctor['estado_detallado'] == 'AUSENTE', 'estado AUSENTE')
+    verificar(doctor_id not in [d['id'] for d in repositorio.doctores_activos(conn)], 'ausente sigue activo')
+    verificar(repositorio.nombres_de_doctores(conn, [doctor_id]) == {doctor_id: 'Dra. Conformidad'}, 'nombres')
+    repositorio.eliminar_doctor(conn, doctor_id)
+    conn.commit()
+    verificar(repositorio.obtener_doctor(conn, doctor_id) is None, 'el doctor no se eliminó')
+
+def prueba_notificaciones(conn):
+    for i in range(repositorio.MAX_NOTIFICACIONES + 3):
+        ultima = repositorio.insertar_notificacion(conn, 1, 'Dr. Prueba', 'Consultorio 1', f'Mensaje {i}')
+    conn.commit()
+    no_leidas, leidas = repositorio.notificaciones_recientes(conn)
+    verificar(len(no_leidas) == repositorio.MAX_NOTIFICACIONES and leidas == [], 'tope de notificaciones')
+    verificar(no_leidas[0]['id'] == ultima['id'] and no_leidas[0]['leida'] is False, 'la más nueva va primero')
+    for notificacion in no_leidas[:7]:
+        repositorio.marcar_notificacion_leida(conn, notificacion['id'])
+    verificar(not repositorio.marcar_notificacion_leida(conn, 999999), 'marcar una inexistente')
+    no_leidas, leidas = repositorio.notificaciones_recientes(conn)
+    verificar(len(leidas) == repositorio.NOTIFICACIONES_LEIDAS_VISIBLES and leidas[0]['leida'] is True,
+              'leídas visibles')
+    eliminada = repositorio.eliminar_notificacion(conn, ultima['id'])
+    verificar(eliminada['mensaje'] == ultima['mensaje'], 'eliminar una notificación')
+    verificar(repositorio.eliminar_notificacion(conn, ultima['id']) is None, 'eliminar dos veces')
+    verificar(repositorio.eliminar_notificaciones(conn) == repositorio.MAX_NOTIFICACIONES - 1, 'limpiar todas')
+    conn.commit()
+
+def prueba_fecha_local(conn):
+    turno_id, _ = _nuevo_turno(conn, 'Hoy')
+    verificar(repositorio.obtener_turno(conn, turno_id)['fecha_local'] == reloj.hoy(), 'fecha local al crear')
+    # Un turno anterior a la columna: el día se calcula desde timestamp_creacion (UTC)
+    viejo = conn.execute('''
+        INSERT INTO turnos (numero, paciente_nombre, tipo, timestamp_creacion) VALUES ('A001', 'Viejo', 'CITA', ?)
+    ''', ('2024-01-15 03:30:00',)).lastrowid
+    verificar(completar_fecha_local(conn) == 1, 'se esperaba completar un turno')
+    turno = repositorio.obtener_turno(conn, viejo)
+    esperado = reloj.desde_utc('2024-01-15 03:30:00')
+    verificar((turno['fecha_local'], turno['hora_local']) == (esperado.strftime('%Y-%m-%d'), esperado.hour),
+              f"fecha local calculada: {turno['fecha_local']} {turno['hora_local']}")
+    conn.commit()
+
+def prueba_utilizacion_zona(conn):
+    """A las 19:00 en UTC-6 la consulta cae en el día de la clínica, no en el día UTC siguiente"""
+    if reloj.ZoneInfo is None:
+        return
+    zona = reloj.ZONA_CLINICA
+    reloj.ZONA_CLINICA = reloj.ZoneInfo('America/Mexico_City')
+    try:
+        doctor = repositorio.doctores_activos(conn)[0]['id']
+        conn.execute('DELETE FROM eventos_doctor WHERE doctor_id = ?', (doctor,))
+        conn.execute("INSERT INTO eventos_doctor (doctor_id, estado, timestamp) VALUES (?, 'DISPONIBLE', ?)",
+                     (doctor, '2030-03-04 20:00:00'))
+        conn.execute('''
+            INSERT INTO turnos (numero, paciente_nombre, estado, doctor_asignado, timestamp_atencion, tiempo_total)
+            VALUES ('A001', 'Tarde', 'FINALIZADO', ?, '2030-03-05 01:00:00', 30)
+        ''', (doctor,))
+        ahora = datetime(2030, 3, 7)
+        tarde = {l['doctor_id']: l for l in calcular_utilizacion_dia(conn, '2030-03-04', ahora)}[doctor]
+        siguiente = {l['doctor_id']: l for l in calcular_utilizacion_dia(conn, '2030-03-05', ahora)}[doctor]
+        verificar(tarde['consultas'] == 1 and siguiente['consultas'] == 0, 'la consulta cayó en el día UTC')
+        verificar(tarde['segundos_ausente'] == 0 and tarde['segundos_sin_datos'] == 14 * 3600,
+                  f"antes del primer evento no hay datos: {tarde['segundos_ausente']} s ausente")
+        verificar(tarde['linea_tiempo'][-1]['fin'] == '2030-03-05 00:00:00', 'línea de tiempo en hora de la clínica')
+        conn.rollback()
+    finally:
+        reloj.ZONA_CLINICA = zona
+
+def prueba_historial_zona(conn):
+    """El rango de fechas del historial es el día de la clínica, no el día UTC"""
+    if reloj.ZoneInfo is None:
+        return
+    zona = reloj.ZONA_CLINICA
+    reloj.ZONA_CLINICA = reloj.ZoneInfo('America/Mexico_City')
+    try:
+        turno_id, _ = _nuevo_turno(conn, 'Noche')
+        conn.execute('DELETE FROM historial_turnos')
+        # 03:30 UTC del 15 son las 21:30 del 14 en la clínica
+        conn.execute('INSERT INTO historial_turnos (turno_id, evento, timestamp) VALUES (?, ?, ?)',
+                     (turno_id, EVENTOS['CANCELADO'], '2024-01-15 03:30:00'))
+        verificar(len(obtener_historial(conn=conn, desde='2024-01-14', hasta='2024-01-15')) == 1,
+                  'el evento de la noche no aparece en su día')
+        verificar(len(obtener_historial(conn=conn, desde='2024-01-15', hasta='2024-01-16')) == 0,
+                  'el evento de la noche aparece en el día UTC')
+        conn.rollback()
+    finally:
+        reloj.ZONA_CLINICA = zona
+
+def prueba_utilizacion_consultas(conn):
+    """El fin de la consulta sale del evento FINALIZADO y la consulta cuenta en el día en que empezó"""
+    if reloj.ZoneInfo is None:
+        return
+    zona = reloj.ZONA_CLINICA
+    reloj.ZONA_CLINICA = reloj.ZoneInfo('UTC')
+    try:
+        doctor = repositorio.doctores_activos(conn)[0]['id']
+        conn.execute('DELETE FROM eventos_doctor WHERE doctor_id = ?', (doctor,))
+        conn.execute("INSERT INTO eventos_doctor (doctor_id, estado, timestamp) VALUES (?, 'DISPONIBLE', ?)",
+                     (doctor, '2030-03-03 00:00:00'))
+        # Una consulta de 40 segundos (tiempo_total 0) y otra que cruza la medianoche
+        for atencion, fin in (('2030-03-04 15:00:00', '2030-03-04 15:00:40'),
+                              ('2030-03-04 23:50:00', '2030-03-05 00:20:00')):
+            turno_id = conn.execute('''
+                INSERT INTO turnos (numero, paciente_nombre, estado, doctor_asignado, timestamp_atencion, tiempo_total)
+                VALUES ('A001', 'Consulta', 'FINALIZADO', ?, ?, 0)
+            ''', (doctor, atencion)).lastrowid
+            conn.execute('INSERT INTO historial_turnos (turno_id, evento, doctor_id, timestamp) VALUES (?, ?, ?, ?)',
+                         (turno_id, EVENTOS['FINALIZADO'], doctor, fin))
+        ahora = datetime(2030, 3, 7)
+        dia = {l['doctor_id']: l for l in calcular_utilizacion_dia(conn, '2030-03-04', ahora)}[doctor]
+        siguiente = {l['doctor_id']: l for l in calcular_utilizacion_dia(conn, '2030-03-05', ahora)}[doctor]
+        verificar(dia['consultas'] == 2 and siguiente['consultas'] == 0,
+                  f"consultas por día: {dia['consultas']} y {siguiente['consultas']}")
+        verificar(dia['segundos_ocupado'] == 40 + 600 and siguiente['segundos_ocupado'] == 1200,
+                  f"tiempo ocupado: {dia['segundos_ocupado']} y {siguiente['segundos_ocupado']} s")
+        conn.rollback()
+    finally:
+        reloj.ZONA_CLINICA = zona
+
+def prueba_utilizacion_dias_vacios(conn):
+    """Un día cerrado sin actividad queda marcado y no se vuelve a calcular"""
+    verificar(precalcular_utilizacion(conn, '2001-01-01', '2001-01-03') == 3, 'no se calcularon los días')
+    verificar(precalcular_utilizacion(conn, '2001-01-01', '2001-01-03') == 0,
+              'los días sin actividad se volvieron a calcular')
+
+def prueba_rollback(conn):
+    antes = len(repositorio.turnos_activos(conn))
+    conn.execute('BEGIN IMMEDIATE')
+    _nuevo_turno(conn, 'Deshecho')
+    conn.rollback()
+    verificar(len(repositorio.turnos_activos(conn)) == antes, 'el rollback no deshizo el turno')
+
+PRUEBAS = [
+    prueba_esquema,
+    prueba_numeracion,
+    prueba_cancelar_y_editar,
+    prueba_mover_y_cola,
+    prueba_reasignar,
+    prueba_atencion,
+    prueba_doctores,
+    prueba_notificaciones,
+    prueba_fecha_local,
+    prueba_utilizacion_zona,
+    prueba_historial_zona,
+    prueba_utilizacion_consultas,
+    prueba_utilizacion_dias_vacios,
+    prueba_rollback,
+]
+
+def ejecutar_pruebas(fabrica):
+    """Corre cada prueba sobre una base nueva; devuelve [(prueba, error o None, ms)]"""
+    resultados = []
+    for prueba in PRUEBAS:
+        directorio = tempfile.mkdtemp(prefix='turnero_')
+        destino = fabrica(directorio)
+        try:
+            destino.preparar()
+            # Preparar dos veces no debe fallar ni duplicar datos
+            destino.preparar()
+            conn = destino.conectar()
+            inicio = time.perf_counter()
+            try:
+                prueba(conn)
+                error = None
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+            finally:
+                conn.close()
+            resultados.append((prueba.__name__, error, (time.perf_counter() - inicio) * 1000))
+        finally:
+            destino.cerrar()
+            shutil.rmtree(directorio, ignore_errors=True)
+    return resultados
+
+def prueba_base_original():
+    """Una base del init_db original (sin historial ni campos de tiempos) debe migrar"""
+    directorio = tempfile.mkdtemp(prefix='turnero_')
+    ruta = os.path.join(directorio, 'original.db')
+    conn = sqlite3.connect(ruta)
+    conn.executescript('''
+        CREATE TABLE doctores (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL, especialidad TEXT,
+                               activo BOOLEAN DEFAULT 0, disponible BOOLEAN DEFAULT 1);
+        CREATE TABLE estaciones (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL, descripcion TEXT);
+        CREATE TABLE turnos (id INTEGER PRIMARY KEY AUTOINCREMENT, numero TEXT NOT NULL,
+                             paciente_nombre TEXT NOT NULL, paciente_edad INTEGER, tipo TEXT DEFAULT 'CITA',
+                             estado TEXT DEFAULT 'PENDIENTE', estacion_actual INTEGER, estacion_siguiente INTEGER,
+                             doctor_asignado INTEGER, prioridad INTEGER DEFAULT 1,
+                             timestamp_creacion DATETIME DEFAULT CURRENT_TIMESTAMP, timestamp_atencion DATETIME);
+        INSERT INTO doctores (nombre, especialidad, activo) VALUES ('Dr. Original', 'Consultorio 1', 1);
+    ''')
+    conn.close()
+    destino = almacen.AlmacenArchivo(ruta)
+    try:
+        destino.preparar()
+        conn = destino.conectar()
+        try:
+            columnas = {col['name'] for col in conn.execute('PRAGMA table_info(turnos)')}
+            faltantes = {'timestamp_cancelado', 'razon_cancelacion', 'tiempo_total', 'fecha_local'} - columnas
+            verificar(not faltantes, f'columnas sin migrar: {sorted(faltantes)}')
+            _nuevo_turno(conn, 'Tras migrar')
+            conn.commit()
+            verificar(len(obtener_historial(conn=conn)) == 1, 'el historial creado al migrar no registra eventos')
+        finally:
+            conn.close()
+    finally:
+        destino.cerrar()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+def prueba_sedes():
+    """Dos sedes en memoria: cada una con sus doctores, sus turnos y sus estadísticas"""
+    sedes = almacen.EnrutadorSedes({
+        'norte': almacen.AlmacenMemoria(),
+        'sur': almacen.AlmacenMemoria(doctores=[('Dra. Sur', 'Consultorio 1', 1)]),
+    }).preparar()
+    anterior = almacen.enrutador()
+    almacen.configurar(sedes)
+    try:
+        with almacen.en_sede('norte'):
+            conn = almacen.conectar()
+            _nuevo_turno(conn, 'Norte 1')
+            _nuevo_turno(conn, 'Norte 2')
+            conn.commit()
+            conn.close()
+        with almacen.en_sede('sur'):
+            conn = almacen.conectar()
+            nombres = [d['nombre'] for d in repositorio.todos_los_doctores(conn)]
+            verificar(nombres == ['Dra. Sur'], f'la sede sur no usó sus doctores: {nombres}')
+            verificar(repositorio.turnos_activos(conn) == [], 'la sede sur ve turnos de la sede norte')
+            _, numero = _nuevo_turno(conn, 'Sur 1')
+            verificar(numero == 'A001', f'la numeración de la sede sur empezó en {numero}')
+            conn.commit()
+            conn.close()
+        verificar(almacen.sede_actual() == 'norte', 'en_sede no restauró la sede predeterminada')
+
+        totales = sedes.en_paralelo(lambda: obtener_estadisticas_dia()['total_turnos'])
+        verificar(totales == {'norte': 2, 'sur': 1}, f'estadísticas por sede: {totales}')
+        try:
+            almacen.cambiar_sede('oeste')
+            verificar(False, 'se aceptó una sede desconocida')
+        except almacen.ErrorSede:
+            pass
+    finally:
+        almacen.configurar(anterior)
+        sedes.cerrar()
+
+def prueba_cache_sin_fallos():
+    """Un cálculo que falla (p. ej. "database is locked") no debe quedar en la cache"""
+    rota = almacen.AlmacenMemoria()  # sin preparar: no tiene tablas
+    sana = almacen.AlmacenMemoria()
+    sana.preparar()
+    cache = CacheResultados()
+    anterior = almacen.enrutador()
+    try:
+        almacen.configurar(rota)
+        try:
+            cache.obtener(('estadisticas_dia', '2000-01-01'), lambda: calcular_estadisticas_dia('2000-01-01'))
+            verificar(False, 'calcular_estadisticas_dia no propagó el error de la base')
+        except sqlite3.OperationalError:
+            pass
+        almacen.configurar(sana)
+        conn = sana.conectar()
+        _nuevo_turno(conn, 'Tras el error')
+        conn.commit()
+        conn.close()
+        hoy = reloj.hoy()
+        calculos = []
+        def calcular():
+            calculos.append(1)
+            return calcular_estadisticas_dia(hoy)
+        try:
+            cache.obtener(('estadisticas_dia', hoy), lambda: 1 / 0)
+        except ZeroDivisionError:
+            pass
+        stats = cache.obtener(('estadisticas_dia', hoy), calcular)
+        verificar(calculos and stats['total_turnos'] == 1, f'se sirvió un resultado fallido de la cache: {stats}')
+    finally:
+        almacen.configurar(anterior)
+        rota.cerrar()
+        sana.cerrar()
+
+def prueba_cache_periodos_cerrados():
+    """Un periodo cerrado sobrevive a las escrituras del día pero expira (la cache es por proceso)"""
+    cache = CacheResultados()
+    valores = iter(range(10))
+    cache.obtener(('estadisticas_dia', '2000-01-01'), lambda: next(valores), 0.05, volatil=False)
+    cache.obtener(('estadisticas_dia', 'hoy'), lambda: next(valores), 60)
+    cache.invalidar_volatiles()
+    verificar(cache.obtener(('estadisticas_dia', '2000-01-01'), lambda: next(valores), 0.05, volatil=False) == 0,
+              'invalidar_volatiles descartó un periodo cerrado')
+    verificar(cache.obtener(('estadisticas_dia', 'hoy'), lambda: next(valores), 60) == 2,
+              'invalidar_volatiles no descartó lo del día')
+    time.sleep(0.06)
+    verificar(cache.obtener(('estadisticas_dia', '2000-01-01'), lambda: next(valores), 0.05, volatil=False) == 3,
+              'un periodo cerrado no expiró')
+
+# Pruebas que arman sus propias bases
+PRUEBAS_GENERALES = [
+    prueba_base_original,
+    prueba_sedes,
+    prueba_cache_sin_fallos,
+    prueba_cache_periodos_cerrados,
+]
+
+def medir_carga(destino, turnos):
+    """Crea, atiende y finaliza turnos con un commit por operación, como la API"""
+    destino.preparar()
+    conn = destino.conectar()
+    doctores = [d['id'] for d in repositorio.doctores_activos(conn)]
+    conn.close()
+    inicio = time.perf_counter()
+    for i in range(turnos):
+        conn = destino.conectar()
+        turno_id, _ = _nuevo_turno(conn, f'Carga {i}', doctor=doctores[i % len(doctores)])
+        conn.commit()
+        repositorio.iniciar_atencion(conn, turno_id)
+        conn.commit()
+        repositorio.finalizar_turno(conn, turno_id, ESTACION_SALIDA)
+        conn.commit()
+        conn.close()
+    return (time.perf_counter() - inicio) * 1000
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pruebas de conformidad de los almacenes del turnero')
+    parser.add_argument('--turnos', type=int, default=500, help='turnos de la carga de comparación (0 la omite)')
+    args = parser.parse_args()
+
+    fabricas = {
+        'archivo': lambda directorio: almacen.AlmacenArchivo(os.path.join(directorio, 'conformidad.db')),
+        'memoria': lambda directorio: almacen.AlmacenMemoria(),
+    }
+
+    fallos = 0
+    for tipo, fabrica in fabricas.items():
+        print(f"\n🗄️ Almacén {tipo}")
+        print("-" * 60)
+        for nombre, error, ms in ejecutar_pruebas(fabrica):
+            if error:
+                fallos += 1
+                print(f"   ❌ {nombre:28} {error}")
+            else:
+                print(f"   ✅ {nombre:28} {ms:8.2f} ms")
+
+    print("\n🏥 Migraciones y enrutador de sedes")
+    print("-" * 60)
+    for prueba in PRUEBAS_GENERALES:
+        inicio = time.perf_counter()
+        try:
+            prueba()
+            print(f"   ✅ {prueba.__name__:28} {(time.perf_counter() - inicio) * 1000:8.2f} ms")
+        except Exception as e:
+            fallos += 1
+            print(f"   ❌ {prueba.__name__:28} {type(e).__name__}: {e}")
+
+    if args.turnos:
+        print(f"\n⏱️ Carga de {args.turnos} turnos (crear, atender, finalizar)")
+        for tipo, fabrica in fabricas.items():
+            directorio = tempfile.mkdtemp(prefix='turnero_')
+            destino = fabrica(directorio)
+            try:
+                print(f"   {tipo:10} {medir_carga(destino, args.turnos):10.1f} ms")
+            finally:
+                destino.cerrar()
+                shutil.rmtree(directorio, ignore_errors=True)
+
+    if fallos:
+        print(f"\n💥 {fallos} pruebas fallaron")
+        sys.exit(1)
+    print("\n✅ Todos los almacenes cumplen el mismo comportamiento")
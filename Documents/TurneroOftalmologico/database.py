@@ -1,14 +1,58 @@
 # database.py
+import re
 import sqlite3
 from datetime import datetime
+from estadisticas import EVENTOS, BANDERA_VUELVE_CONMIGO
+import almacen
+import reloj
 
-def get_db_connection():
-    conn = sqlite3.connect('turnos.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+# Historial de eventos tipado: el tipo va codificado en `evento` (ver tipos_evento)
+# y `detalles` solo guarda texto libre (notas, razón, mensaje)
+ESQUEMA_HISTORIAL = '''
+    CREATE TABLE IF NOT EXISTS historial_turnos (
+        id INTEGER PRIMARY KEY,
+        turno_id INTEGER,  -- NULL para eventos sin turno (notificaciones)
+        evento INTEGER NOT NULL,
+        doctor_id INTEGER,
+        estacion_origen INTEGER,
+        estacion_destino INTEGER,
+        banderas INTEGER NOT NULL DEFAULT 0,
+        detalles TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        usuario TEXT DEFAULT 'sistema',
+        FOREIGN KEY (turno_id) REFERENCES turnos (id),
+        FOREIGN KEY (evento) REFERENCES tipos_evento (id)
+    )
+'''
+
+# Destinos que finalizar_consulta escribía como texto en el historial antiguo
+DESTINOS_HISTORIAL = {
+    'FARMACIA': 5,
+    'ASESORIA_VISUAL': 6,
+    'ESTUDIOS_ESPECIALES': 7,
+    'SALIDA': 8
+}
+
+def get_db_connection(ruta='turnos.db'):
+    """Conexión a un archivo concreto (init_db(ruta) sin conn); la aplicación usa almacen.conectar()"""
+    return almacen.AlmacenArchivo(ruta).conectar()
 
-def init_db():
-    conn = get_db_connection()
+# (nombre, especialidad, activo) de una base nueva
+DOCTORES_INICIALES = [
+    ('Dr. Ricardo', 'Consultorio 1', 1),
+    ('Dra. Tania', 'Consultorio 2', 1),
+    ('Dr. Julio', 'Consultorio 3', 1),
+    ('Dr. Eduardo', 'Consultorio 4', 1),
+    ('Dr. Eric', 'Especialista', 0),  # Inactivo por defecto
+    ('Medico Internista', 'Consultorio', 0),  # Inactivo por defecto
+    ('Dra. Carolina', 'Especialista', 0),  # Inactivo por defecto
+]
+
+def init_db(ruta='turnos.db', conn=None, doctores=None):
+    """Crea las tablas y los datos iniciales; con conn trabaja sobre esa conexión"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection(ruta)
     
     # Tabla de doctores
     conn.execute('''
@@ -68,50 +112,342 @@ def init_db():
         estaciones
     )
     
-    # Insertar doctores
-    doctores = [
-        ('Dr. Ricardo', 'Consultorio 1', 1),
-        ('Dra. Tania', 'Consultorio 2', 1),
-        ('Dr. Julio', 'Consultorio 3', 1),
-        ('Dr. Eduardo', 'Consultorio 4', 1),
-        ('Dr. Eric', 'Especialista', 0),  # Inactivo por defecto
-        ('Medico Internista', 'Consultorio', 0),  # Inactivo por defecto
-        ('Dra. Carolina', 'Especialista', 0),  # Inactivo por defecto
-    ]
-    
+    # Insertar doctores (cada sede puede traer los suyos, ver almacen.cargar_sedes)
     conn.executemany(
         'INSERT OR IGNORE INTO doctores (nombre, especialidad, activo) VALUES (?, ?, ?)',
-        doctores
+        doctores or DOCTORES_INICIALES
     )
     
     conn.commit()
-    conn.close()
 
-    # Tabla de historial para estadísticas
+    # Tabla de historial y campos de tiempos: los agrega aplicar_migraciones
+    aplicar_migraciones(conn=conn)
+    if propia:
+        conn.close()
+
+def aplicar_migraciones(ruta='turnos.db', conn=None):
+    """Aplica los cambios de esquema posteriores a init_db (idempotente)"""
+    propia = conn is None
+    if propia:
+        conn = get_db_connection(ruta)
+
+    # Campos para tiempos en la tabla turnos. Cada uno por separado: una base
+    # creada por un init_db anterior puede no tener ninguno o solo algunos
+    agregados = []
+    for columna, tipo in (('timestamp_cancelado', 'DATETIME'), ('razon_cancelacion', 'TEXT'),
+                          ('tiempo_total', 'INTEGER')):  # tiempo_total en minutos
+        try:
+            conn.execute(f'ALTER TABLE turnos ADD COLUMN {columna} {tipo}')
+            agregados.append(columna)
+        except sqlite3.OperationalError:
+            pass
+    if agregados:
+        print(f"Campos de estadísticas agregados a turnos: {', '.join(agregados)}")
+
+    # Estado detallado del doctor (antes solo lo agregaba actualizar_db.py)
+    try:
+        conn.execute('ALTER TABLE doctores ADD COLUMN estado_detallado TEXT DEFAULT "DISPONIBLE"')
+        conn.execute('UPDATE doctores SET estado_detallado = "AUSENTE" WHERE activo = 0')
+    except sqlite3.OperationalError:
+        pass
+
+    # Momento en que el turno llegó a su estación actual
+    try:
+        conn.execute('ALTER TABLE turnos ADD COLUMN timestamp_estacion DATETIME')
+        conn.execute('UPDATE turnos SET timestamp_estacion = COALESCE(timestamp_atencion, timestamp_creacion)')
+    except sqlite3.OperationalError:
+        pass
+
+    # Día y hora de la clínica en que se creó el turno (timestamp_creacion está en UTC).
+    # Las consultas por día o mes comparan esta columna en lugar de calcular DATE() por fila
+    for columna, tipo in (('fecha_local', 'TEXT'), ('hora_local', 'INTEGER')):
+        try:
+            conn.execute(f'ALTER TABLE turnos ADD COLUMN {columna} {tipo}')
+        except sqlite3.OperationalError:
+            pass
     conn.execute('''
-        CREATE TABLE IF NOT EXISTS historial_turnos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            turno_id INTEGER NOT NULL,
-            accion TEXT NOT NULL,  -- 'CREADO', 'CANCELADO', 'EDITADO', 'FINALIZADO'
-            detalles TEXT,
+        CREATE INDEX IF NOT EXISTS idx_turnos_fecha_local
+        ON turnos (fecha_local, estado, hora_local)
+    ''')
+    completar_fecha_local(conn)
+
+    # Índice para las colas por estación: cada pantalla solo lee su propia cola del día
+    conn.execute('DROP INDEX IF EXISTS idx_turnos_estacion_estado')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_turnos_estacion_fecha
+        ON turnos (estacion_actual, fecha_local, estado)
+    ''')
+
+    # Cola de cada doctor: sus pendientes por orden de llegada
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_turnos_doctor_estado
+        ON turnos (doctor_asignado, estado, timestamp_creacion)
+    ''')
+
+    # Tablero de recepción (repositorio.turnos_activos): el índice parcial solo guarda
+    # los turnos en curso, así la lista no recorre los finalizados de todos los días
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_turnos_activos
+        ON turnos (timestamp_creacion) WHERE estado != 'FINALIZADO' AND estado != 'CANCELADO'
+    ''')
+
+    migrar_historial(conn)
+
+    # Cambios de estado de los doctores y utilización diaria precalculada
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS eventos_doctor (
+            id INTEGER PRIMARY KEY,
+            doctor_id INTEGER NOT NULL,
+            estado TEXT NOT NULL,  -- DISPONIBLE, EN_CONSULTA, AUSENTE
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            usuario TEXT DEFAULT 'sistema',
+            FOREIGN KEY (doctor_id) REFERENCES doctores (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_eventos_doctor ON eventos_doctor (doctor_id, timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_eventos_doctor_fecha ON eventos_doctor (timestamp)')
+    if conn.execute('SELECT COUNT(*) FROM eventos_doctor').fetchone()[0] == 0:
+        # Punto de partida: el estado que tiene cada doctor al activar el registro
+        conn.execute('''
+            INSERT INTO eventos_doctor (doctor_id, estado)
+            SELECT id, COALESCE(estado_detallado, CASE WHEN activo = 1 THEN 'DISPONIBLE' ELSE 'AUSENTE' END)
+            FROM doctores
+        ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS utilizacion_diaria (
+            fecha DATE NOT NULL,
+            doctor_id INTEGER NOT NULL,
+            segundos_ocupado INTEGER NOT NULL,
+            segundos_libre INTEGER NOT NULL,
+            segundos_ausente INTEGER NOT NULL,
+            consultas INTEGER NOT NULL,
+            PRIMARY KEY (fecha, doctor_id)
+        ) WITHOUT ROWID
+    ''')
+    # Días ya calculados, tengan o no filas en utilizacion_diaria. No se llena con los
+    # días guardados antes: se recalculan una vez con el fin de consulta del historial
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS dias_utilizacion (
+            fecha DATE PRIMARY KEY,
+            calculado DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+
+    # Tramos de consulta por fecha de atención
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_turnos_atencion
+        ON turnos (timestamp_atencion) WHERE timestamp_atencion IS NOT NULL
+    ''')
+
+    # Agenda de citas: horario semanal, reservas y horarios libres por día (ver citas.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS horarios_doctor (
+            id INTEGER PRIMARY KEY,
+            doctor_id INTEGER NOT NULL,
+            dia_semana INTEGER NOT NULL,  -- 0 = lunes
+            hora_inicio TEXT NOT NULL,    -- HH:MM
+            hora_fin TEXT NOT NULL,
+            duracion_minutos INTEGER NOT NULL,
+            FOREIGN KEY (doctor_id) REFERENCES doctores (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_horarios_doctor ON horarios_doctor (doctor_id, dia_semana)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS citas (
+            id INTEGER PRIMARY KEY,
+            doctor_id INTEGER NOT NULL,
+            fecha DATE NOT NULL,
+            hora TEXT NOT NULL,
+            paciente_nombre TEXT NOT NULL,
+            paciente_edad INTEGER,
+            telefono TEXT,
+            estado TEXT DEFAULT 'RESERVADA',  -- RESERVADA, PRESENTE, CANCELADA
+            turno_id INTEGER,
+            timestamp_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            timestamp_llegada DATETIME,
+            FOREIGN KEY (doctor_id) REFERENCES doctores (id),
             FOREIGN KEY (turno_id) REFERENCES turnos (id)
         )
     ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_citas_horario
+        ON citas (doctor_id, fecha, hora) WHERE estado != 'CANCELADA'
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_citas_fecha ON citas (fecha, hora)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS disponibilidad_dia (
+            fecha DATE NOT NULL,
+            doctor_id INTEGER NOT NULL,
+            libres INTEGER NOT NULL,  -- bit i = i-ésimo horario del día libre
+            PRIMARY KEY (fecha, doctor_id)
+        ) WITHOUT ROWID
+    ''')
 
-    # Agregar campos para tiempos en la tabla turnos
-    try:
-        conn.execute('ALTER TABLE turnos ADD COLUMN timestamp_cancelado DATETIME')
-        conn.execute('ALTER TABLE turnos ADD COLUMN razon_cancelacion TEXT')
-        conn.execute('ALTER TABLE turnos ADD COLUMN tiempo_total INTEGER')  # en minutos
-        print("Campos de estadísticas agregados a turnos")
-    except sqlite3.OperationalError:
-        print("Campos de estadísticas ya existen")
+    # Mensajes de los consultorios a recepción (antes solo en memoria del servidor)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notificaciones (
+            id INTEGER PRIMARY KEY,
+            doctor_id INTEGER,
+            doctor_nombre TEXT,
+            consultorio TEXT,
+            mensaje TEXT NOT NULL,
+            tipo TEXT DEFAULT 'CONSULTORIO_RECEPCION',
+            leida INTEGER NOT NULL DEFAULT 0,
+            timestamp TEXT NOT NULL
+        )
+    ''')
 
     conn.commit()
-    conn.close()
+    if propia:
+        conn.close()
+
+def completar_fecha_local(conn):
+    """Calcula fecha_local y hora_local de los turnos que no las tienen"""
+    conn.create_function('utc_a_fecha_local', 1, reloj.fecha_local, deterministic=True)
+    conn.create_function('utc_a_hora_local', 1, reloj.hora_local, deterministic=True)
+    actualizados = conn.execute('''
+        UPDATE turnos
+        SET fecha_local = utc_a_fecha_local(timestamp_creacion), hora_local = utc_a_hora_local(timestamp_creacion)
+        WHERE fecha_local IS NULL AND timestamp_creacion IS NOT NULL
+    ''').rowcount
+    if actualizados:
+        print(f"Fecha local de la clínica calculada para {actualizados} turnos")
+    return actualizados
+
+def interpretar_detalles(accion, detalles):
+    """Convierte el texto libre del historial antiguo en columnas tipadas"""
+    campos = {'estacion_origen': None, 'estacion_destino': None, 'banderas': 0,
+              'detalles': None, 'doctor_nombre': None}
+    detalles = detalles or ''
+
+    if accion == 'CREADO':
+        m = re.search(r'Estación: (\d+)', detalles)
+        if m:
+            campos['estacion_destino'] = int(m.group(1))
+    elif accion == 'CANCELADO':
+        campos['detalles'] = detalles[len('Razón: '):] if detalles.startswith('Razón: ') else detalles
+    elif accion == 'FINALIZADO':
+        m = re.match(r'Destino: (\w+), Vuelve: (\w+), Notas: (.*)', detalles, re.S)
+        if m:
+            campos['estacion_origen'] = 4
+            campos['estacion_destino'] = DESTINOS_HISTORIAL.get(m.group(1), 8)
+            if m.group(2) == 'True':
+                campos['banderas'] |= BANDERA_VUELVE_CONMIGO
+            campos['detalles'] = m.group(3)
+        else:
+            campos['detalles'] = detalles
+    elif accion == 'MOVIDO':
+        m = re.search(r'Estación: (\w+) -> (\d+)', detalles)
+        if m:
+            campos['estacion_origen'] = int(m.group(1)) if m.group(1).isdigit() else None
+            campos['estacion_destino'] = int(m.group(2))
+    elif accion == 'NOTIFICACION_RECEPCION':
+        m = re.match(r'Doctor: (.*?) - (.*)', detalles, re.S)
+        if m:
+            campos['doctor_nombre'] = m.group(1)
+            campos['detalles'] = m.group(2)
+        else:
+            campos['detalles'] = detalles
+    else:
+        campos['detalles'] = detalles
+
+    campos['detalles'] = campos['detalles'] or None
+    return campos
+
+def sincronizar_tipos_evento(conn, historial_tipado=True):
+    """Deja en tipos_evento cada código de EVENTOS con su nombre.
+
+    Las acciones antiguas que no estaban en EVENTOS recibieron códigos libres
+    al migrar; si una ocupa un código que EVENTOS agregó después, se corre a
+    otro código junto con sus eventos del historial.
+    """
+    def recodificar(anterior, nuevo):
+        conn.execute('UPDATE tipos_evento SET id = ? WHERE id = ?', (nuevo, anterior))
+        if historial_tipado:
+            conn.execute('UPDATE historial_turnos SET evento = ? WHERE evento = ?', (nuevo, anterior))
+
+    for nombre, codigo in EVENTOS.items():
+        actual = conn.execute('SELECT id FROM tipos_evento WHERE nombre = ?', (nombre,)).fetchone()
+        if actual and actual[0] == codigo:
+            continue
+        ocupado = conn.execute('SELECT nombre FROM tipos_evento WHERE id = ?', (codigo,)).fetchone()
+        if ocupado:
+            libre = max(max(EVENTOS.values()), conn.execute('SELECT MAX(id) FROM tipos_evento').fetchone()[0]) + 1
+            recodificar(codigo, libre)
+        if actual:
+            recodificar(actual[0], codigo)
+        else:
+            conn.execute('INSERT INTO tipos_evento (id, nombre) VALUES (?, ?)', (codigo, nombre))
+
+def migrar_historial(conn):
+    """Pasa historial_turnos del formato de texto libre al esquema tipado"""
+    conn.execute('CREATE TABLE IF NOT EXISTS tipos_evento (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)')
+    # Las bases del init_db original pueden no tener historial: se crea ya tipado.
+    # Si existe en el formato antiguo, IF NOT EXISTS lo deja para migrarlo abajo
+    conn.execute(ESQUEMA_HISTORIAL)
+    columnas = [col[1] for col in conn.execute('PRAGMA table_info(historial_turnos)').fetchall()]
+    sincronizar_tipos_evento(conn, 'evento' in columnas)
+
+    if 'accion' in columnas:
+        doctores = {d['nombre']: d['id'] for d in conn.execute('SELECT id, nombre FROM doctores')}
+        filas = conn.execute('''
+            SELECT h.*, t.doctor_asignado
+            FROM historial_turnos h
+            LEFT JOIN turnos t ON h.turno_id = t.id
+            ORDER BY h.id
+        ''').fetchall()
+
+        nuevas = []
+        for fila in filas:
+            campos = interpretar_detalles(fila['accion'], fila['detalles'])
+            if fila['accion'] not in EVENTOS:
+                conn.execute('INSERT OR IGNORE INTO tipos_evento (nombre) VALUES (?)', (fila['accion'],))
+            evento = conn.execute('SELECT id FROM tipos_evento WHERE nombre = ?', (fila['accion'],)).fetchone()['id']
+            doctor_id = doctores.get(campos['doctor_nombre']) if campos['doctor_nombre'] else fila['doctor_asignado']
+            nuevas.append((
+                fila['id'],
+                fila['turno_id'] or None,
+                evento,
+                doctor_id,
+                campos['estacion_origen'],
+                campos['estacion_destino'],
+                campos['banderas'],
+                campos['detalles'],
+                fila['timestamp'],
+                fila['usuario']
+            ))
+
+        conn.execute('ALTER TABLE historial_turnos RENAME TO historial_turnos_antiguo')
+        conn.execute(ESQUEMA_HISTORIAL)
+        conn.executemany('''
+            INSERT INTO historial_turnos (id, turno_id, evento, doctor_id, estacion_origen,
+                                          estacion_destino, banderas, detalles, timestamp, usuario)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', nuevas)
+        conn.execute('DROP TABLE historial_turnos_antiguo')
+        print(f"Historial migrado al esquema tipado ({len(nuevas)} eventos)")
+
+    # Consultas de eventos por turno, por doctor o por rango de fechas
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_historial_turno ON historial_turnos (turno_id, timestamp)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_historial_doctor
+        ON historial_turnos (doctor_id, timestamp) WHERE doctor_id IS NOT NULL
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial_turnos (timestamp, evento)')
+
+    # Vista legible para ver_bd.py y consultas manuales
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS historial_legible AS
+        SELECT h.id, h.turno_id, te.nombre AS accion, d.nombre AS doctor,
+               h.estacion_origen, h.estacion_destino,
+               (h.banderas & 1) != 0 AS vuelve_conmigo,
+               h.detalles, h.timestamp, h.usuario
+        FROM historial_turnos h
+        JOIN tipos_evento te ON h.evento = te.id
+        LEFT JOIN doctores d ON h.doctor_id = d.id
+    ''')
 
 if __name__ == '__main__':
-    init_db()
+    # La base configurada (TURNERO_DB o cada sede): se crea si no existe o se migra
+    almacen.enrutador().preparar()
     print("Base de datos inicializada correctamente!")
\ No newline at end of file
@@ -1,27 +1,117 @@
 # estadisticas.py
-import sqlite3
-from datetime import datetime
+import almacen
+import reloj
 
 def get_db_connection():
-    conn = sqlite3.connect('turnos.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    return almacen.conectar()
 
-def registrar_historial(turno_id, accion, detalles="", usuario="sistema"):
-    """Registra una acción en el historial para estadísticas"""
+# Códigos de evento guardados en historial_turnos.evento (tabla tipos_evento)
+EVENTOS = {
+    'CREADO': 1,
+    'CANCELADO': 2,
+    'EDITADO': 3,
+    'FINALIZADO': 4,
+    'MOVIDO': 5,
+    'NOTIFICACION_RECEPCION': 6,
+    'REASIGNADO': 7
+}
+
+# Bits de historial_turnos.banderas
+BANDERA_VUELVE_CONMIGO = 1
+
+FORMATO_TIMESTAMP = '%Y-%m-%d %H:%M:%S'
+
+def _inicio_dia_utc(fecha):
+    """Medianoche del día AAAA-MM-DD de la clínica, como texto UTC comparable con h.timestamp"""
+    return reloj.limites_utc(fecha)[0].strftime(FORMATO_TIMESTAMP)
+
+def registrar_historial(turno_id, accion, detalles="", usuario="sistema", doctor_id=None,
+                        estacion_origen=None, estacion_destino=None, banderas=0, conn=None):
+    """Registra una acción en el historial para estadísticas.
+
+    Si se pasa conn, el evento se escribe en esa misma transacción y el
+    commit queda a cargo de quien llama.
+    """
     try:
-        conn = get_db_connection()
+        propia = conn is None
+        if propia:
+            conn = get_db_connection()
         conn.execute('''
-            INSERT INTO historial_turnos (turno_id, accion, detalles, usuario)
-            VALUES (?, ?, ?, ?)
-        ''', (turno_id, accion, detalles, usuario))
-        conn.commit()
-        conn.close()
+            INSERT INTO historial_turnos (turno_id, evento, doctor_id, estacion_origen,
+                                          estacion_destino, banderas, detalles, usuario)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (turno_id, EVENTOS[accion], doctor_id, estacion_origen, estacion_destino,
+              banderas, detalles or None, usuario))
+        if propia:
+            conn.commit()
+            conn.close()
         return True
     except Exception as e:
         print(f"Error en registrar_historial: {e}")
         return False
 
+def registrar_historial_lote(conn, eventos):
+    """Registra varios eventos con un solo executemany en la transacción de quien llama.
+
+    Cada evento es un dict con las claves de registrar_historial (turno_id y
+    accion obligatorias). Los errores se propagan para que quien llama
+    deshaga el lote completo.
+    """
+    conn.executemany('''
+        INSERT INTO historial_turnos (turno_id, evento, doctor_id, estacion_origen,
+                                      estacion_destino, banderas, detalles, usuario)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(e['turno_id'], EVENTOS[e['accion']], e.get('doctor_id'), e.get('estacion_origen'),
+           e.get('estacion_destino'), e.get('banderas', 0), e.get('detalles') or None,
+           e.get('usuario', 'sistema')) for e in eventos])
+
+def obtener_historial(turno_id=None, doctor_id=None, desde=None, hasta=None, accion=None, limite=500,
+                      conn=None):
+    """Eventos del historial filtrados por turno, doctor, tipo y/o rango de fechas.
+
+    desde y hasta son días AAAA-MM-DD de la clínica (hasta no se incluye);
+    h.timestamp está en UTC, así que se comparan con los límites del día en UTC.
+    """
+    condiciones = []
+    parametros = []
+    if turno_id is not None:
+        condiciones.append('h.turno_id = ?')
+        parametros.append(turno_id)
+    if doctor_id is not None:
+        condiciones.append('h.doctor_id = ?')
+        parametros.append(doctor_id)
+    if accion is not None:
+        condiciones.append('h.evento = ?')
+        parametros.append(EVENTOS[accion])
+    if desde is not None:
+        condiciones.append('h.timestamp >= ?')
+        parametros.append(_inicio_dia_utc(desde))
+    if hasta is not None:
+        condiciones.append('h.timestamp < ?')
+        parametros.append(_inicio_dia_utc(hasta))
+
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    propia = conn is None
+    if propia:
+        conn = get_db_connection()
+    eventos = conn.execute(f'''
+        SELECT h.*, te.nombre as accion
+        FROM historial_turnos h
+        JOIN tipos_evento te ON h.evento = te.id
+        {where}
+        ORDER BY h.timestamp DESC
+        LIMIT ?
+    ''', (*parametros, limite)).fetchall()
+    if propia:
+        conn.close()
+
+    resultado = []
+    for evento in eventos:
+        evento = dict(evento)
+        evento['vuelve_conmigo'] = bool(evento['banderas'] & BANDERA_VUELVE_CONMIGO)
+        resultado.append(evento)
+    return resultado
+
 def verificar_columna_existe(tabla, columna):
     """Verificacion de si una columna existe en una tabla"""
     try:
@@ -33,14 +123,13 @@ def verificar_columna_existe(tabla, columna):
     except:
         return False
 
-def obtener_estadisticas_dia(fecha=None):
-    """Se obtienen estadísticas del día especificado (u hoy)"""
+def calcular_estadisticas_dia(fecha=None):
+    """Estadísticas del día especificado (u hoy); un error de la base se propaga"""
+    if fecha is None:
+        fecha = reloj.hoy()
+
+    conn = get_db_connection()
     try:
-        if fecha is None:
-            fecha = datetime.now().strftime('%Y-%m-%d')
-        
-        conn = get_db_connection()
-        
         # Consulta básica que siempre funciona
         stats = conn.execute('''
             SELECT 
@@ -49,94 +138,121 @@ def obtener_estadisticas_dia(fecha=None):
                 SUM(CASE WHEN estado = 'FINALIZADO' THEN 1 ELSE 0 END) as finalizados,
                 SUM(CASE WHEN estado NOT IN ('CANCELADO', 'FINALIZADO') THEN 1 ELSE 0 END) as activos
             FROM turnos 
-            WHERE DATE(timestamp_creacion) = ?
+            WHERE fecha_local = ?
         ''', (fecha,)).fetchone()
-        
+
+        # Llegadas por hora de la clínica
+        por_hora = conn.execute('''
+            SELECT hora_local as hora, COUNT(*) as turnos
+            FROM turnos
+            WHERE fecha_local = ?
+            GROUP BY hora_local
+            ORDER BY hora_local
+        ''', (fecha,)).fetchall()
+
         # Solo se obtienen razones si la columna existe
         cancelaciones_por_razon = []
         if verificar_columna_existe('turnos', 'razon_cancelacion'):
             cancelaciones = conn.execute('''
                 SELECT razon_cancelacion, COUNT(*) as cantidad
                 FROM turnos 
-                WHERE DATE(timestamp_creacion) = ? AND estado = 'CANCELADO'
+                WHERE fecha_local = ? AND estado = 'CANCELADO'
                 GROUP BY razon_cancelacion
             ''', (fecha,)).fetchall()
             cancelaciones_por_razon = [dict(c) for c in cancelaciones]
-        
+    finally:
         conn.close()
-        
-        total = stats['total_turnos'] or 0
-        cancelados = stats['cancelados'] or 0
-        
-        return {
-            'fecha': fecha,
-            'total_turnos': total,
-            'cancelados': cancelados,
-            'finalizados': stats['finalizados'] or 0,
-            'activos': stats['activos'] or 0,
-            'tasa_cancelacion': (cancelados / total * 100) if total > 0 else 0,
-            'cancelaciones_por_razon': cancelaciones_por_razon
-        }
+
+    total = stats['total_turnos'] or 0
+    cancelados = stats['cancelados'] or 0
+
+    return {
+        'fecha': fecha,
+        'total_turnos': total,
+        'cancelados': cancelados,
+        'finalizados': stats['finalizados'] or 0,
+        'activos': stats['activos'] or 0,
+        'tasa_cancelacion': (cancelados / total * 100) if total > 0 else 0,
+        'cancelaciones_por_razon': cancelaciones_por_razon,
+        'turnos_por_hora': [dict(h) for h in por_hora]
+    }
+
+def obtener_estadisticas_dia(fecha=None):
+    """Se obtienen estadísticas del día especificado (u hoy); ante un error, todo en cero.
+
+    No debe pasar por CacheResultados: los ceros quedarían guardados como si
+    fueran el resultado del día. Para eso está calcular_estadisticas_dia.
+    """
+    try:
+        return calcular_estadisticas_dia(fecha)
     except Exception as e:
         print(f"Error en obtener_estadisticas_dia: {e}")
         return {
-            'fecha': fecha,
+            'fecha': fecha or reloj.hoy(),
             'total_turnos': 0,
             'cancelados': 0,
             'finalizados': 0,
             'activos': 0,
             'tasa_cancelacion': 0,
-            'cancelaciones_por_razon': []
+            'cancelaciones_por_razon': [],
+            'turnos_por_hora': []
         }
 
-def obtener_estadisticas_mensual(mes=None, año=None):
-    """Se obtienen estadísticas del mes especificado"""
+def calcular_estadisticas_mensual(mes=None, año=None):
+    """Estadísticas del mes especificado (o el actual); un error de la base se propaga"""
+    ahora = reloj.ahora()
+    if mes is None:
+        mes = ahora.month
+    if año is None:
+        año = ahora.year
+    desde, hasta = reloj.rango_mes(año, mes)
+
+    conn = get_db_connection()
     try:
-        if mes is None:
-            mes = datetime.now().month
-        if año is None:
-            año = datetime.now().year
-        
-        conn = get_db_connection()
-        
         stats = conn.execute('''
             SELECT 
                 COUNT(*) as total_turnos,
                 SUM(CASE WHEN estado = 'CANCELADO' THEN 1 ELSE 0 END) as cancelados,
                 SUM(CASE WHEN estado = 'FINALIZADO' THEN 1 ELSE 0 END) as finalizados
             FROM turnos 
-            WHERE strftime('%Y-%m', timestamp_creacion) = ?
-        ''', (f'{año}-{mes:02d}',)).fetchone()
-        
+            WHERE fecha_local >= ? AND fecha_local < ?
+        ''', (desde, hasta)).fetchone()
+
         # Tendencia diaria del mes
         tendencia = conn.execute('''
             SELECT 
-                DATE(timestamp_creacion) as fecha,
+                fecha_local as fecha,
                 COUNT(*) as turnos,
                 SUM(CASE WHEN estado = 'CANCELADO' THEN 1 ELSE 0 END) as cancelados
             FROM turnos 
-            WHERE strftime('%Y-%m', timestamp_creacion) = ?
-            GROUP BY DATE(timestamp_creacion)
-            ORDER BY fecha
-        ''', (f'{año}-{mes:02d}',)).fetchall()
-        
+            WHERE fecha_local >= ? AND fecha_local < ?
+            GROUP BY fecha_local
+            ORDER BY fecha_local
+        ''', (desde, hasta)).fetchall()
+    finally:
         conn.close()
-        
-        total = stats['total_turnos'] or 0
-        cancelados = stats['cancelados'] or 0
-        
-        return {
-            'mes': f'{año}-{mes:02d}',
-            'total_turnos': total,
-            'cancelados': cancelados,
-            'finalizados': stats['finalizados'] or 0,
-            'tasa_cancelacion': (cancelados / total * 100) if total > 0 else 0,
-            'tendencia_diaria': [dict(t) for t in tendencia]
-        }
+
+    total = stats['total_turnos'] or 0
+    cancelados = stats['cancelados'] or 0
+
+    return {
+        'mes': f'{año}-{mes:02d}',
+        'total_turnos': total,
+        'cancelados': cancelados,
+        'finalizados': stats['finalizados'] or 0,
+        'tasa_cancelacion': (cancelados / total * 100) if total > 0 else 0,
+        'tendencia_diaria': [dict(t) for t in tendencia]
+    }
+
+def obtener_estadisticas_mensual(mes=None, año=None):
+    """Se obtienen estadísticas del mes especificado; ante un error, todo en cero (sin cache)"""
+    try:
+        return calcular_estadisticas_mensual(mes, año)
     except Exception as e:
         print(f"Error en obtener_estadisticas_mensual: {e}")
+        ahora = reloj.ahora()
         return {
-            'mes': f'{año}-{mes:02d}',
+            'mes': f'{año or ahora.year}-{(mes or ahora.month):02d}',
             'total_turnos': 0,
             'cancelados': 0,
             'finalizados': 0,
@@ -144,7 +260,22 @@ def obtener_estadisticas_mensual(mes=None, año=None):
             'tendencia_diaria': []
         }
 
+def sumar_estadisticas_sedes(por_sede):
+    """Totales de todas las sedes a partir de {sede_id: estadísticas del día o del mes}"""
+    campos = ['total_turnos', 'cancelados', 'finalizados']
+    if all('activos' in stats for stats in por_sede.values()):
+        campos.append('activos')
+    totales = {campo: sum(stats[campo] for stats in por_sede.values()) for campo in campos}
+    total = totales['total_turnos']
+    totales['tasa_cancelacion'] = (totales['cancelados'] / total * 100) if total > 0 else 0
+    totales['sedes'] = por_sede
+    return totales
+
 if __name__ == '__main__':
+    import argparse
+    parser = almacen.agregar_opcion_sede(argparse.ArgumentParser(description='Prueba las estadísticas'))
+    almacen.usar_sede_de_argumentos(parser, parser.parse_args())
+
     print("Probando estadísticas...")
     print("¿Columna razon_cancelacion existe?", verificar_columna_existe('turnos', 'razon_cancelacion'))
     print("Día:", obtener_estadisticas_dia())
@@ -0,0 +1,227 @@
+# generar_datos.py
+import argparse
+import os
+import random
+from datetime import date, datetime, timedelta
+
+import almacen
+from estadisticas import EVENTOS, BANDERA_VUELVE_CONMIGO
+import reloj
+
+RAZONES_CANCELACION = [
+    'Paciente no se presentó',
+    'Paciente se retiró',
+    'Reagendado',
+    'Doctor no disponible',
+    'Error de registro',
+    'No especificada'
+]
+
+DESTINOS = [
+    ('FARMACIA', 5),
+    ('ASESORIA_VISUAL', 6),
+    ('ESTUDIOS_ESPECIALES', 7),
+    ('SALIDA', 8)
+]
+
+# Doctores de init_db: los cuatro consultorios reciben casi todos los pacientes
+DOCTORES_PESOS = [(1, 30), (2, 30), (3, 25), (4, 25), (5, 4), (6, 3), (7, 3)]
+
+NOMBRES = ['María', 'José', 'Juan', 'Guadalupe', 'Francisco', 'Ana', 'Luis', 'Rosa',
+           'Carlos', 'Elena', 'Miguel', 'Laura', 'Jorge', 'Patricia', 'Pedro', 'Sofía']
+APELLIDOS = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Rodríguez',
+             'Sánchez', 'Ramírez', 'Cruz', 'Flores', 'Gómez', 'Morales', 'Vázquez']
+
+# Consultorios con jornada fija (entrada y salida registradas en eventos_doctor)
+DOCTORES_DE_PLANTA = [1, 2, 3, 4]
+
+TAMANO_LOTE = 20000
+
+def _formato(momento):
+    return momento.strftime('%Y-%m-%d %H:%M:%S')
+
+def _dias_habiles(desde, hasta):
+    """Días de lunes a sábado entre dos fechas (inclusive)"""
+    dias = []
+    dia = desde
+    while dia <= hasta:
+        if dia.weekday() < 6:
+            dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+def _turnos_del_dia(rng, dia, cantidad, siguiente_id, es_hoy, ahora):
+    """Genera las filas de turnos e historial de un día de clínica"""
+    turnos = []
+    historial = []
+    doctores, pesos = zip(*DOCTORES_PESOS)
+    inicio = datetime(dia.year, dia.month, dia.day, 8, 0)
+    segundos_jornada = 8 * 3600
+
+    llegadas = sorted(rng.randrange(segundos_jornada) for _ in range(cantidad))
+    for i, segundo in enumerate(llegadas, 1):
+        turno_id = siguiente_id + i - 1
+        creacion = inicio + timedelta(seconds=segundo)
+        if es_hoy and creacion > ahora:
+            break
+
+        tipo = 'CITA' if rng.random() < 0.7 else 'SIN_CITA'
+        doctor = rng.choices(doctores, pesos)[0]
+        atencion = None
+        cancelado = None
+        razon = None
+        tiempo_total = None
+        estacion_inicial = 4 if tipo == 'CITA' else 2
+
+        sorteo = rng.random()
+        if es_hoy and creacion > ahora - timedelta(hours=1) and sorteo < 0.6:
+            estado = 'PENDIENTE'
+            estacion = estacion_inicial
+        elif es_hoy and creacion > ahora - timedelta(hours=2) and sorteo < 0.3:
+            estado = 'EN_ATENCION'
+            estacion = 4
+            atencion = creacion + timedelta(minutes=rng.randint(5, 60))
+        elif sorteo < 0.12:
+            estado = 'CANCELADO'
+            estacion = estacion_inicial
+            cancelado = creacion + timedelta(minutes=rng.randint(1, 90))
+            razon = rng.choice(RAZONES_CANCELACION)
+        else:
+            estado = 'FINALIZADO'
+            destino, estacion = rng.choices(DESTINOS, (35, 20, 10, 35))[0]
+            atencion = creacion + timedelta(minutes=rng.randint(5, 90))
+            tiempo_total = rng.randint(5, 45)
+
+        turnos.append((
+            turno_id,
+            f'A{i:03d}',
+            f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}',
+            rng.randint(1, 95),
+            tipo,
+            estado,
+            estacion,
+            doctor if estado != 'CANCELADO' or estacion == 4 else None,
+            _formato(creacion),
+            _formato(atencion) if atencion else None,
+            _formato(cancelado) if cancelado else None,
+            razon,
+            tiempo_total,
+            _formato(atencion or cancelado or creacion),
+            # creacion se guarda como timestamp UTC: el día de la clínica sale de ahí
+            reloj.fecha_local(_formato(creacion)),
+            reloj.hora_local(_formato(creacion))
+        ))
+
+        doctor_turno = turnos[-1][7]
+        historial.append((turno_id, EVENTOS['CREADO'], doctor_turno, None, estacion_inicial, 0, None,
+                          _formato(creacion), 'sistema'))
+        if estado == 'CANCELADO':
+            historial.append((turno_id, EVENTOS['CANCELADO'], doctor_turno, estacion, None, 0, razon,
+                              _formato(cancelado), 'recepcion'))
+        elif estado == 'FINALIZADO':
+            fin = atencion + timedelta(minutes=tiempo_total)
+            banderas = BANDERA_VUELVE_CONMIGO if rng.random() < 0.1 else 0
+            historial.append((turno_id, EVENTOS['FINALIZADO'], doctor, 4, estacion, banderas, None,
+                              _formato(fin), 'sistema'))
+
+    return turnos, historial
+
+def _eventos_doctor_del_dia(rng, dia, es_hoy, ahora):
+    """Entrada y salida de los doctores de planta, con algo de variación"""
+    eventos = []
+    for doctor_id in DOCTORES_DE_PLANTA:
+        entrada = datetime(dia.year, dia.month, dia.day, 7, 45) + timedelta(minutes=rng.randint(0, 40))
+        salida = datetime(dia.year, dia.month, dia.day, 15, 30) + timedelta(minutes=rng.randint(0, 90))
+        for momento, estado in ((entrada, 'DISPONIBLE'), (salida, 'AUSENTE')):
+            if not (es_hoy and momento > ahora):
+                eventos.append((doctor_id, estado, _formato(momento)))
+    return eventos
+
+def generar_datos(ruta, total_turnos, anios=3, semilla=42, hasta=None):
+    """Llena una base de datos nueva con varios años de turnos sintéticos.
+
+    Con la misma semilla y la misma fecha final el resultado es idéntico.
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    # Un archivo propio, fuera de la configuración de la aplicación
+    destino = almacen.AlmacenArchivo(ruta)
+    destino.preparar()
+
+    rng = random.Random(semilla)
+    # Los momentos generados son UTC, igual que CURRENT_TIMESTAMP
+    ahora_utc = reloj.ahora_utc()
+    hasta = hasta or ahora_utc.date()
+    desde = hasta - timedelta(days=365 * anios)
+    dias = _dias_habiles(desde, hasta)
+    ahora = ahora_utc if hasta == ahora_utc.date() else datetime(hasta.year, hasta.month, hasta.day, 12, 0)
+
+    # Repartir el total entre los días con algo de variación diaria
+    pesos = [rng.uniform(0.6, 1.4) for _ in dias]
+    escala = total_turnos / sum(pesos)
+    cantidades = [max(1, round(p * escala)) for p in pesos]
+
+    conn = destino.conectar()
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('DELETE FROM eventos_doctor')
+
+    lote_turnos = []
+    lote_historial = []
+    lote_eventos_doctor = []
+    siguiente_id = 1
+    generados = 0
+
+    def volcar():
+        conn.executemany('''
+            INSERT INTO turnos (id, numero, paciente_nombre, paciente_edad, tipo, estado,
+                                estacion_actual, doctor_asignado, timestamp_creacion,
+                                timestamp_atencion, timestamp_cancelado, razon_cancelacion,
+                                tiempo_total, timestamp_estacion, fecha_local, hora_local)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', lote_turnos)
+        conn.executemany('''
+            INSERT INTO historial_turnos (turno_id, evento, doctor_id, estacion_origen, estacion_destino,
+                                          banderas, detalles, timestamp, usuario)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', lote_historial)
+        conn.executemany('''
+            INSERT INTO eventos_doctor (doctor_id, estado, timestamp) VALUES (?, ?, ?)
+        ''', lote_eventos_doctor)
+        conn.commit()
+        lote_turnos.clear()
+        lote_historial.clear()
+        lote_eventos_doctor.clear()
+
+    for dia, cantidad in zip(dias, cantidades):
+        turnos, historial = _turnos_del_dia(rng, dia, cantidad, siguiente_id, dia == hasta, ahora)
+        lote_turnos.extend(turnos)
+        lote_historial.extend(historial)
+        lote_eventos_doctor.extend(_eventos_doctor_del_dia(rng, dia, dia == hasta, ahora))
+        siguiente_id += len(turnos)
+        generados += len(turnos)
+        if len(lote_turnos) >= TAMANO_LOTE:
+            volcar()
+
+    volcar()
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+    return generados
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera una base de datos sintética de turnos')
+    parser.add_argument('ruta', help='Archivo SQLite a crear (se sobrescribe)')
+    parser.add_argument('--turnos', type=int, default=100000)
+    parser.add_argument('--anios', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--hasta', type=date.fromisoformat, default=None,
+                        help='Último día generado (AAAA-MM-DD), por defecto hoy')
+    args = parser.parse_args()
+
+    if os.path.abspath(args.ruta) == os.path.abspath('turnos.db'):
+        parser.error('No se puede sobrescribir la base de datos de producción')
+
+    print(f"🔄 Generando {args.turnos} turnos en {args.ruta}...")
+    generados = generar_datos(args.ruta, args.turnos, args.anios, args.semilla, args.hasta)
+    print(f"✅ {generados} turnos generados")
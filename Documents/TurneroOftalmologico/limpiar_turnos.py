@@ -1,18 +1,23 @@
 # limpiar_turnos.py
+import argparse
 import sqlite3
+import almacen
+import repositorio
+from respaldo import crear_respaldo
 
 def limpiar_turnos():
     try:
-        conn = sqlite3.connect('turnos.db')
-        cursor = conn.cursor()
+        # La base que usa la aplicación (TURNERO_DB o la sede predeterminada, ver almacen.py)
+        destino = almacen.actual()
+        conn = destino.conectar()
         
         print("=" * 50)
         print("🧹 LIMPIADOR DE TURNOS - TURNERO OFTALMOLÓGICO")
         print("=" * 50)
         
         # Contar turnos antes de limpiar
-        cursor.execute("SELECT COUNT(*) FROM turnos")
-        total_turnos = cursor.fetchone()[0]
+        turnos = repositorio.todos_los_turnos(conn)
+        total_turnos = len(turnos)
         
         print(f"📊 Turnos existentes: {total_turnos}")
         
@@ -24,22 +29,22 @@ def limpiar_turnos():
         # Mostrar turnos que se van a eliminar
         print("\n🎯 TURNOS QUE SE ELIMINARÁN:")
         print("-" * 40)
-        cursor.execute("SELECT id, numero, paciente_nombre FROM turnos")
-        turnos = cursor.fetchall()
         
         for turno in turnos:
-            print(f"   #{turno[0]} - {turno[1]} - {turno[2]}")
+            print(f"   #{turno['id']} - {turno['numero']} - {turno['paciente_nombre']}")
         
         # Confirmar eliminación
         print(f"\n⚠️  ¿Estás seguro de que quieres eliminar {total_turnos} turnos?")
         confirmacion = input("   Escribe 'SI' para confirmar: ")
         
         if confirmacion.upper() == 'SI':
-            # Eliminar todos los turnos
-            cursor.execute("DELETE FROM turnos")
+            # Respaldo en caliente antes de borrar, de la misma base que se va a vaciar
+            if destino.tipo == 'archivo':
+                respaldo = crear_respaldo(destino.ruta)
+                print(f"💾 Respaldo previo guardado en {respaldo['archivo']}")
             
-            # Reiniciar el contador de IDs (opcional pero recomendado)
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name='turnos'")
+            # Eliminar todos los turnos y reiniciar el contador de IDs
+            repositorio.eliminar_todos_los_turnos(conn)
             
             conn.commit()
             conn.close()
@@ -58,28 +63,24 @@ def limpiar_turnos():
 def ver_turnos_actuales():
     """Función para ver los turnos actuales"""
     try:
-        conn = sqlite3.connect('turnos.db')
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM turnos")
-        total = cursor.fetchone()[0]
+        conn = almacen.conectar()
+        turnos = repositorio.todos_los_turnos(conn)
+        conn.close()
         
-        print(f"\n📈 ESTADO ACTUAL: {total} turnos en la base de datos")
+        print(f"\n📈 ESTADO ACTUAL: {len(turnos)} turnos en la base de datos")
         
-        if total > 0:
-            cursor.execute("SELECT id, numero, paciente_nombre, estado FROM turnos")
-            turnos = cursor.fetchall()
-            
+        if turnos:
             print("🎫 TURNOS ACTUALES:")
             for turno in turnos:
-                print(f"   #{turno[0]} - {turno[1]} - {turno[2]} - Estado: {turno[3]}")
-        
-        conn.close()
+                print(f"   #{turno['id']} - {turno['numero']} - {turno['paciente_nombre']} - Estado: {turno['estado']}")
         
     except sqlite3.OperationalError:
         print("   (No se pudo verificar el estado actual)")
 
 if __name__ == '__main__':
+    parser = almacen.agregar_opcion_sede(argparse.ArgumentParser(description='Elimina todos los turnos'))
+    almacen.usar_sede_de_argumentos(parser, parser.parse_args())
+
     # Mostrar estado actual primero
     ver_turnos_actuales()
     
@@ -94,4 +95,4 @@ if __name__ == '__main__':
     
     # Mostrar estado final
     print("\n" + "=" * 50)
-    ver_turnos_actuales()
\ No newline at end of file
+    ver_turnos_actuales()
@@ -0,0 +1,312 @@
+# perfilado.py
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import request
+
+UMBRAL_LENTO_MS = 500       # peticiones más lentas se guardan solas; 0 lo desactiva
+MAX_CAPTURAS = 50           # capturas que conserva el anillo (las viejas se descartan)
+MAX_SENTENCIAS = 200        # sentencias SQL por captura
+MAX_TEXTO_SQL = 500         # caracteres de cada sentencia guardada
+FUNCIONES_RESUMEN = 25      # filas del resumen de cProfile
+
+CABECERA_PERFIL = 'X-Perfilar'
+PARAMETRO_PERFIL = 'perfilar'
+
+# Registro de la petición en curso; cada hilo del servidor atiende una a la vez
+_local = threading.local()
+
+class RegistroPeticion:
+    """Sentencias SQL y tiempos de una petición mientras se atiende"""
+
+    __slots__ = ('sentencias', 'omitidas', 'sql_ms', 'inicio', 'perfil', 'motivo')
+
+    def __init__(self, motivo=None):
+        self.sentencias = []
+        self.omitidas = 0
+        self.sql_ms = 0.0
+        self.inicio = time.perf_counter()
+        self.perfil = None
+        self.motivo = motivo
+
+    def anotar(self, sql, ms):
+        """Agrega una sentencia y devuelve su posición (None si ya no entran más)"""
+        self.sql_ms += ms
+        if len(self.sentencias) < MAX_SENTENCIAS:
+            self.sentencias.append([sql, ms])
+            return len(self.sentencias) - 1
+        self.omitidas += 1
+        return None
+
+    def sumar(self, indice, ms):
+        """Suma a una sentencia ya anotada el tiempo de leer sus filas"""
+        self.sql_ms += ms
+        if indice is not None:
+            self.sentencias[indice][1] += ms
+
+def _registro_actual():
+    return getattr(_local, 'registro', None)
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que anota su sentencia y le suma el tiempo de leer las filas.
+
+    SQLite recorre la consulta a medida que se piden filas, así que en un
+    SELECT casi todo el trabajo cae en fetchone/fetchall o en la iteración
+    y no en execute. Las lecturas se miden solo dentro de la petición que
+    ejecutó la sentencia.
+    """
+
+    _registro = None
+    _indice = None
+
+    def execute(self, sql, parametros=()):
+        registro = self._registro = _registro_actual()
+        if registro is None:
+            return super().execute(sql, parametros)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._indice = registro.anotar(sql, (time.perf_counter() - inicio) * 1000)
+
+    def executemany(self, sql, filas):
+        registro = self._registro = _registro_actual()
+        if registro is None:
+            return super().executemany(sql, filas)
+        filas = list(filas)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, filas)
+        finally:
+            self._indice = registro.anotar(f'{sql} [x{len(filas)}]', (time.perf_counter() - inicio) * 1000)
+
+    def _leer(self, lectura, *argumentos):
+        registro = self._registro
+        if registro is None or registro is not _registro_actual():
+            return lectura(*argumentos)
+        inicio = time.perf_counter()
+        try:
+            return lectura(*argumentos)
+        finally:
+            registro.sumar(self._indice, (time.perf_counter() - inicio) * 1000)
+
+    def fetchone(self):
+        return self._leer(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._leer(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._leer(super().fetchall)
+
+    def __next__(self):
+        return self._leer(super().__next__)
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexión que anota cada sentencia en el registro de la petición en curso.
+
+    Sus cursores son CursorMedido, también los que devuelve execute(). Fuera
+    de una petición registrada se comporta como sqlite3.Connection; el costo
+    es una búsqueda en threading.local por sentencia y una llamada más por
+    fila leída. La espera por bloqueos (timeout) queda dentro del tiempo de
+    BEGIN, de la escritura o del COMMIT que la sufrió.
+    """
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        # sqlite3.Connection.execute crea un Cursor común sin pasar por cursor()
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, filas):
+        return self.cursor().executemany(sql, filas)
+
+    def commit(self):
+        registro = _registro_actual()
+        if registro is None:
+            return super().commit()
+        inicio = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            registro.anotar('COMMIT', (time.perf_counter() - inicio) * 1000)
+
+def _compactar(sql):
+    texto = ' '.join(sql.split())
+    return texto if len(texto) <= MAX_TEXTO_SQL else texto[:MAX_TEXTO_SQL] + '…'
+
+def _ruta_sin_token():
+    """Ruta con su query string, sin el parámetro que puede llevar el token"""
+    argumentos = [f'{clave}={valor}' for clave, valor in request.args.items(multi=True)
+                  if clave != PARAMETRO_PERFIL]
+    return request.path + ('?' + '&'.join(argumentos) if argumentos else '')
+
+def _resumen_perfil(perfil):
+    salida = io.StringIO()
+    estadisticas = pstats.Stats(perfil, stream=salida)
+    estadisticas.strip_dirs().sort_stats('cumulative').print_stats(FUNCIONES_RESUMEN)
+    return salida.getvalue()
+
+def _leer_float(variable, defecto):
+    valor = os.environ.get(variable)
+    return float(valor) if valor not in (None, '') else defecto
+
+class PerfiladorPeticiones:
+    """Perfilado bajo demanda y captura de peticiones lentas.
+
+    - Una petición con la cabecera X-Perfilar o el parámetro ?perfilar=
+      (con el token de administración) se perfila completa con cProfile.
+    - Con muestreo > 0 se perfila además esa fracción de las peticiones.
+    - Toda petición que tarde más que umbral_ms se guarda con sus sentencias
+      SQL y sus tiempos, aunque no se haya perfilado.
+
+    Las capturas viven en un anillo en memoria de max_capturas elementos.
+    Sin token configurado no hay perfilado manual ni acceso a las capturas:
+    remote_addr no prueba nada detrás de un proxy en el mismo equipo.
+    """
+
+    def __init__(self, umbral_ms=UMBRAL_LENTO_MS, muestreo=0.0, token=None, max_capturas=MAX_CAPTURAS):
+        self.umbral_ms = umbral_ms
+        self.muestreo = muestreo
+        self.token = token
+        self._capturas = deque(maxlen=max_capturas)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.perfiladas = 0
+        self.lentas = 0
+
+    @classmethod
+    def desde_entorno(cls):
+        return cls(umbral_ms=_leer_float('TURNERO_UMBRAL_LENTO_MS', UMBRAL_LENTO_MS),
+                   muestreo=_leer_float('TURNERO_MUESTREO_PERFIL', 0.0),
+                   token=os.environ.get('TURNERO_TOKEN_ADMIN') or None)
+
+    @property
+    def activo(self):
+        """False si no hay nada que capturar: así ni siquiera se miden las sentencias"""
+        return bool(self.umbral_ms) or self.muestreo > 0 or self.token is not None
+
+    def es_administrador(self):
+        if self.token is None:
+            return False
+        return (request.headers.get(CABECERA_PERFIL) == self.token
+                or request.args.get(PARAMETRO_PERFIL) == self.token
+                or request.headers.get('X-Token-Admin') == self.token)
+
+    def _motivo_perfil(self):
+        if request.headers.get(CABECERA_PERFIL) or request.args.get(PARAMETRO_PERFIL):
+            return 'manual' if self.es_administrador() else None
+        if self.muestreo > 0 and random.random() < self.muestreo:
+            return 'muestreo'
+        return None
+
+    def iniciar(self):
+        """before_request: empieza a registrar la petición y, si corresponde, a perfilarla"""
+        registro = RegistroPeticion(self._motivo_perfil())
+        if registro.motivo:
+            registro.perfil = cProfile.Profile()
+            registro.perfil.enable()
+        _local.registro = registro
+
+    def terminar(self, respuesta):
+        """after_request: guarda la captura si la petición se perfiló o fue lenta"""
+        registro = _registro_actual()
+        _local.registro = None
+        if registro is None:
+            return respuesta
+        if registro.perfil is not None:
+            registro.perfil.disable()
+
+        duracion_ms = (time.perf_counter() - registro.inicio) * 1000
+        lenta = bool(self.umbral_ms) and duracion_ms >= self.umbral_ms
+        if registro.motivo or lenta:
+            captura_id = self._guardar(registro, respuesta, duracion_ms, registro.motivo or 'lenta')
+            respuesta.headers['X-Perfil-Id'] = str(captura_id)
+        return respuesta
+
+    def descartar(self, error=None):
+        """teardown_request: suelta el registro si after_request no llegó a correr"""
+        registro = _registro_actual()
+        _local.registro = None
+        if registro is not None and registro.perfil is not None:
+            registro.perfil.disable()
+
+    def _guardar(self, registro, respuesta, duracion_ms, motivo):
+        captura = {
+            'id': next(self._ids),
+            'motivo': motivo,
+            'metodo': request.method,
+            'ruta': _ruta_sin_token(),
+            'endpoint': request.endpoint,
+            'estado': respuesta.status_code,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'duracion_ms': round(duracion_ms, 2),
+            'sql_ms': round(registro.sql_ms, 2),
+            'sql_total': len(registro.sentencias) + registro.omitidas,
+            'sql_omitidas': registro.omitidas,
+            'sentencias': [{'sql': _compactar(sql), 'ms': round(ms, 3)} for sql, ms in registro.sentencias],
+            'perfil': None,
+            '_pstats': None
+        }
+        if registro.perfil is not None:
+            # pstats.Stats se queda con perfil.stats, así que el .prof se serializa antes
+            registro.perfil.create_stats()
+            captura['_pstats'] = marshal.dumps(registro.perfil.stats)
+            captura['perfil'] = _resumen_perfil(registro.perfil)
+
+        with self._lock:
+            self._capturas.append(captura)
+            if registro.perfil is not None:
+                self.perfiladas += 1
+            if motivo == 'lenta':
+                self.lentas += 1
+        print(f"🐢 Captura {captura['id']} ({motivo}): {captura['metodo']} {captura['ruta']} "
+              f"{captura['duracion_ms']} ms, SQL {captura['sql_ms']} ms en {captura['sql_total']} sentencias")
+        return captura['id']
+
+    def listar(self):
+        """Resumen de las capturas, de la más nueva a la más vieja"""
+        with self._lock:
+            capturas = list(self._capturas)
+        campos = ('id', 'motivo', 'metodo', 'ruta', 'estado', 'fecha', 'duracion_ms', 'sql_ms', 'sql_total')
+        return [dict({c: captura[c] for c in campos}, perfilada=captura['_pstats'] is not None)
+                for captura in reversed(capturas)]
+
+    def obtener(self, captura_id):
+        with self._lock:
+            for captura in self._capturas:
+                if captura['id'] == captura_id:
+                    return captura
+        return None
+
+    def limpiar(self):
+        with self._lock:
+            cantidad = len(self._capturas)
+            self._capturas.clear()
+        return cantidad
+
+    def estado(self):
+        return {
+            'activo': self.activo,
+            'umbral_ms': self.umbral_ms,
+            'muestreo': self.muestreo,
+            'con_token': self.token is not None,
+            'capturas': len(self._capturas),
+            'max_capturas': self._capturas.maxlen,
+            'perfiladas': self.perfiladas,
+            'lentas': self.lentas
+        }
+
+def sin_binarios(captura):
+    return {clave: valor for clave, valor in captura.items() if not clave.startswith('_')}
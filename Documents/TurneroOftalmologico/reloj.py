@@ -0,0 +1,81 @@
+# reloj.py
+# Fecha y hora de la clínica.
+#
+# SQLite guarda CURRENT_TIMESTAMP en UTC, pero el día de trabajo (la numeración
+# A001, las estadísticas diarias) es el de la clínica. TURNERO_ZONA_HORARIA
+# indica la zona IANA (por ejemplo America/Mexico_City); sin ella se usa la
+# zona del servidor.
+import os
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9: solo la zona del servidor
+    ZoneInfo = None
+
+FORMATO_FECHA = '%Y-%m-%d'
+
+def _zona_configurada():
+    nombre = os.environ.get('TURNERO_ZONA_HORARIA')
+    if not nombre:
+        return None
+    if ZoneInfo is None:
+        print(f"⚠️ TURNERO_ZONA_HORARIA={nombre} requiere Python 3.9+; se usa la zona del servidor")
+        return None
+    try:
+        return ZoneInfo(nombre)
+    except ZoneInfoNotFoundError:
+        # En Windows las zonas vienen del paquete tzdata
+        print(f"⚠️ Zona horaria desconocida: {nombre} (¿falta pip install tzdata?); se usa la zona del servidor")
+        return None
+
+ZONA_CLINICA = _zona_configurada()
+
+def ahora():
+    """Momento actual con la zona de la clínica"""
+    if ZONA_CLINICA is None:
+        return datetime.now().astimezone()
+    return datetime.now(ZONA_CLINICA)
+
+def hoy():
+    """Fecha de la clínica como AAAA-MM-DD"""
+    return ahora().strftime(FORMATO_FECHA)
+
+def desde_utc(texto):
+    """Convierte un CURRENT_TIMESTAMP de SQLite (UTC) a la hora de la clínica"""
+    momento = datetime.fromisoformat(texto).replace(tzinfo=timezone.utc)
+    return momento.astimezone(ZONA_CLINICA) if ZONA_CLINICA else momento.astimezone()
+
+def fecha_local(texto):
+    return desde_utc(texto).strftime(FORMATO_FECHA) if texto else None
+
+def hora_local(texto):
+    return desde_utc(texto).hour if texto else None
+
+def rango_mes(anio, mes):
+    """(primer día, primer día del mes siguiente) para comparar con fecha_local"""
+    inicio = date(anio, mes, 1)
+    fin = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+    return inicio.strftime(FORMATO_FECHA), fin.strftime(FORMATO_FECHA)
+
+def ahora_utc():
+    """Momento actual en UTC sin zona, comparable con CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _a_utc(momento):
+    local = momento.replace(tzinfo=ZONA_CLINICA) if ZONA_CLINICA else momento.astimezone()
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+def limites_utc(fecha):
+    """(inicio, fin) del día AAAA-MM-DD de la clínica en UTC sin zona.
+
+    Con horario de verano el día puede durar 23 o 25 horas.
+    """
+    inicio = datetime.strptime(fecha, FORMATO_FECHA)
+    return _a_utc(inicio), _a_utc(inicio + timedelta(days=1))
+
+def a_local(momento):
+    """datetime UTC sin zona -> hora de la clínica sin zona"""
+    local = momento.replace(tzinfo=timezone.utc)
+    local = local.astimezone(ZONA_CLINICA) if ZONA_CLINICA else local.astimezone()
+    return local.replace(tzinfo=None)
@@ -0,0 +1,264 @@
+# repositorio.py
+# Consultas de turnos, doctores, estaciones, notificaciones y del esquema.
+#
+# Cada función recibe la conexión de quien llama y no hace commit, así una
+# operación de la API puede juntar varias en una sola transacción. La
+# conexión sale de almacen.py, que decide si la base está en disco o en memoria.
+# El historial sigue en estadisticas.py junto a los códigos de evento.
+from datetime import datetime
+
+MAX_NOTIFICACIONES = 50
+NOTIFICACIONES_LEIDAS_VISIBLES = 5
+
+def _marcas(valores):
+    return ','.join('?' * len(valores))
+
+# TURNOS
+
+def turnos_activos(conn):
+    return [dict(turno) for turno in conn.execute('''
+        SELECT t.*,
+               e.nombre as estacion_actual_nombre,
+               d.nombre as doctor_nombre
+        FROM turnos t
+        LEFT JOIN estaciones e ON t.estacion_actual = e.id
+        LEFT JOIN doctores d ON t.doctor_asignado = d.id
+        WHERE t.estado != "FINALIZADO" AND t.estado != "CANCELADO"
+        ORDER BY t.timestamp_creacion DESC
+    ''')]
+
+def obtener_turno(conn, turno_id):
+    return conn.execute('SELECT * FROM turnos WHERE id = ?', (turno_id,)).fetchone()
+
+def turnos_por_ids(conn, turno_ids):
+    """Turnos indexados por id, leídos con una sola consulta"""
+    if not turno_ids:
+        return {}
+    filas = conn.execute(f'''
+        SELECT id, numero, estado, estacion_actual, doctor_asignado FROM turnos WHERE id IN ({_marcas(turno_ids)})
+    ''', list(turno_ids)).fetchall()
+    return {fila['id']: fila for fila in filas}
+
+def fechas_de_turnos(conn, turno_ids):
+    """Días de la clínica (AAAA-MM-DD) en que se crearon un grupo de turnos"""
+    if not turno_ids:
+        return []
+    return [fila['fecha_local'] for fila in conn.execute(f'''
+        SELECT DISTINCT fecha_local FROM turnos WHERE id IN ({_marcas(turno_ids)})
+    ''', list(turno_ids)) if fila['fecha_local']]
+
+def cola_estacion(conn, estacion_id, estados, fecha):
+    """Turnos del día (fecha de la clínica) que esperan en una estación"""
+    return [dict(turno) for turno in conn.execute(f'''
+        SELECT t.*, d.nombre as doctor_nombre
+        FROM turnos t
+        LEFT JOIN doctores d ON t.doctor_asignado = d.id
+        WHERE t.estacion_actual = ? AND t.fecha_local = ? AND t.estado IN ({_marcas(estados)})
+        ORDER BY t.prioridad DESC, t.timestamp_estacion ASC
+    ''', (estacion_id, fecha, *estados))]
+
+def pendientes_de_doctor(conn, doctor_id, limite=None):
+    """Pacientes en espera de un doctor por orden de llegada"""
+    sql = '''
+        SELECT t.*, e.nombre as estacion_actual_nombre
+        FROM turnos t
+        LEFT JOIN estaciones e ON t.estacion_actual = e.id
+        WHERE t.doctor_asignado = ? AND t.estado = "PENDIENTE"
+        ORDER BY t.timestamp_creacion ASC
+    '''
+    if limite is not None:
+        return conn.execute(sql + ' LIMIT ?', (doctor_id, limite)).fetchall()
+    return conn.execute(sql, (doctor_id,)).fetchall()
+
+def contar_pendientes(conn, doctor_ids):
+    """{doctor_id: pendientes} de un grupo de doctores (los que no tienen quedan en 0)"""
+    carga = {doctor_id: 0 for doctor_id in doctor_ids}
+    carga.update({fila['doctor_asignado']: fila['cantidad'] for fila in conn.execute(f'''
+        SELECT doctor_asignado, COUNT(*) as cantidad FROM turnos
+        WHERE doctor_asignado IN ({_marcas(doctor_ids)}) AND estado = 'PENDIENTE'
+        GROUP BY doctor_asignado
+    ''', list(doctor_ids))})
+    return carga
+
+def contar_turnos_activos_doctor(conn, doctor_id):
+    return conn.execute('''
+        SELECT COUNT(*) as count FROM turnos
+        WHERE doctor_asignado = ? AND estado IN ("PENDIENTE", "EN_ATENCION")
+    ''', (doctor_id,)).fetchone()['count']
+
+def siguiente_numero_del_dia(conn, fecha):
+    """Número de turno que sigue en el día de la clínica: A001, A002, ..."""
+    ultimo_turno = conn.execute(
+        'SELECT numero FROM turnos WHERE fecha_local = ? ORDER BY id DESC LIMIT 1',
+        (fecha,)
+    ).fetchone()
+    if ultimo_turno:
+        # Extraer número del formato A001, A002, etc.
+        return f"A{int(ultimo_turno['numero'][1:]) + 1:03d}"
+    return "A001"
+
+def insertar_turno(conn, numero, paciente_nombre, paciente_edad, tipo, estacion_actual, doctor_asignado,
+                   fecha_local, hora_local):
+    cursor = conn.execute('''
+        INSERT INTO turnos (numero, paciente_nombre, paciente_edad, tipo, estacion_actual, doctor_asignado,
+                            timestamp_estacion, fecha_local, hora_local)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
+    ''', (numero, paciente_nombre, paciente_edad, tipo, estacion_actual, doctor_asignado, fecha_local, hora_local))
+    return cursor.lastrowid
+
+def editar_turno(conn, turno_id, paciente_nombre, paciente_edad, tipo, estacion_actual, doctor_asignado):
+    conn.execute('''
+        UPDATE turnos
+        SET paciente_nombre = ?, paciente_edad = ?, tipo = ?, estacion_actual = ?, doctor_asignado = ?,
+            timestamp_estacion = CASE WHEN estacion_actual IS ? THEN timestamp_estacion ELSE CURRENT_TIMESTAMP END
+        WHERE id = ?
+    ''', (paciente_nombre, paciente_edad, tipo, estacion_actual, doctor_asignado, estacion_actual, turno_id))
+
+def todos_los_turnos(conn):
+    return conn.execute('SELECT id, numero, paciente_nombre, estado FROM turnos ORDER BY id').fetchall()
+
+def eliminar_todos_los_turnos(conn):
+    """Vacía turnos y reinicia su contador de ids; devuelve cuántos se borraron"""
+    eliminados = conn.execute('DELETE FROM turnos').rowcount
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'turnos'")
+    return eliminados
+
+def cancelar_turnos(conn, turno_ids, razon):
+    conn.executemany('''
+        UPDATE turnos
+        SET estado = "CANCELADO", timestamp_cancelado = CURRENT_TIMESTAMP, razon_cancelacion = ?
+        WHERE id = ?
+    ''', [(razon, turno_id) for turno_id in turno_ids])
+
+def mover_turnos(conn, movimientos):
+    """movimientos: [(turno_id, estacion_destino, doctor_asignado)]"""
+    conn.executemany('''
+        UPDATE turnos
+        SET estacion_actual = ?, doctor_asignado = ?, timestamp_estacion = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', [(estacion, doctor, turno_id) for turno_id, estacion, doctor in movimientos])
+
+def reasignar_turnos(conn, cambios):
+    """cambios: [(turno_id, doctor_destino)]"""
+    conn.executemany('UPDATE turnos SET doctor_asignado = ? WHERE id = ?',
+                     [(doctor, turno_id) for turno_id, doctor in cambios])
+
+def iniciar_atencion(conn, turno_id):
+    conn.execute('''
+        UPDATE turnos
+        SET estado = "EN_ATENCION", timestamp_atencion = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (turno_id,))
+
+def finalizar_turno(conn, turno_id, estacion_destino):
+    conn.execute('''
+        UPDATE turnos
+        SET estado = "FINALIZADO",
+            estacion_actual = ?,
+            timestamp_estacion = CURRENT_TIMESTAMP,
+            tiempo_total = CAST((julianday('now') - julianday(timestamp_atencion)) * 24 * 60 AS INTEGER)
+        WHERE id = ?
+    ''', (estacion_destino, turno_id))
+
+# DOCTORES
+
+def doctores_activos(conn):
+    return [dict(d) for d in conn.execute('SELECT * FROM doctores WHERE activo = 1')]
+
+def todos_los_doctores(conn):
+    return [dict(d) for d in conn.execute('SELECT * FROM doctores ORDER BY nombre')]
+
+def obtener_doctor(conn, doctor_id):
+    return conn.execute('SELECT * FROM doctores WHERE id = ?', (doctor_id,)).fetchone()
+
+def nombres_de_doctores(conn, doctor_ids):
+    """{id: nombre} de los doctores que existen entre doctor_ids"""
+    if not doctor_ids:
+        return {}
+    return {d['id']: d['nombre'] for d in conn.execute(
+        f'SELECT id, nombre FROM doctores WHERE id IN ({_marcas(doctor_ids)})', list(doctor_ids))}
+
+def insertar_doctor(conn, nombre, especialidad):
+    cursor = conn.execute('''
+        INSERT INTO doctores (nombre, especialidad)
+        VALUES (?, ?)
+    ''', (nombre, especialidad))
+    return cursor.lastrowid
+
+def eliminar_doctor(conn, doctor_id):
+    conn.execute('DELETE FROM doctores WHERE id = ?', (doctor_id,))
+
+def cambiar_estado_doctor(conn, doctor_id, estado):
+    """Guarda el estado detallado; AUSENTE deja al doctor inactivo y el resto activo"""
+    activo = 0 if estado == 'AUSENTE' else 1
+    conn.execute('''
+        UPDATE doctores
+        SET activo = ?, estado_detallado= ?
+        WHERE id = ?
+    ''', (activo, estado, doctor_id))
+
+# ESTACIONES
+
+def estaciones_excepto(conn, excluidas):
+    return [dict(e) for e in conn.execute(
+        f'SELECT * FROM estaciones WHERE id NOT IN ({_marcas(excluidas)})', list(excluidas))]
+
+def obtener_estacion(conn, estacion_id):
+    return conn.execute('SELECT * FROM estaciones WHERE id = ?', (estacion_id,)).fetchone()
+
+def todas_las_estaciones(conn):
+    return conn.execute('SELECT id, nombre FROM estaciones ORDER BY id').fetchall()
+
+# NOTIFICACIONES
+
+def _notificacion(fila):
+    notificacion = dict(fila)
+    notificacion['leida'] = bool(notificacion['leida'])
+    return notificacion
+
+def insertar_notificacion(conn, doctor_id, doctor_nombre, consultorio, mensaje):
+    """Guarda un mensaje de consultorio y conserva solo los últimos MAX_NOTIFICACIONES"""
+    cursor = conn.execute('''
+        INSERT INTO notificaciones (doctor_id, doctor_nombre, consultorio, mensaje, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (doctor_id, doctor_nombre, consultorio, mensaje, datetime.now().isoformat()))
+    conn.execute('''
+        DELETE FROM notificaciones
+        WHERE id NOT IN (SELECT id FROM notificaciones ORDER BY id DESC LIMIT ?)
+    ''', (MAX_NOTIFICACIONES,))
+    return conn.execute('SELECT * FROM notificaciones WHERE id = ?', (cursor.lastrowid,)).fetchone()
+
+def notificaciones_recientes(conn):
+    """(no leídas, últimas leídas), cada lista de la más nueva a la más vieja"""
+    no_leidas = [_notificacion(n) for n in conn.execute(
+        'SELECT * FROM notificaciones WHERE leida = 0 ORDER BY timestamp DESC, id DESC')]
+    leidas = [_notificacion(n) for n in conn.execute(
+        'SELECT * FROM notificaciones WHERE leida = 1 ORDER BY timestamp DESC, id DESC LIMIT ?',
+        (NOTIFICACIONES_LEIDAS_VISIBLES,))]
+    return no_leidas, leidas
+
+def marcar_notificacion_leida(conn, notificacion_id):
+    return conn.execute('UPDATE notificaciones SET leida = 1 WHERE id = ?', (notificacion_id,)).rowcount > 0
+
+def eliminar_notificacion(conn, notificacion_id):
+    """Borra una notificación y la devuelve, o None si no existe"""
+    fila = conn.execute('SELECT * FROM notificaciones WHERE id = ?', (notificacion_id,)).fetchone()
+    if fila:
+        conn.execute('DELETE FROM notificaciones WHERE id = ?', (notificacion_id,))
+    return fila
+
+def eliminar_notificaciones(conn):
+    return conn.execute('DELETE FROM notificaciones').rowcount
+
+# ESQUEMA (ver_bd.py)
+
+def nombres_de_tablas(conn):
+    return [fila['name'] for fila in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+
+def filas_de_tabla(conn, tabla):
+    """(columnas, filas) de una tabla completa; el nombre se valida contra sqlite_master"""
+    if tabla not in nombres_de_tablas(conn):
+        raise ValueError(f'Tabla desconocida: {tabla}')
+    cursor = conn.execute(f'SELECT * FROM "{tabla}"')
+    return [desc[0] for desc in cursor.description], cursor.fetchall()
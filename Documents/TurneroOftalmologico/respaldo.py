@@ -0,0 +1,281 @@
+# respaldo.py
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import almacen
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DIRECTORIO_RESPALDOS = 'respaldos'
+MAX_RESPALDOS = 14
+INTERVALO_RESPALDO = 6 * 3600  # segundos entre respaldos automáticos
+PAGINAS_POR_PASO = 64          # páginas copiadas por paso; entre pasos la base queda libre
+PAUSA_ENTRE_PASOS = 0.005      # segundos que se duerme entre pasos (en el callback de progreso)
+MAX_REINICIOS = 3              # veces que una escritura puede reiniciar la copia antes de usar VACUUM INTO
+
+PREFIJO = 'turnos_'
+ARCHIVO_CANDADO = '.servicio.lock'  # lo retiene el proceso que programa los respaldos
+
+class ErrorRespaldo(Exception):
+    pass
+
+class _CopiaReiniciada(Exception):
+    """La copia por pasos se reinició más de MAX_REINICIOS veces por escrituras de otras conexiones"""
+
+def directorio_de_sede(sede_id, sedes_ids):
+    """Con una sola sede los respaldos van a DIRECTORIO_RESPALDOS; con varias, a una carpeta por sede"""
+    return DIRECTORIO_RESPALDOS if len(sedes_ids) == 1 else os.path.join(DIRECTORIO_RESPALDOS, sede_id)
+
+def crear_respaldo(origen='turnos.db', directorio=DIRECTORIO_RESPALDOS, max_respaldos=MAX_RESPALDOS,
+                   paginas_por_paso=PAGINAS_POR_PASO, pausa=PAUSA_ENTRE_PASOS, max_reinicios=MAX_REINICIOS):
+    """Copia la base en caliente con la API de backup de SQLite.
+
+    La copia avanza por pasos pequeños con una pausa entre ellos, así que la
+    aplicación puede seguir escribiendo mientras se respalda. Cada escritura
+    de otra conexión reinicia la copia; tras max_reinicios se usa VACUUM INTO,
+    que copia todo dentro de una sola transacción de lectura (con WAL no
+    frena a las escrituras). Cada snapshot se verifica con
+    PRAGMA integrity_check antes de conservarlo.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f'{PREFIJO}{datetime.now().strftime("%Y%m%d_%H%M%S")}.db'
+    destino = os.path.join(directorio, nombre)
+    temporal = destino + '.tmp'
+
+    pasos = []
+    reinicios = [0]
+    anterior = [None]
+    inicio_paso = [0.0]
+
+    def progreso(status, restantes, total):
+        # Duración del paso, sin la pausa anterior
+        pasos.append(time.perf_counter() - inicio_paso[0])
+        if anterior[0] is not None and restantes > anterior[0]:
+            reinicios[0] += 1
+            if reinicios[0] > max_reinicios:
+                raise _CopiaReiniciada()
+        anterior[0] = restantes
+        if restantes and pausa:
+            time.sleep(pausa)
+        inicio_paso[0] = time.perf_counter()
+
+    inicio = time.perf_counter()
+    metodo = 'backup'
+    conn_origen = sqlite3.connect(origen, timeout=30)
+    try:
+        conn_destino = sqlite3.connect(temporal)
+        try:
+            inicio_paso[0] = time.perf_counter()
+            # sleep solo aplica cuando un paso encuentra la base ocupada (SQLITE_BUSY)
+            conn_origen.backup(conn_destino, pages=paginas_por_paso, progress=progreso, sleep=pausa)
+        except _CopiaReiniciada:
+            metodo = 'vacuum_into'
+        finally:
+            conn_destino.close()
+        if metodo == 'vacuum_into':
+            os.remove(temporal)
+            inicio_paso[0] = time.perf_counter()
+            conn_origen.execute('VACUUM INTO ?', (temporal,))
+            pasos.append(time.perf_counter() - inicio_paso[0])
+    finally:
+        conn_origen.close()
+
+    conn_destino = sqlite3.connect(temporal)
+    try:
+        resultado = conn_destino.execute('PRAGMA integrity_check').fetchone()[0]
+        paginas = conn_destino.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        conn_destino.close()
+
+    if resultado != 'ok':
+        os.remove(temporal)
+        raise ErrorRespaldo(f'El respaldo no pasó integrity_check: {resultado}')
+
+    os.replace(temporal, destino)
+    duracion = time.perf_counter() - inicio
+    eliminados = rotar_respaldos(directorio, max_respaldos)
+
+    return {
+        'archivo': destino,
+        'tamano_bytes': os.path.getsize(destino),
+        'paginas': paginas,
+        'metodo': metodo,
+        'pasos': len(pasos),
+        'reinicios': reinicios[0],
+        'duracion_ms': round(duracion * 1000, 2),
+        'pausa_maxima_ms': round(max(pasos, default=0) * 1000, 2),
+        'integridad': resultado,
+        'eliminados': eliminados,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def listar_respaldos(directorio=DIRECTORIO_RESPALDOS):
+    """Snapshots existentes, del más reciente al más antiguo"""
+    if not os.path.isdir(directorio):
+        return []
+    archivos = sorted(
+        (f for f in os.listdir(directorio) if f.startswith(PREFIJO) and f.endswith('.db')),
+        reverse=True
+    )
+    return [{
+        'archivo': os.path.join(directorio, f),
+        'tamano_bytes': os.path.getsize(os.path.join(directorio, f))
+    } for f in archivos]
+
+def rotar_respaldos(directorio=DIRECTORIO_RESPALDOS, max_respaldos=MAX_RESPALDOS):
+    """Elimina los snapshots más antiguos y devuelve sus nombres"""
+    eliminados = []
+    for respaldo in listar_respaldos(directorio)[max_respaldos:]:
+        os.remove(respaldo['archivo'])
+        eliminados.append(respaldo['archivo'])
+    return eliminados
+
+def _tomar_candado(ruta):
+    """Archivo abierto con bloqueo exclusivo, o None si otro proceso ya lo tiene.
+
+    El sistema operativo suelta el bloqueo cuando el proceso termina, aunque
+    sea de golpe, así que no quedan candados huérfanos.
+    """
+    archivo = open(ruta, 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        archivo.close()
+        return None
+    return archivo
+
+class ServicioRespaldos:
+    """Hilo en segundo plano que respalda la base cada cierto intervalo.
+
+    Con varios procesos del servidor (reloader de Flask, workers de un
+    servidor WSGI) todos llaman a iniciar(); solo el que toma el candado del
+    directorio de respaldos programa el hilo. Los respaldos manuales
+    (ejecutar_ahora) funcionan en cualquier proceso.
+    """
+
+    def __init__(self, origen='turnos.db', directorio=DIRECTORIO_RESPALDOS, intervalo=INTERVALO_RESPALDO):
+        self.origen = origen
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.ultimo_resultado = None
+        self.ultimo_error = None
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._candado = None
+
+    def iniciar(self):
+        """Programa los respaldos automáticos; False si otro proceso ya los tiene (o intervalo 0)"""
+        if self._hilo and self._hilo.is_alive():
+            return True
+        if not self.intervalo:
+            return False
+        os.makedirs(self.directorio, exist_ok=True)
+        self._candado = _tomar_candado(os.path.join(self.directorio, ARCHIVO_CANDADO))
+        if self._candado is None:
+            return False
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name='respaldos', daemon=True)
+        self._hilo.start()
+        return True
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join()
+        if self._candado is not None:
+            self._candado.close()
+            self._candado = None
+
+    def ejecutar_ahora(self):
+        """Crea un respaldo inmediatamente; no se solapan dos respaldos"""
+        with self._lock:
+            try:
+                self.ultimo_resultado = crear_respaldo(self.origen, self.directorio)
+                self.ultimo_error = None
+                print(f"💾 Respaldo creado: {self.ultimo_resultado['archivo']} "
+                      f"({self.ultimo_resultado['duracion_ms']} ms, "
+                      f"pausa máxima {self.ultimo_resultado['pausa_maxima_ms']} ms)")
+                return self.ultimo_resultado
+            except Exception as e:
+                self.ultimo_error = str(e)
+                print(f"Error creando respaldo: {e}")
+                raise
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.ejecutar_ahora()
+            except Exception:
+                pass
+
+    def _en_otro_proceso(self):
+        """True si otro proceso tiene tomado el candado de este directorio"""
+        ruta = os.path.join(self.directorio, ARCHIVO_CANDADO)
+        if self._candado is not None or not os.path.exists(ruta):
+            return False
+        candado = _tomar_candado(ruta)
+        if candado is None:
+            return True
+        candado.close()
+        return False
+
+    def estado(self):
+        activo = bool(self._hilo and self._hilo.is_alive())
+        return {
+            'activo': activo,
+            'en_otro_proceso': not activo and self._en_otro_proceso(),
+            'intervalo_segundos': self.intervalo,
+            'ultimo_resultado': self.ultimo_resultado,
+            'ultimo_error': self.ultimo_error,
+            'respaldos': listar_respaldos(self.directorio)
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Respaldo en caliente de turnos.db')
+    parser.add_argument('accion', choices=['crear', 'listar'], nargs='?', default='crear')
+    parser.add_argument('--origen', default=None, help='por defecto la base de la aplicación (ver almacen.py)')
+    parser.add_argument('--directorio', default=None,
+                        help=f'por defecto {DIRECTORIO_RESPALDOS}, o {DIRECTORIO_RESPALDOS}/<sede> si hay varias sedes')
+    parser.add_argument('--conservar', type=int, default=MAX_RESPALDOS)
+    almacen.agregar_opcion_sede(parser)
+    args = parser.parse_args()
+    almacen.usar_sede_de_argumentos(parser, args)
+    if args.directorio is None:
+        # El mismo directorio en el que app.py guarda los respaldos automáticos de la sede
+        args.directorio = directorio_de_sede(almacen.sede_actual(), almacen.enrutador().ids())
+
+    if args.accion == 'listar':
+        respaldos = listar_respaldos(args.directorio)
+        print(f"📋 {len(respaldos)} respaldos en {args.directorio}")
+        for respaldo in respaldos:
+            print(f"   {respaldo['archivo']} - {respaldo['tamano_bytes']} bytes")
+    else:
+        if args.origen is None:
+            destino = almacen.actual()
+            if destino.tipo != 'archivo':
+                parser.error('La base configurada está en memoria; indica --origen')
+            args.origen = destino.ruta
+        print(f"🔄 Creando respaldo de {args.origen} (no es necesario detener Flask)...")
+        try:
+            resultado = crear_respaldo(args.origen, args.directorio, args.conservar)
+        except (ErrorRespaldo, sqlite3.Error) as e:
+            print(f"❌ Error: {e}")
+        else:
+            print(f"✅ {resultado['archivo']} ({resultado['tamano_bytes']} bytes)")
+            print(f"⏱️ Duración: {resultado['duracion_ms']} ms en {resultado['pasos']} pasos "
+                  f"({resultado['metodo']}, {resultado['reinicios']} reinicios), "
+                  f"pausa máxima: {resultado['pausa_maxima_ms']} ms")
+            for eliminado in resultado['eliminados']:
+                print(f"🗑️ Rotado: {eliminado}")
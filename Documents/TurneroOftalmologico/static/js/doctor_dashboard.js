@@ -0,0 +1,343 @@
+// doctor_dashboard.js
+let sesionDoctor = null;
+let pacienteActual = null;
+let tiempoInicioConsulta = null;
+let intervaloContador = null;
+
+// Cargar datos al iniciar
+document.addEventListener('DOMContentLoaded', function() {
+    cargarSesion();
+    Sondeo.registrar('turnosDoctor', {
+        url: () => sesionDoctor ? `/api/doctor/turnos?doctor_id=${sesionDoctor.doctor_id}` : null,
+        intervalo: 5000,
+        alRecibir: mostrarColaEspera
+    });
+});
+
+function cargarSesion() {
+    const sesion = localStorage.getItem('doctor_session');
+    if (!sesion) {
+        window.location.href = '/doctor-login';
+        return;
+    }
+
+    sesionDoctor = JSON.parse(sesion);
+    document.getElementById('doctorNombre').textContent = `👨‍⚕️ ${sesionDoctor.doctor_nombre}`;
+    document.getElementById('estadoTexto').textContent = formatearEstado(sesionDoctor.estado);
+    actualizarIndicadorEstado(sesionDoctor.estado);
+}
+
+function formatearEstado(estado) {
+    const estados = {
+        'DISPONIBLE': 'Disponible',
+        'EN_CONSULTA': 'En Consulta',
+        'AUSENTE': 'Ausente'
+    };
+    return estados[estado] || estado;
+}
+
+function actualizarIndicadorEstado(estado) {
+    const indicador = document.querySelector('.status-indicator');
+    indicador.className = 'status-indicator';
+
+    if (estado === 'DISPONIBLE') indicador.classList.add('status-disponible');
+    else if (estado === 'EN_CONSULTA') indicador.classList.add('status-consulta');
+    else if (estado === 'AUSENTE') indicador.classList.add('status-ausente');
+}
+
+function cargarTurnosDoctor() {
+    return Sondeo.refrescar('turnosDoctor');
+}
+
+function mostrarColaEspera(turnos) {
+    const contenedor = document.getElementById('colaEspera');
+    const contador = document.getElementById('contadorCola');
+
+    if (turnos.length === 0) {
+        contenedor.innerHTML = '<div class="sin-turnos">No hay pacientes en espera</div>';
+        contador.textContent = '0';
+        return;
+    }
+
+    contador.textContent = turnos.length.toString();
+
+    contenedor.innerHTML = turnos.map(turno => `
+        <div class="turno-item ${turno.id === (pacienteActual?.id) ? 'activo' : ''}"
+             onclick="seleccionarTurno(${turno.id})">
+            <div class="turno-numero">${turno.numero}</div>
+            <div class="turno-paciente">${turno.paciente_nombre} (${turno.paciente_edad} años)</div>
+            <div class="turno-detalles">
+                ${turno.tipo === 'CITA' ? 'Con cita' : 'Sin cita'} •
+                ${turno.tiempo_espera || 'Recién llegado'}
+            </div>
+        </div>
+    `).join('');
+}
+
+function seleccionarTurno(turnoId) {
+    // Aquí podrías implementar selección manual si es necesario
+    console.log('Turno seleccionado:', turnoId);
+}
+
+function llamarSiguiente() {
+    if (!sesionDoctor) return;
+
+    fetch('/api/doctor/llamar-siguiente', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            doctor_id: sesionDoctor.doctor_id
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            if (data.turno) {
+                comenzarAtencion(data.turno);
+            } else {
+                alert('No hay pacientes en espera');
+            }
+        } else {
+            alert('Error: ' + (data.error || 'No se pudo llamar siguiente'));
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error de conexión');
+    });
+}
+
+function comenzarAtencion(turno) {
+    pacienteActual = turno;
+    tiempoInicioConsulta = new Date();
+
+    // Mostrar panel de atención
+    document.getElementById('sinAtencion').classList.add('hidden');
+    document.getElementById('atendiendoPaciente').classList.remove('hidden');
+
+    // Actualizar información del paciente
+    document.getElementById('pacienteNombre').textContent = turno.paciente_nombre;
+    document.getElementById('pacienteDetalles').textContent =
+        `${turno.paciente_edad} años • ${turno.tipo === 'CITA' ? 'Con cita' : 'Sin cita'}`;
+
+    // Iniciar contador
+    iniciarContadorTiempo();
+
+    // Cambiar estado del doctor
+    cambiarEstado('EN_CONSULTA');
+}
+
+function iniciarContadorTiempo() {
+    if (intervaloContador) clearInterval(intervaloContador);
+
+    intervaloContador = setInterval(() => {
+        if (!tiempoInicioConsulta) return;
+
+        const ahora = new Date();
+        const diferencia = Math.floor((ahora - tiempoInicioConsulta) / 1000); // segundos
+        const minutos = Math.floor(diferencia / 60);
+        const segundos = diferencia % 60;
+
+        const tiempoFormateado = `${minutos}:${segundos.toString().padStart(2, '0')}`;
+        document.getElementById('contadorTiempo').textContent = tiempoFormateado;
+        document.getElementById('tiempoBadge').textContent = tiempoFormateado;
+    }, 1000);
+}
+
+function seleccionarDestino(destino) {
+    // Aquí guardaríamos el destino seleccionado temporalmente
+    console.log('Destino seleccionado:', destino);
+    // Podrías mostrar visualmente cuál está seleccionado
+}
+
+function finalizarConsulta() {
+    if (!pacienteActual) return;
+
+    const destino = 'FARMACIA'; // Por ahora fijo, luego se selecciona
+    const vuelveConmigo = document.getElementById('vuelveConmigo').checked;
+    const notas = document.getElementById('notasConsulta').value;
+
+    fetch('/api/doctor/finalizar-consulta', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            turno_id: pacienteActual.id,
+            destino: destino,
+            vuelve_conmigo: vuelveConmigo,
+            notas: notas,
+            doctor_id: sesionDoctor.doctor_id
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            terminarAtencion();
+            cargarTurnosDoctor();
+            alert('Consulta finalizada correctamente');
+        } else {
+            alert('Error: ' + (data.error || 'No se pudo finalizar consulta'));
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error de conexión');
+    });
+}
+
+function terminarAtencion() {
+    pacienteActual = null;
+    tiempoInicioConsulta = null;
+
+    if (intervaloContador) {
+        clearInterval(intervaloContador);
+        intervaloContador = null;
+    }
+
+    document.getElementById('sinAtencion').classList.remove('hidden');
+    document.getElementById('atendiendoPaciente').classList.add('hidden');
+    document.getElementById('notasConsulta').value = '';
+    document.getElementById('vuelveConmigo').checked = false;
+    document.getElementById('contadorTiempo').textContent = '0:00';
+    document.getElementById('tiempoBadge').textContent = '0:00';
+
+    cambiarEstado('DISPONIBLE');
+}
+
+function cambiarEstado(nuevoEstado) {
+    if (!sesionDoctor) return;
+
+    fetch('/api/doctor/cambiar-estado', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            doctor_id: sesionDoctor.doctor_id,
+            estado: nuevoEstado
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            sesionDoctor.estado = nuevoEstado;
+            document.getElementById('estadoTexto').textContent = formatearEstado(nuevoEstado);
+            actualizarIndicadorEstado(nuevoEstado);
+
+            if (nuevoEstado === 'AUSENTE') {
+                // Si se marca como ausente, terminar atención actual
+                terminarAtencion();
+            }
+        } else {
+            alert('Error al cambiar estado');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error de conexión');
+    });
+}
+
+function cerrarSesion() {
+    if (confirm('¿Estás seguro de que quieres cerrar sesión?')) {
+        if (pacienteActual) {
+            if (!confirm('Tienes un paciente en consulta. ¿Seguro que quieres cerrar sesión?')) {
+                return;
+            }
+        }
+
+        // Marcar como ausente al cerrar sesión
+        cambiarEstado('AUSENTE');
+
+        // Limpiar localStorage y redirigir
+        localStorage.removeItem('doctor_session');
+        window.location.href = '/doctor-login';
+    }
+}
+
+//Llamar a Recepcion
+function llamarRecepcion() {
+    if (!sesionDoctor) return;
+
+    // Mensajes predefinidos para facilitar
+    const mensajesRapidos = [
+        "📋 Necesito historial médico de un paciente",
+        "🚨 Urgencia en consultorio - asistencia requerida",
+        "🔧 Problema técnico con equipo médico",
+        "💊 Necesito medicamento de farmacia",
+        "📄 Requiero estudios/laboratorios",
+        "👥 Coordinar derivación con especialista",
+        "⏰ Informar retraso en consultas",
+        "📞 Llamar por teléfono al consultorio",
+        "🔄 Paciente vuelve a consulta",
+        "❓ Otra situación - especificar en mensaje"
+    ];
+
+    let mensaje = prompt(
+        `📞 Llamar a Recepción\n\n¿Qué necesitas comunicar?\n\nO selecciona una opción rápida:\n${
+            mensajesRapidos.map((msg, i) => `${i + 1}. ${msg}`).join('\n')
+        }\n\nEscribe tu mensaje o el número de la opción:`,
+        ''
+    );
+
+    if (mensaje && mensaje.trim() !== '') {
+        // Si el usuario escribió un número, usar el mensaje predefinido
+        const numero = parseInt(mensaje.trim());
+        if (!isNaN(numero) && numero >= 1 && numero <= mensajesRapidos.length) {
+            mensaje = mensajesRapidos[numero - 1];
+        }
+
+        // Mostrar confirmación con opción de editar
+        const mensajeFinal = confirm(
+            `✅ ¿Enviar este mensaje a recepción?\n\n"${mensaje.trim()}"\n\nOK para enviar, Cancelar para editar`
+        ) ? mensaje.trim() : null;
+
+        if (mensajeFinal) {
+            // Mostrar feedback inmediato
+            mostrarNotificacionDoctor('Mensaje enviado a recepción', 'success');
+
+            // Enviar notificación a recepción
+            enviarNotificacionRecepcion(mensajeFinal);
+        } else {
+            // Volver a llamar la función para editar
+            setTimeout(llamarRecepcion, 100);
+        }
+    }
+}
+
+function mostrarNotificacionDoctor(mensaje, tipo = 'info') {
+    // Implementación similar a la de recepción pero para doctor
+    console.log(`[DOCTOR] ${tipo.toUpperCase()}: ${mensaje}`);
+
+    // Puedes implementar notificaciones visuales en el dashboard del doctor también
+    alert(`✅ ${mensaje}`); // Temporal - mejorar con UI propia
+}
+
+function enviarNotificacionRecepcion(mensaje) {
+    fetch('/api/doctor/notificar-recepcion', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            doctor_id: sesionDoctor.doctor_id,
+            doctor_nombre: sesionDoctor.doctor_nombre,
+            consultorio: sesionDoctor.consultorio,
+            mensaje: mensaje,
+            timestamp: new Date().toISOString()
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            console.log('Notificación enviada a recepción');
+        }
+    })
+    .catch(error => {
+        console.error('Error enviando notificación:', error);
+        // Aún así mostramos el alert al doctor, aunque falle el backend
+    });
+}
@@ -0,0 +1,121 @@
+// doctor_login.js
+// Cargar consultorios y doctores al iniciar
+document.addEventListener('DOMContentLoaded', function() {
+    cargarConsultorios();
+    // Solo se redibuja si cambió, para no perder el doctor seleccionado
+    Sondeo.registrar('doctoresLogin', {
+        url: '/api/doctores/todos',
+        intervalo: 10000,
+        soloCambios: true,
+        alRecibir: mostrarDoctores
+    });
+});
+
+let consultorioSeleccionado = null;
+let doctorSeleccionado = null;
+
+function cargarConsultorios() {
+    const consultorios = [
+        { id: 1, nombre: 'Consultorio 1' },
+        { id: 2, nombre: 'Consultorio 2' },
+        { id: 3, nombre: 'Consultorio 3' },
+        { id: 4, nombre: 'Consultorio 4' }
+    ];
+
+    const grid = document.getElementById('consultoriosGrid');
+    grid.innerHTML = '';
+
+    consultorios.forEach(consultorio => {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'consultorio-btn';
+        button.textContent = consultorio.nombre;
+        button.onclick = () => seleccionarConsultorio(consultorio.id, button);
+        grid.appendChild(button);
+    });
+}
+
+function seleccionarConsultorio(consultorioId, button) {
+    // Remover selección anterior
+    document.querySelectorAll('.consultorio-btn').forEach(btn => {
+        btn.classList.remove('selected');
+    });
+
+    // Marcar como seleccionado
+    button.classList.add('selected');
+    consultorioSeleccionado = consultorioId;
+}
+
+function cargarDoctores() {
+    return Sondeo.refrescar('doctoresLogin');
+}
+
+function mostrarDoctores(doctores) {
+    const select = document.getElementById('doctorSelect');
+    select.innerHTML = '<option value="">-- Seleccione doctor --</option>';
+
+    doctores.forEach(doctor => {
+        const option = document.createElement('option');
+        option.value = doctor.id;
+        option.textContent = doctor.nombre + (doctor.especialidad ? ` - ${doctor.especialidad}` : '');
+        select.appendChild(option);
+    });
+
+    select.onchange = function() {
+        doctorSeleccionado = this.value;
+    };
+}
+
+function hacerLogin(estado) {
+    if (!consultorioSeleccionado) {
+        alert('Por favor seleccione un consultorio');
+        return;
+    }
+
+    if (!doctorSeleccionado) {
+        alert('Por favor seleccione su nombre');
+        return;
+    }
+
+    // Mostrar loading
+    document.getElementById('loading').style.display = 'block';
+
+    const datos = {
+        doctor_id: doctorSeleccionado,
+        consultorio: consultorioSeleccionado,
+        estado: estado
+    };
+
+    // Actualizar estado del doctor en el sistema
+    fetch('/api/doctor/login', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(datos)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // Guardar sesión en localStorage
+            localStorage.setItem('doctor_session', JSON.stringify({
+                doctor_id: doctorSeleccionado,
+                doctor_nombre: data.doctor_nombre,
+                consultorio: consultorioSeleccionado,
+                estado: estado,
+                login_time: new Date().toISOString()
+            }));
+
+            // Redirigir al dashboard del doctor
+            window.location.href = '/doctor-dashboard';
+        } else {
+            alert('Error al iniciar sesión: ' + (data.error || 'Error desconocido'));
+            document.getElementById('loading').style.display = 'none';
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error de conexión');
+        document.getElementById('loading').style.display = 'none';
+    });
+}
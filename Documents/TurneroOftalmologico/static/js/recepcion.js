@@ -0,0 +1,1024 @@
+// recepcion.js
+// Cargar lista de doctores activos (la actualización periódica la lleva Sondeo)
+function cargarDoctores() {
+    return Sondeo.refrescar('doctores');
+}
+
+function mostrarDoctoresActivos(doctores) {
+    const selector = document.getElementById('doctor_asignado');
+    selector.innerHTML = '<option value="">Seleccionar doctor</option>';
+
+    // FILTRAR solo doctores activos
+    const doctoresActivos = doctores.filter(doctor => doctor.activo === 1);
+
+    if (doctoresActivos.length === 0) {
+        const option = document.createElement('option');
+        option.value = "";
+        option.textContent = "No hay doctores disponibles";
+        selector.appendChild(option);
+        return;
+    }
+
+    doctoresActivos.forEach(doctor => {
+        const option = document.createElement('option');
+        option.value = doctor.id;
+        option.textContent = `${doctor.nombre} - ${doctor.especialidad}`;
+        selector.appendChild(option);
+    });
+}
+
+// Mostrar/ocultar opciones según tipo de turno
+function mostrarOpcionesEspecificas() {
+    const tipo = document.getElementById('tipo').value;
+    const opcionesCita = document.getElementById('opcionesCita');
+    const opcionesSinCita = document.getElementById('opcionesSinCita');
+    const selectorDoctor = document.getElementById('selectorDoctor');
+
+    // Ocultar todo primero
+    opcionesCita.classList.add('hidden');
+    opcionesSinCita.classList.add('hidden');
+    selectorDoctor.classList.add('hidden');
+
+    if (tipo === 'CITA') {
+        opcionesCita.classList.remove('hidden');
+    } else if (tipo === 'SIN_CITA') {
+        opcionesSinCita.classList.remove('hidden');
+    }
+}
+
+// Mostrar selector de doctores solo cuando se selecciona Consulta Médica
+function mostrarSelectorDoctor() {
+    const estacionSeleccionada = document.getElementById('estacion_inicial').value;
+    const selectorDoctor = document.getElementById('selectorDoctor');
+
+    if (estacionSeleccionada === '4') {
+        selectorDoctor.classList.remove('hidden');
+    } else {
+        selectorDoctor.classList.add('hidden');
+        document.getElementById('doctor_asignado').value = '';
+    }
+}
+
+// Crear nuevo turno
+document.getElementById('formTurno').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const tipo = document.getElementById('tipo').value;
+    let estacion_inicial, doctor_asignado;
+
+    if (tipo === 'CITA') {
+        estacion_inicial = document.getElementById('estacion_inicial').value;
+        doctor_asignado = document.getElementById('doctor_asignado').value || null;
+    } else {
+        estacion_inicial = document.getElementById('estacion_sin_cita').value;
+        doctor_asignado = null;
+    }
+
+    // Validaciones
+    if (!estacion_inicial) {
+        alert('Por favor selecciona un destino inicial');
+        return;
+    }
+
+    const datos = {
+        paciente_nombre: document.getElementById('paciente_nombre').value,
+        paciente_edad: document.getElementById('paciente_edad').value,
+        tipo: tipo,
+        estacion_inicial: parseInt(estacion_inicial),
+        doctor_asignado: doctor_asignado ? parseInt(doctor_asignado) : null
+    };
+
+    fetch('/api/turnos/nuevo', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(datos)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert(`✅ Turno generado: ${data.numero_turno}`);
+            document.getElementById('formTurno').reset();
+            mostrarOpcionesEspecificas();
+            cargarTurnos();
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error al crear el turno');
+    });
+});
+
+// Función para cargar turnos
+function cargarTurnos() {
+    return Sondeo.refrescar('turnos');
+}
+
+function mostrarTurnos(turnos) {
+    const lista = document.getElementById('listaTurnos');
+
+    if (turnos.length === 0) {
+        lista.innerHTML = '<p>No hay turnos activos</p>';
+        return;
+    }
+
+    lista.innerHTML = turnos.map(turno => `
+        <div class="turno-card">
+            <div class="turno-header">Turno ${turno.numero}</div>
+            <div class="turno-info">Paciente: ${turno.paciente_nombre}</div>
+            <div class="turno-info">Edad: ${turno.paciente_edad} años</div>
+            <div class="turno-info">Tipo: ${turno.tipo === 'CITA' ? 'Con Cita' : 'Sin Cita'}</div>
+            <div class="turno-info">Estación: ${turno.estacion_actual_nombre || 'Recepción'}</div>
+            <div class="turno-info">Estado: ${turno.estado}</div>
+            ${turno.doctor_nombre ? `<div class="turno-info">Doctor: ${turno.doctor_nombre}</div>` : ''}
+
+            <div class="turno-acciones">
+                <button onclick="editarTurno(${turno.id})">✏️ Editar</button>
+                <button onclick="cancelarTurno(${turno.id})">❌ Cancelar</button>
+            </div>
+        </div>
+    `).join('');
+}
+
+function mostrarCitas(data) {
+    const lista = document.getElementById('listaCitas');
+    const pendientes = data.citas.filter(cita => cita.estado !== 'CANCELADA');
+
+    if (pendientes.length === 0) {
+        lista.innerHTML = '<p>No hay citas para hoy</p>';
+        return;
+    }
+
+    // Los datos de las citas vienen de un CSV importado: se escriben con textContent
+    lista.replaceChildren(...pendientes.map(cita => {
+        const tarjeta = document.createElement('div');
+        tarjeta.className = 'turno-card';
+        const agregar = (clase, texto) => {
+            const linea = document.createElement('div');
+            linea.className = clase;
+            linea.textContent = texto;
+            tarjeta.appendChild(linea);
+            return linea;
+        };
+
+        agregar('turno-header', `${cita.hora} - ${cita.paciente_nombre}`);
+        agregar('turno-info', `Doctor: ${cita.doctor_nombre || 'Sin asignar'}`);
+        if (cita.paciente_edad) agregar('turno-info', `Edad: ${cita.paciente_edad} años`);
+        if (cita.telefono) agregar('turno-info', `Teléfono: ${cita.telefono}`);
+
+        const acciones = agregar('turno-acciones', '');
+        if (cita.estado === 'RESERVADA') {
+            const boton = document.createElement('button');
+            boton.textContent = '✅ Llegó';
+            boton.addEventListener('click', () => registrarLlegada(cita.id));
+            acciones.appendChild(boton);
+        } else {
+            const turno = document.createElement('div');
+            turno.className = 'turno-info';
+            turno.textContent = `Turno ${cita.numero_turno}`;
+            acciones.appendChild(turno);
+        }
+        return tarjeta;
+    }));
+}
+
+// El paciente con cita llegó: se crea su turno directamente en consulta
+function registrarLlegada(citaId) {
+    fetch(`/api/citas/${citaId}/llegada`, { method: 'POST' })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert(`Turno creado: ${data.numero_turno}`);
+                Sondeo.refrescar('citas');
+                Sondeo.refrescar('turnos');
+            } else {
+                alert(`Error: ${data.error}`);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error al registrar la llegada');
+        });
+}
+
+function editarTurno(turnoId) {
+    Sondeo.json('/api/turnos')
+        .then(turnos => {
+            const turno = turnos.find(t => t.id === turnoId);
+            if (!turno) {
+                alert('Turno no encontrado');
+                return;
+            }
+
+            document.getElementById('editar_turno_id').value = turno.id;
+            document.getElementById('editar_paciente_nombre').value = turno.paciente_nombre;
+            document.getElementById('editar_paciente_edad').value = turno.paciente_edad;
+            document.getElementById('editar_tipo').value = turno.tipo;
+            document.getElementById('editar_estacion_actual').value = turno.estacion_actual;
+
+            cargarDoctoresParaEdicion();
+            mostrarSelectorDoctorEdicion(turno.estacion_actual);
+
+            if (turno.doctor_asignado) {
+                document.getElementById('editar_doctor_asignado').value = turno.doctor_asignado;
+            }
+
+            document.getElementById('modalEditar').classList.remove('hidden');
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error al cargar datos del turno');
+        });
+}
+
+function cargarDoctoresParaEdicion() {
+    Sondeo.json('/api/doctores')
+        .then(doctores => {
+            const selector = document.getElementById('editar_doctor_asignado');
+            selector.innerHTML = '<option value="">Sin doctor asignado</option>';
+
+            const doctoresActivos = doctores.filter(doctor => doctor.activo === 1);
+
+            doctoresActivos.forEach(doctor => {
+                const option = document.createElement('option');
+                option.value = doctor.id;
+                option.textContent = `${doctor.nombre} - ${doctor.especialidad}`;
+                selector.appendChild(option);
+            });
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+
+}
+
+function mostrarSelectorDoctorEdicion(estacionId) {
+    const container = document.getElementById('editar_selector_doctor_container');
+    if (estacionId == 4) {
+        container.style.display = 'block';
+    } else {
+        container.style.display = 'none';
+        document.getElementById('editar_doctor_asignado').value = '';
+    }
+}
+
+function cerrarModal() {
+    document.getElementById('modalEditar').classList.add('hidden');
+}
+
+document.getElementById('formEditarTurno').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const turnoId = document.getElementById('editar_turno_id').value;
+    const estacionActual = document.getElementById('editar_estacion_actual').value;
+
+    const datos = {
+        paciente_nombre: document.getElementById('editar_paciente_nombre').value,
+        paciente_edad: parseInt(document.getElementById('editar_paciente_edad').value),
+        tipo: document.getElementById('editar_tipo').value,
+        estacion_actual: parseInt(estacionActual),
+        doctor_asignado: estacionActual == 4 ?
+            (document.getElementById('editar_doctor_asignado').value || null) : null
+    };
+
+    fetch(`/api/turnos/${turnoId}/editar`, {
+        method: 'PUT',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(datos)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert('Turno editado correctamente');
+            cerrarModal();
+            cargarTurnos();
+        } else {
+            alert('Error al editar el turno');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error al editar el turno');
+    });
+});
+
+document.querySelector('.close').addEventListener('click', cerrarModal);
+
+document.getElementById('modalEditar').addEventListener('click', function(e) {
+    if (e.target === this) {
+        cerrarModal();
+    }
+});
+
+document.getElementById('editar_estacion_actual').addEventListener('change', function() {
+    mostrarSelectorDoctorEdicion(this.value);
+});
+
+// Función para cancelar turno
+function cancelarTurno(turnoId) {
+    const razon = prompt('¿Por qué se cancela el turno?\n\nOpciones:\n1. Paciente no se presentó\n2. Error en datos\n3. Paciente reagendó\n4. Otro', 'Paciente no se presentó');
+
+    if (razon === null) return;
+
+    if (razon && confirm('¿Estás seguro de que quieres cancelar este turno?')) {
+        fetch(`/api/turnos/${turnoId}/cancelar`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ razon: razon })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert('✅ Turno cancelado');
+                cargarTurnos();
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error al cancelar el turno');
+        });
+    }
+}
+
+// =============================================
+// FUNCIONES DE BOTONES RÁPIDOS
+// =============================================
+function limpiarFormulario() {
+    document.getElementById('formTurno').reset();
+    mostrarOpcionesEspecificas();
+    alert('✅ Formulario limpiado');
+}
+
+function exportarDatos() {
+    alert('Función de exportación en desarrollo...');
+    // Aquí iría la lógica para exportar a Excel/PDF
+}
+
+
+//Panel de doctores
+function abrirPanelDoctores() {
+    cargarDoctoresAdmin();
+    document.getElementById('modalDoctores').classList.remove('hidden');
+    }
+
+function cerrarModalDoctores() {
+    document.getElementById('modalDoctores').classList.add('hidden');
+}
+
+function cargarDoctoresAdmin() {
+    fetch('/api/doctores/todos')
+        .then(response => response.json())
+        .then(doctores => {
+            mostrarDoctoresAdmin(doctores);
+        })
+        .catch(error => {
+            console.error('Error cargando doctores:', error);
+            document.getElementById('listaDoctoresAdmin').innerHTML = '<p>Error al cargar doctores</p>';
+        });
+}
+
+function mostrarDoctoresAdmin(doctores) {
+    const contenedor = document.getElementById('listaDoctoresAdmin');
+
+    if (doctores.length === 0) {
+        contenedor.innerHTML = '<p>No hay doctores registrados</p>';
+        return;
+    }
+
+    contenedor.innerHTML = doctores.map(doctor => `
+        <div class="doctor-card">
+            <div class="doctor-info">
+                <div class="doctor-nombre">${doctor.nombre}</div>
+                <div class="doctor-especialidad">${doctor.especialidad}</div>
+            </div>
+            <button class="btn-eliminar" onclick="eliminarDoctor(${doctor.id})">🗑️ Eliminar</button>
+        </div>
+    `).join('');
+}
+
+
+
+function eliminarDoctor(doctorId) {
+    if (confirm('¿Estás seguro de que quieres eliminar este doctor? Esta acción no se puede deshacer.')) {
+        fetch(`/api/doctores/${doctorId}`, {
+            method: 'DELETE'
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                cargarDoctoresAdmin();
+                cargarDoctores();
+                cargarDoctoresParaEdicion();
+            } else if (data.error && data.error.includes('turnos activos') &&
+                       confirm(`${data.error}.\n\n¿Reasignar sus turnos pendientes a los demás doctores activos?`)) {
+                reasignarPendientes(doctorId)
+                    .then(() => eliminarDoctorSinConfirmar(doctorId))
+                    .catch(() => {});
+            } else {
+                alert(data.error || 'Error al eliminar doctor');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error al eliminar doctor');
+        });
+    }
+}
+
+function eliminarDoctorSinConfirmar(doctorId) {
+    return fetch(`/api/doctores/${doctorId}`, { method: 'DELETE' })
+        .then(response => response.json())
+        .then(data => {
+            cargarDoctoresAdmin();
+            cargarDoctores();
+            cargarDoctoresParaEdicion();
+            if (!data.success) {
+                alert(`${data.error}. Los pacientes en atención deben finalizarse antes de eliminar al doctor.`);
+            }
+        });
+}
+
+// Reparte en una sola operación los pendientes de un doctor entre los demás doctores activos
+function reasignarPendientes(doctorId) {
+    return Sondeo.json('/api/doctores')
+        .then(doctores => {
+            const destinos = doctores.map(d => d.id).filter(id => id !== doctorId);
+            if (destinos.length === 0) {
+                throw new Error('No hay otros doctores activos');
+            }
+            return fetch('/api/turnos/lote/reasignar', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ doctor_origen: doctorId, doctores_destino: destinos })
+            });
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error);
+            }
+            alert(`✅ ${data.procesados} turnos reasignados`);
+            Sondeo.refrescar();
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert(`Error al reasignar turnos: ${error.message}`);
+            throw error;
+        });
+}
+
+// Agregar nuevo doctor
+document.getElementById('formAgregarDoctor').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const datos = {
+        nombre: document.getElementById('nuevo_doctor_nombre').value,
+        especialidad: document.getElementById('nuevo_doctor_especialidad').value,
+    };
+
+    fetch('/api/doctores/nuevo', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(datos)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            document.getElementById('formAgregarDoctor').reset();
+            cargarDoctoresAdmin();
+            cargarDoctores();
+            cargarDoctoresParaEdicion();
+        } else {
+            alert('Error al agregar doctor');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error al agregar doctor');
+    });
+});
+
+// Cerrar modal al hacer clic fuera
+document.getElementById('modalDoctores').addEventListener('click', function(e) {
+    if (e.target === this) {
+        cerrarModalDoctores();
+    }
+});
+
+function reiniciarSistema() {
+    if (confirm('¿Estás seguro de querer reiniciar el sistema? Esto limpiará todos los turnos activos.')) {
+        alert('🔄 Sistema reiniciado (función en desarrollo)');
+    }
+}
+
+
+
+function verManual() {
+    alert('📖 Abriendo manual de usuario...');
+}
+
+function hacerBackup() {
+    mostrarNotificacion('💾 Creando backup de la base de datos...');
+    fetch('/api/respaldos', {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            mostrarNotificacion(`Backup creado en ${data.respaldo.duracion_ms} ms`, 'success');
+        } else {
+            mostrarNotificacion('Error al crear backup: ' + data.error, 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        mostrarNotificacion('Error de conexión', 'error');
+    });
+}
+
+// =============================================
+// FUNCIONES DE ESTADÍSTICAS
+// =============================================
+function abrirEstadisticas() {
+    const hoy = new Date().toISOString().split('T')[0];
+    document.getElementById('estadistica_fecha').value = hoy;
+
+    const mesActual = new Date().toISOString().slice(0, 7);
+    document.getElementById('estadistica_mes').value = mesActual;
+
+    cargarEstadisticas();
+    document.getElementById('modalEstadisticas').classList.remove('hidden');
+}
+
+function cerrarEstadisticas() {
+    document.getElementById('modalEstadisticas').classList.add('hidden');
+}
+
+function cargarEstadisticas() {
+    const fecha = document.getElementById('estadistica_fecha').value;
+    const url = fecha ? `/api/estadisticas/dia/${fecha}` : '/api/estadisticas/dia';
+
+    fetch(url)
+        .then(response => response.json())
+        .then(estadisticas => {
+            mostrarEstadisticasDia(estadisticas);
+        })
+        .catch(error => {
+            console.error('Error cargando estadísticas:', error);
+            document.getElementById('contenedorEstadisticas').innerHTML = '<p>Error al cargar estadísticas</p>';
+        });
+}
+
+function cargarEstadisticasMensual() {
+    const mes = document.getElementById('estadistica_mes').value;
+    if (!mes) return;
+
+    const [año, mesNum] = mes.split('-');
+    const url = `/api/estadisticas/mes/${mesNum}/${año}`;
+
+    fetch(url)
+        .then(response => response.json())
+        .then(estadisticas => {
+            mostrarEstadisticasMes(estadisticas);
+        })
+        .catch(error => {
+            console.error('Error cargando estadísticas mensuales:', error);
+            document.getElementById('contenedorEstadisticas').innerHTML = '<p>Error al cargar estadísticas mensuales</p>';
+        });
+}
+
+function mostrarEstadisticasDia(estadisticas) {
+    const contenedor = document.getElementById('contenedorEstadisticas');
+
+    const html = `
+        <h3>📅 Estadísticas del ${estadisticas.fecha}</h3>
+
+        <div class="estadisticas-grid">
+            <div class="estadistica-card">
+                <div class="estadistica-label">Total Turnos</div>
+                <div class="estadistica-valor">${estadisticas.total_turnos}</div>
+            </div>
+
+            <div class="estadistica-card">
+                <div class="estadistica-label">Cancelados</div>
+                <div class="estadistica-valor ${estadisticas.cancelados > 0 ? 'estadistica-negativa' : ''}">
+                    ${estadisticas.cancelados}
+                </div>
+                <div class="estadistica-label">${estadisticas.tasa_cancelacion.toFixed(1)}%</div>
+            </div>
+
+            <div class="estadistica-card">
+                <div class="estadistica-label">Finalizados</div>
+                <div class="estadistica-valor">${estadisticas.finalizados}</div>
+            </div>
+
+            <div class="estadistica-card">
+                <div class="estadistica-label">Activos</div>
+                <div class="estadistica-valor">${estadisticas.activos}</div>
+            </div>
+        </div>
+
+        ${estadisticas.cancelaciones_por_razon && estadisticas.cancelaciones_por_razon.length > 0 ? `
+            <div class="estadistica-tendencia">
+                <h4>📉 Cancelaciones por Razón</h4>
+                ${estadisticas.cancelaciones_por_razon.map(razon => `
+                    <div class="tendencia-item">
+                        <span>${razon.razon_cancelacion || 'No especificada'}</span>
+                        <strong>${razon.cantidad}</strong>
+                    </div>
+                `).join('')}
+            </div>
+        ` : '<p>No hay cancelaciones hoy</p>'}
+    `;
+
+    contenedor.innerHTML = html;
+}
+
+function mostrarEstadisticasMes(estadisticas) {
+    const contenedor = document.getElementById('contenedorEstadisticas');
+
+    const html = `
+        <h3>📈 Estadísticas del Mes: ${estadisticas.mes}</h3>
+
+        <div class="estadisticas-grid">
+            <div class="estadistica-card">
+                <div class="estadistica-label">Total Turnos</div>
+                <div class="estadistica-valor">${estadisticas.total_turnos}</div>
+            </div>
+
+            <div class="estadistica-card">
+                <div class="estadistica-label">Cancelados</div>
+                <div class="estadistica-valor ${estadisticas.cancelados > 0 ? 'estadistica-negativa' : ''}">
+                    ${estadisticas.cancelados}
+                </div>
+                <div class="estadistica-label">${estadisticas.tasa_cancelacion.toFixed(1)}%</div>
+            </div>
+
+            <div class="estadistica-card">
+                <div class="estadistica-label">Finalizados</div>
+                <div class="estadistica-valor">${estadisticas.finalizados}</div>
+            </div>
+        </div>
+
+        ${estadisticas.tendencia_diaria && estadisticas.tendencia_diaria.length > 0 ? `
+            <div class="estadistica-tendencia">
+                <h4>📊 Tendencia Diaria</h4>
+                ${estadisticas.tendencia_diaria.map(dia => `
+                    <div class="tendencia-item">
+                        <span>${dia.fecha}</span>
+                        <span>Turnos: <strong>${dia.turnos}</strong></span>
+                        <span class="estadistica-negativa">Cancel: ${dia.cancelados}</span>
+                    </div>
+                `).join('')}
+            </div>
+        ` : ''}
+    `;
+
+    contenedor.innerHTML = html;
+}
+
+function imprimirEstadisticas() {
+    window.print();
+}
+
+//============================================
+//   FUNCIONES PARA EL ESTATUS DE DOCTORES
+//============================================
+
+// Función para cargar el visor de estado de doctores
+function cargarVisorDoctores() {
+    return Sondeo.refrescar('visorDoctores');
+}
+
+// Función para mostrar los doctores en el visor
+function mostrarVisorDoctores(doctores) {
+        const contenedor = document.getElementById('visorDoctores');
+
+        if (doctores.length === 0) {
+            contenedor.innerHTML = '<p>No hay doctores registrados</p>';
+            return;
+        }
+
+         contenedor.innerHTML = doctores.map(doctor => {
+            const estado = doctor.estado_detallado || (doctor.activo ? 'DISPONIBLE' : 'AUSENTE');
+            let statusClass, statusText;
+
+            if (estado === 'DISPONIBLE') {
+                statusClass = 'activo';
+                statusText = '🟢 Disponible';
+            } else if (estado === 'EN_CONSULTA') {
+                statusClass = 'ocupado';
+                statusText = '🟡 En Consulta';
+            } else { // AUSENTE o cualquier otro
+                statusClass = 'inactivo';
+                statusText = '🔴 No disponible';
+            }
+
+            return `
+                <div class="doctor-status-card ${statusClass}">
+                    <div class="doctor-status-nombre">${doctor.nombre}</div>
+                    <div class="doctor-status-especialidad">${doctor.especialidad}</div>
+                    <div class="doctor-status-estado">
+                        ${statusText}
+                    </div>
+                </div>
+            `;
+    }).join('') + `
+        <div class="ultima-actualizacion">
+            Actualizado: ${new Date().toLocaleTimeString()}
+        </div>
+    `;
+}
+
+// Función para actualizar manualmente
+function actualizarEstadoDoctores() {
+    cargarVisorDoctores();
+    mostrarNotificacion('Estado de doctores actualizado');
+}
+
+
+// Cerrar modal al hacer clic fuera
+document.getElementById('modalEstadisticas').addEventListener('click', function(e) {
+    if (e.target === this) {
+        cerrarEstadisticas();
+    }
+});
+
+
+//============================================
+// FUNCION PARA NOTIFICACIONES
+//============================================
+
+// Función para limpiar todas las notificaciones
+function limpiarTodasNotificaciones() {
+    fetch('/api/recepcion/notificaciones')
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success || data.notificaciones.length === 0) {
+                alert('No hay notificaciones para limpiar');
+                return;
+            }
+
+            const cantidad = data.notificaciones.length;
+
+            if (confirm(`¿Eliminar todas las notificaciones?\n\nSe borrarán ${cantidad} notificaciones.`)) {
+                fetch('/api/recepcion/notificaciones/limpiar-todas', {
+                    method: 'DELETE'
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        mostrarNotificacion(`✅ Se limpiaron ${data.eliminadas} notificaciones`);
+                        cargarNotificaciones();
+                    } else {
+                        mostrarNotificacion('❌ Error al limpiar notificaciones');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    mostrarNotificacion('❌ Error de conexión');
+                });
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error al cargar notificaciones');
+        });
+}
+
+// Función para eliminar una notificación individual
+function eliminarNotificacionIndividual(notificacionId, doctorNombre) {
+    if (confirm(`¿Eliminar notificación del Dr. ${doctorNombre}?`)) {
+        fetch(`/api/recepcion/notificaciones/${notificacionId}`, {
+            method: 'DELETE'
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                mostrarNotificacion('✅ Notificación eliminada');
+                cargarNotificaciones();
+            } else {
+                mostrarNotificacion('❌ Error al eliminar notificación');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            mostrarNotificacion('❌ Error de conexión');
+        });
+    }
+}
+
+// Función para mostrar las notificaciones en pantalla
+function mostrarNotificaciones(notificaciones) {
+    const contenedor = document.getElementById('notificacionesRecepcion');
+
+    if (notificaciones.length === 0) {
+        contenedor.innerHTML = `
+            <div style="text-align: center; padding: 20px; color: #6c757d;">
+                <div style="font-size: 48px; margin-bottom: 10px;">😴</div>
+                <p>No hay notificaciones</p>
+                <p style="font-size: 12px;">Los doctores aparecerán aquí cuando te necesiten</p>
+            </div>
+        `;
+        return;
+    }
+
+    contenedor.innerHTML = notificaciones.map(notif => `
+        <div class="notificacion-item"
+            style="background: ${notif.leida ? '#f8f9fa' : '#fff3cd'};
+                    border-left: 4px solid ${notif.leida ? '#6c757d' : '#ffc107'};
+                    padding: 12px;
+                    margin: 8px 0;
+                    border-radius: 5px;
+                    position: relative;">
+
+            <button onclick="eliminarNotificacionIndividual(${notif.id}, '${notif.doctor_nombre}')"
+                    style="position: absolute; top: 8px; right: 8px;
+                        background: #dc3545; color: white; border: none;
+                        border-radius: 3px; padding: 2px 6px; font-size: 10px;
+                        cursor: pointer;">
+                ❌
+            </button>
+
+            <div style="display: flex; justify-content: space-between; align-items: flex-start; margin-right: 25px;">
+                <div style="flex: 1;">
+                    <strong>👨‍⚕️ ${notif.doctor_nombre}</strong>
+                    ${notif.consultorio ? `<br><small>Consultorio: ${notif.consultorio}</small>` : ''}
+                    <div style="margin-top: 8px; color: #495057;">${notif.mensaje}</div>
+                </div>
+                ${!notif.leida ? '<span style="color: #ffc107; font-size: 20px;">🔔</span>' : ''}
+            </div>
+
+            <div style="text-align: right; margin-top: 8px;">
+                <small style="color: #6c757d;">
+                    ${new Date(notif.timestamp).toLocaleTimeString()} -
+                    ${new Date(notif.timestamp).toLocaleDateString()}
+                </small>
+            </div>
+        </div>
+    `).join('');
+}
+
+// Función para cargar notificaciones desde el servidor
+function cargarNotificaciones() {
+    return Sondeo.refrescar('notificaciones');
+}
+
+// Función para actualizar el contador de notificaciones
+function actualizarBadgeNotificaciones(cantidad) {
+    const badge = document.getElementById('badgeNotificaciones');
+    if (cantidad > 0) {
+        badge.textContent = cantidad;
+        badge.style.display = 'inline-block';
+        document.title = `(${cantidad}) Sistema de Turnos - Recepción`;
+    } else {
+        badge.style.display = 'none';
+        document.title = 'Sistema de Turnos - Recepción';
+    }
+}
+
+// Función para mostrar notificaciones flotantes
+function mostrarNotificacion(mensaje, tipo = 'info') {
+    const tipos = {
+        'info': { color: '#17a2b8', icon: 'ℹ️' },
+        'success': { color: '#28a745', icon: '✅' },
+        'warning': { color: '#ffc107', icon: '⚠️' },
+        'error': { color: '#dc3545', icon: '❌' }
+    };
+
+    const config = tipos[tipo] || tipos['info'];
+
+    const notificacion = document.createElement('div');
+    notificacion.style.cssText = `
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        background: ${config.color};
+        color: white;
+        padding: 15px 20px;
+        border-radius: 5px;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.3);
+        z-index: 10000;
+        max-width: 300px;
+        animation: slideIn 0.3s ease-out;
+    `;
+
+    notificacion.innerHTML = `<strong>${config.icon} ${mensaje}</strong>`;
+    document.body.appendChild(notificacion);
+
+    setTimeout(() => {
+        notificacion.style.animation = 'slideOut 0.3s ease-in';
+        setTimeout(() => {
+            if (notificacion.parentNode) {
+                notificacion.parentNode.removeChild(notificacion);
+            }
+        }, 300);
+    }, 3000);
+}
+
+// Función para buscar turnos
+function buscarTurno() {
+    const termino = document.getElementById('buscarTurno').value.trim();
+    if (!termino) {
+        alert('Ingresa un número de turno o nombre de paciente');
+        return;
+    }
+
+    Sondeo.json('/api/turnos')
+        .then(turnos => {
+            const resultados = turnos.filter(turno =>
+                turno.numero.includes(termino.toUpperCase()) ||
+                turno.paciente_nombre.toLowerCase().includes(termino.toLowerCase())
+            );
+
+            if (resultados.length === 0) {
+                alert('No se encontraron turnos');
+                return;
+            }
+
+            const lista = document.getElementById('listaTurnos');
+            lista.innerHTML = resultados.map(turno => `
+                <div class="turno-card">
+                    <div class="turno-header">Turno ${turno.numero}</div>
+                    <div class="turno-info">Paciente: ${turno.paciente_nombre}</div>
+                    <div class="turno-info">Edad: ${turno.paciente_edad} años</div>
+                    <div class="turno-info">Tipo: ${turno.tipo === 'CITA' ? 'Con Cita' : 'Sin Cita'}</div>
+                    <div class="turno-info">Estación: ${turno.estacion_actual_nombre || 'Recepción'}</div>
+                    <div class="turno-info">Estado: ${turno.estado}</div>
+                    ${turno.doctor_nombre ? `<div class="turno-info">Doctor: ${turno.doctor_nombre}</div>` : ''}
+
+                    <div class="turno-acciones">
+                        <button onclick="editarTurno(${turno.id})">✏️ Editar</button>
+                        <button onclick="cancelarTurno(${turno.id})">❌ Cancelar</button>
+                    </div>
+                </div>
+            `).join('');
+        })
+        .catch(error => {
+            console.error('Error buscando turnos:', error);
+            alert('Error al buscar turnos');
+        });
+}
+
+// Inicializar el sistema: cada recurso se consulta una sola vez cada 5 seg.
+document.addEventListener('DOMContentLoaded', function() {
+    mostrarOpcionesEspecificas();
+
+    Sondeo.registrar('turnos', {
+        url: '/api/turnos',
+        intervalo: 5000,
+        alRecibir: mostrarTurnos,
+        alError: () => {
+            document.getElementById('listaTurnos').innerHTML = '<p>Error al cargar los turnos</p>';
+        }
+    });
+
+    Sondeo.registrar('citas', {
+        url: '/api/citas',
+        intervalo: 30000,
+        soloCambios: true,
+        alRecibir: mostrarCitas,
+        alError: () => {
+            document.getElementById('listaCitas').innerHTML = '<p>Error al cargar las citas</p>';
+        }
+    });
+
+    // Solo se redibuja si cambió, para no perder la selección del formulario
+    Sondeo.registrar('doctores', {
+        url: '/api/doctores',
+        intervalo: 5000,
+        soloCambios: true,
+        alRecibir: mostrarDoctoresActivos,
+        alError: () => {
+            const selector = document.getElementById('doctor_asignado');
+            selector.innerHTML = '<option value="">Error al cargar doctores</option>';
+        }
+    });
+
+    Sondeo.registrar('visorDoctores', {
+        url: '/api/doctores/todos',
+        intervalo: 5000,
+        alRecibir: mostrarVisorDoctores,
+        alError: () => {
+            document.getElementById('visorDoctores').innerHTML = '<p>Error al cargar estado de doctores</p>';
+        }
+    });
+
+    Sondeo.registrar('notificaciones', {
+        url: '/api/recepcion/notificaciones',
+        intervalo: 5000,
+        alRecibir: data => {
+            if (data.success) {
+                mostrarNotificaciones(data.notificaciones);
+                actualizarBadgeNotificaciones(data.total_no_leidas);
+            }
+        }
+    });
+});
@@ -0,0 +1,189 @@
+// sondeo.js
+// Coordinador de las actualizaciones periódicas de las pantallas del turnero.
+//
+// - Cada recurso se registra una sola vez por nombre; registrar de nuevo
+//   reemplaza la tarea anterior en lugar de sumar otro intervalo.
+// - Las peticiones iguales que coinciden en el tiempo comparten un solo fetch;
+//   refrescar() no se suma a uno que salió antes de la escritura, espera otro.
+// - Con la pestaña oculta o sin cambios en los datos el intervalo se alarga.
+// - Las pestañas del mismo equipo se reparten el trabajo con BroadcastChannel:
+//   la que consulta publica la respuesta y las demás la usan en lugar de pedirla.
+(function () {
+    const FACTOR_OCULTA = 6;          // pestaña en segundo plano
+    const FACTOR_SIN_CAMBIOS = 1.5;   // cada respuesta idéntica alarga el intervalo
+    const MAX_FACTOR_SIN_CAMBIOS = 3;
+    const INTERVALO_MAXIMO = 60000;   // ms
+    const DESFASE = 0.1;              // fracción aleatoria para que las pestañas no coincidan
+
+    const tareas = {};
+    const enCurso = {};
+    const canal = 'BroadcastChannel' in window ? new BroadcastChannel('turnero-sondeo') : null;
+
+    // Un solo fetch por URL mientras haya uno pendiente. Con fresco, el
+    // pendiente pudo salir antes de una escritura y traer datos viejos: se
+    // pide otro cuando termine, compartido por los refrescos que lleguen mientras
+    function obtener(url, fresco) {
+        const pendiente = enCurso[url];
+        if (pendiente && fresco) {
+            if (!pendiente.siguiente) {
+                pendiente.siguiente = pendiente.promesa.catch(() => null).then(() => obtener(url));
+            }
+            return pendiente.siguiente;
+        }
+        if (!pendiente) {
+            const nuevo = { promesa: null, siguiente: null };
+            nuevo.promesa = fetch(url)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status} en ${url}`);
+                    }
+                    return response.text();
+                })
+                .finally(() => {
+                    if (enCurso[url] === nuevo) {
+                        delete enCurso[url];
+                    }
+                });
+            enCurso[url] = nuevo;
+        }
+        return enCurso[url].promesa;
+    }
+
+    function json(url) {
+        return obtener(url).then(texto => JSON.parse(texto));
+    }
+
+    function urlDe(tarea) {
+        return typeof tarea.url === 'function' ? tarea.url() : tarea.url;
+    }
+
+    function programar(tarea) {
+        clearTimeout(tarea.temporizador);
+        let espera = tarea.intervalo * tarea.factor;
+        if (document.hidden) {
+            espera *= FACTOR_OCULTA;
+        }
+        espera = Math.min(espera, Math.max(INTERVALO_MAXIMO, tarea.intervalo));
+        espera += Math.random() * tarea.intervalo * DESFASE;
+        tarea.temporizador = setTimeout(() => ejecutar(tarea), espera);
+    }
+
+    function entregar(tarea, texto) {
+        const cambio = texto !== tarea.ultimoTexto;
+        tarea.factor = cambio ? 1 : Math.min(tarea.factor * FACTOR_SIN_CAMBIOS, MAX_FACTOR_SIN_CAMBIOS);
+        tarea.ultimoTexto = texto;
+        tarea.ultimaVez = Date.now();
+        if (cambio || !tarea.soloCambios) {
+            try {
+                tarea.alRecibir(JSON.parse(texto));
+            } catch (error) {
+                console.error(`Error procesando ${tarea.nombre}:`, error);
+            }
+        }
+        programar(tarea);
+    }
+
+    // Entrega una respuesta a todas las tareas locales que consultan esa URL
+    function distribuir(url, texto) {
+        Object.values(tareas).forEach(tarea => {
+            if (urlDe(tarea) === url) {
+                entregar(tarea, texto);
+            }
+        });
+    }
+
+    function ejecutar(tarea, fresco) {
+        const url = urlDe(tarea);
+        if (!url) {
+            programar(tarea);
+            return Promise.resolve();
+        }
+
+        return obtener(url, fresco)
+            .then(texto => {
+                if (canal) {
+                    canal.postMessage({ url: url, texto: texto });
+                }
+                distribuir(url, texto);
+            })
+            .catch(error => {
+                console.error(`Error cargando ${tarea.nombre}:`, error);
+                // alError suele reemplazar lo que se mostraba: la próxima
+                // respuesta se dibuja aunque sea igual a la de antes del error
+                tarea.ultimoTexto = null;
+                if (tarea.alError) {
+                    tarea.alError(error);
+                }
+                programar(tarea);
+            });
+    }
+
+    function registrar(nombre, opciones) {
+        detener(nombre);
+        const tarea = {
+            nombre: nombre,
+            url: opciones.url,
+            intervalo: opciones.intervalo || 5000,
+            alRecibir: opciones.alRecibir,
+            alError: opciones.alError,
+            soloCambios: !!opciones.soloCambios,
+            factor: 1,
+            ultimoTexto: null,
+            ultimaVez: 0,
+            temporizador: null
+        };
+        tareas[nombre] = tarea;
+        if (opciones.inmediato === false) {
+            programar(tarea);
+            return Promise.resolve();
+        }
+        return ejecutar(tarea);
+    }
+
+    // Pide los datos ya, por ejemplo después de que el usuario modificó algo
+    function refrescar(nombre) {
+        const nombres = nombre ? [nombre] : Object.keys(tareas);
+        return Promise.all(nombres
+            .filter(n => tareas[n])
+            .map(n => {
+                tareas[n].factor = 1;
+                return ejecutar(tareas[n], true);
+            }));
+    }
+
+    function detener(nombre) {
+        if (tareas[nombre]) {
+            clearTimeout(tareas[nombre].temporizador);
+            delete tareas[nombre];
+        }
+    }
+
+    if (canal) {
+        canal.onmessage = evento => {
+            const datos = evento.data || {};
+            if (datos.url && typeof datos.texto === 'string') {
+                distribuir(datos.url, datos.texto);
+            }
+        };
+    }
+
+    // Al volver a la pestaña se actualiza lo que haya quedado viejo
+    document.addEventListener('visibilitychange', () => {
+        Object.values(tareas).forEach(tarea => {
+            if (!document.hidden && Date.now() - tarea.ultimaVez >= tarea.intervalo) {
+                tarea.factor = 1;
+                ejecutar(tarea);
+            } else {
+                programar(tarea);
+            }
+        });
+    });
+
+    window.Sondeo = {
+        registrar: registrar,
+        refrescar: refrescar,
+        detener: detener,
+        obtener: obtener,
+        json: json
+    };
+})();
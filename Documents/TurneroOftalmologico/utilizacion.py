@@ -0,0 +1,273 @@
+# utilizacion.py
+import almacen
+import argparse
+import reloj
+from datetime import datetime, timedelta
+from estadisticas import EVENTOS
+
+# Categorías de la línea de tiempo de cada consultorio
+OCUPADO = 'OCUPADO'
+LIBRE = 'LIBRE'
+AUSENTE = 'AUSENTE'
+SIN_DATOS = 'SIN_DATOS'  # antes del primer evento registrado del doctor
+
+FORMATO = '%Y-%m-%d %H:%M:%S'
+
+def get_db_connection():
+    return almacen.conectar()
+
+def registrar_estado_doctor(conn, doctor_id, estado):
+    """Guarda un cambio de estado del doctor en la transacción de quien llama"""
+    conn.execute('INSERT INTO eventos_doctor (doctor_id, estado) VALUES (?, ?)', (doctor_id, estado))
+
+def _momento(texto):
+    return datetime.strptime(texto[:19], FORMATO)
+
+def _categoria(estado, consultas):
+    if consultas > 0 or estado == 'EN_CONSULTA':
+        return OCUPADO
+    if estado is None:
+        return SIN_DATOS
+    if estado == 'AUSENTE':
+        return AUSENTE
+    return LIBRE
+
+def calcular_utilizacion_dia(conn, fecha, ahora=None):
+    """Línea de tiempo ocupado/libre/ausente de cada doctor en un día de la clínica.
+
+    Une los cambios de estado de eventos_doctor con los tramos
+    EN_ATENCION -> FINALIZADO de turnos en una sola pasada ordenada. El fin
+    de cada consulta es el evento FINALIZADO del historial (tiempo_total va
+    en minutos truncados y queda solo para turnos sin ese evento); cada
+    tramo se recorta al día y la consulta cuenta en el día en que empezó.
+    Los timestamps se guardan con CURRENT_TIMESTAMP, así que los límites
+    del día y "ahora" se pasan a UTC (ver reloj.limites_utc); la línea de
+    tiempo devuelta está en la hora de la clínica. El tiempo anterior al
+    primer evento del doctor queda como SIN_DATOS, no como ausente.
+    """
+    ahora = ahora or reloj.ahora_utc()
+    inicio, fin = reloj.limites_utc(fecha)
+    fin = min(fin, ahora)
+    if fin <= inicio:
+        return []
+
+    desde_txt = inicio.strftime(FORMATO)
+    hasta_txt = fin.strftime(FORMATO)
+
+    # (doctor_id, momento, orden, tipo, valor); el orden resuelve empates en el mismo instante
+    marcas = []
+    nombres = {}
+
+    # Estado vigente de cada doctor al comenzar el día
+    for fila in conn.execute('''
+        SELECT d.id, d.nombre,
+               (SELECT e.estado FROM eventos_doctor e
+                WHERE e.doctor_id = d.id AND e.timestamp < ?
+                ORDER BY e.timestamp DESC, e.id DESC LIMIT 1) as estado
+        FROM doctores d
+    ''', (desde_txt,)):
+        nombres[fila['id']] = fila['nombre']
+        marcas.append((fila['id'], inicio, 0, 'estado', fila['estado']))
+
+    for fila in conn.execute('''
+        SELECT doctor_id, estado, timestamp FROM eventos_doctor
+        WHERE timestamp >= ? AND timestamp < ?
+        ORDER BY timestamp, id
+    ''', (desde_txt, hasta_txt)):
+        marcas.append((fila['doctor_id'], _momento(fila['timestamp']), 2, 'estado', fila['estado']))
+
+    # Tramos de consulta; ninguna consulta dura más de un día
+    consultas = {}
+    for fila in conn.execute('''
+        SELECT t.doctor_asignado, t.estado, t.timestamp_atencion, t.tiempo_total,
+               (SELECT MIN(h.timestamp) FROM historial_turnos h
+                WHERE h.turno_id = t.id AND h.evento = ? AND h.timestamp >= t.timestamp_atencion) as timestamp_fin
+        FROM turnos t
+        WHERE t.timestamp_atencion >= ? AND t.timestamp_atencion < ?
+          AND t.doctor_asignado IS NOT NULL AND t.estado IN ('EN_ATENCION', 'FINALIZADO')
+    ''', (EVENTOS['FINALIZADO'], (inicio - timedelta(days=1)).strftime(FORMATO), hasta_txt)):
+        comienzo = _momento(fila['timestamp_atencion'])
+        if comienzo >= inicio:
+            consultas[fila['doctor_asignado']] = consultas.get(fila['doctor_asignado'], 0) + 1
+        if fila['estado'] == 'EN_ATENCION':
+            termino = ahora
+        elif fila['timestamp_fin']:
+            termino = _momento(fila['timestamp_fin'])
+        else:
+            termino = comienzo + timedelta(minutes=fila['tiempo_total'] or 0)
+        comienzo, termino = max(comienzo, inicio), min(termino, fin)
+        if termino > comienzo:
+            marcas.append((fila['doctor_asignado'], comienzo, 1, 'consulta', 1))
+            marcas.append((fila['doctor_asignado'], termino, 1, 'consulta', -1))
+
+    marcas.sort(key=lambda m: (m[0], m[1], m[2]))
+
+    resultado = []
+    linea = None
+
+    def cerrar_tramo(hasta):
+        if hasta <= linea['_desde']:
+            return
+        categoria = _categoria(linea['_estado'], linea['_consultas'])
+        linea[f'segundos_{categoria.lower()}'] += int((hasta - linea['_desde']).total_seconds())
+        tramos = linea['linea_tiempo']
+        if tramos and tramos[-1]['estado'] == categoria and tramos[-1]['fin'] == linea['_desde'].strftime(FORMATO):
+            tramos[-1]['fin'] = hasta.strftime(FORMATO)
+        else:
+            tramos.append({'inicio': linea['_desde'].strftime(FORMATO), 'fin': hasta.strftime(FORMATO),
+                           'estado': categoria})
+        linea['_desde'] = hasta
+
+    for doctor_id, momento, _, tipo, valor in marcas:
+        if linea is None or linea['doctor_id'] != doctor_id:
+            if linea is not None:
+                cerrar_tramo(fin)
+            linea = {
+                'doctor_id': doctor_id,
+                'doctor_nombre': nombres.get(doctor_id),
+                'segundos_ocupado': 0,
+                'segundos_libre': 0,
+                'segundos_ausente': 0,
+                'segundos_sin_datos': 0,
+                'consultas': 0,
+                'linea_tiempo': [],
+                '_desde': inicio,
+                '_estado': None,
+                '_consultas': 0
+            }
+            resultado.append(linea)
+
+        cerrar_tramo(momento)
+        if tipo == 'estado':
+            linea['_estado'] = valor
+        else:
+            linea['_consultas'] += valor
+
+    if linea is not None:
+        cerrar_tramo(fin)
+
+    for linea in resultado:
+        for clave in ('_desde', '_estado', '_consultas'):
+            del linea[clave]
+        linea['consultas'] = consultas.get(linea['doctor_id'], 0)
+        for tramo in linea['linea_tiempo']:
+            tramo['inicio'] = reloj.a_local(_momento(tramo['inicio'])).strftime(FORMATO)
+            tramo['fin'] = reloj.a_local(_momento(tramo['fin'])).strftime(FORMATO)
+        linea['utilizacion'] = _porcentaje(linea)
+    return resultado
+
+def _porcentaje(totales):
+    """Porcentaje del tiempo presente (ocupado + libre) que el doctor estuvo ocupado"""
+    presente = totales['segundos_ocupado'] + totales['segundos_libre']
+    return (totales['segundos_ocupado'] / presente * 100) if presente > 0 else 0
+
+def guardar_utilizacion_dia(conn, fecha, lineas):
+    """Guarda un día cerrado y lo marca como calculado en dias_utilizacion.
+
+    El tiempo SIN_DATOS no se guarda (ni como ausente); un doctor sin ningún
+    dato en el día no deja fila, pero el día queda marcado aunque no tenga
+    filas, así precalcular_utilizacion no lo vuelve a calcular.
+    """
+    lineas = [l for l in lineas if l['segundos_ocupado'] or l['segundos_libre'] or l['segundos_ausente']]
+    conn.execute('DELETE FROM utilizacion_diaria WHERE fecha = ?', (fecha,))
+    conn.execute('INSERT OR REPLACE INTO dias_utilizacion (fecha) VALUES (?)', (fecha,))
+    conn.executemany('''
+        INSERT OR REPLACE INTO utilizacion_diaria
+            (fecha, doctor_id, segundos_ocupado, segundos_libre, segundos_ausente, consultas)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(fecha, l['doctor_id'], l['segundos_ocupado'], l['segundos_libre'],
+           l['segundos_ausente'], l['consultas']) for l in lineas])
+
+def obtener_utilizacion_dia(fecha=None):
+    """Utilización por doctor de un día, con su línea de tiempo"""
+    hoy = reloj.hoy()
+    fecha = fecha or hoy
+
+    conn = get_db_connection()
+    lineas = calcular_utilizacion_dia(conn, fecha)
+    if fecha < hoy:
+        guardar_utilizacion_dia(conn, fecha, lineas)
+        conn.commit()
+    conn.close()
+
+    return {'fecha': fecha, 'doctores': lineas}
+
+def precalcular_utilizacion(conn, desde, hasta):
+    """Calcula y guarda los días cerrados en [desde, hasta] que aún no están guardados"""
+    hoy = reloj.hoy()
+    calculados = {fila['fecha'] for fila in conn.execute(
+        'SELECT fecha FROM dias_utilizacion WHERE fecha BETWEEN ? AND ?', (desde, hasta))}
+
+    dia = datetime.strptime(desde, '%Y-%m-%d')
+    nuevos = 0
+    while dia.strftime('%Y-%m-%d') <= hasta:
+        fecha = dia.strftime('%Y-%m-%d')
+        if fecha < hoy and fecha not in calculados:
+            guardar_utilizacion_dia(conn, fecha, calcular_utilizacion_dia(conn, fecha))
+            nuevos += 1
+        dia += timedelta(days=1)
+    conn.commit()
+    return nuevos
+
+def obtener_utilizacion_mensual(mes=None, año=None):
+    """Utilización por doctor y por día de un mes, a partir de los días precalculados"""
+    ahora = reloj.ahora()
+    mes = mes or ahora.month
+    año = año or ahora.year
+    hoy = ahora.strftime('%Y-%m-%d')
+
+    primero = datetime(año, mes, 1)
+    ultimo = (primero + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    desde = primero.strftime('%Y-%m-%d')
+    hasta = min(ultimo.strftime('%Y-%m-%d'), hoy)
+
+    conn = get_db_connection()
+    filas = []
+    if desde <= hasta:
+        precalcular_utilizacion(conn, desde, hasta)
+        filas = [dict(f) for f in conn.execute('''
+            SELECT u.*, d.nombre as doctor_nombre
+            FROM utilizacion_diaria u
+            LEFT JOIN doctores d ON u.doctor_id = d.id
+            WHERE u.fecha BETWEEN ? AND ?
+            ORDER BY u.fecha
+        ''', (desde, hasta))]
+        if hasta == hoy:
+            filas.extend(dict(l, fecha=hoy) for l in calcular_utilizacion_dia(conn, hoy))
+    conn.close()
+
+    campos = ('segundos_ocupado', 'segundos_libre', 'segundos_ausente', 'consultas')
+    por_doctor = {}
+    por_dia = {}
+    for fila in filas:
+        doctor = por_doctor.setdefault(fila['doctor_id'], dict(
+            {c: 0 for c in campos}, doctor_id=fila['doctor_id'], doctor_nombre=fila['doctor_nombre']))
+        dia = por_dia.setdefault(fila['fecha'], dict({c: 0 for c in campos}, fecha=fila['fecha']))
+        for campo in campos:
+            doctor[campo] += fila[campo]
+            dia[campo] += fila[campo]
+
+    for totales in list(por_doctor.values()) + list(por_dia.values()):
+        totales['utilizacion'] = _porcentaje(totales)
+
+    return {
+        'mes': f'{año}-{mes:02d}',
+        'doctores': sorted(por_doctor.values(), key=lambda d: d['doctor_id']),
+        'dias': [por_dia[f] for f in sorted(por_dia)]
+    }
+
+if __name__ == '__main__':
+    # Precalcula los días cerrados: python utilizacion.py [AAAA-MM-DD desde] [AAAA-MM-DD hasta] [--sede id]
+    ayer = (reloj.ahora() - timedelta(days=1)).strftime('%Y-%m-%d')
+    parser = argparse.ArgumentParser(description='Precalcula la utilización de los días cerrados')
+    parser.add_argument('desde', nargs='?', default=ayer)
+    parser.add_argument('hasta', nargs='?', default=None)
+    almacen.agregar_opcion_sede(parser)
+    args = parser.parse_args()
+    almacen.usar_sede_de_argumentos(parser, args)
+    desde = args.desde
+    hasta = args.hasta or (ayer if desde == ayer else desde)
+    conn = get_db_connection()
+    nuevos = precalcular_utilizacion(conn, desde, hasta)
+    conn.close()
+    print(f"✅ {nuevos} días de utilización precalculados entre {desde} y {hasta}")
@@ -1,36 +1,30 @@
 # ver_bd.py
+import argparse
 import sqlite3
-from datetime import datetime
+import almacen
+import repositorio
 
 def ver_base_datos():
     try:
-        conn = sqlite3.connect('turnos.db')
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        conn = almacen.conectar()
         
         print("=" * 50)
         print("📊 VISOR DE BASE DE DATOS - TURNERO OFTALMOLÓGICO")
         print("=" * 50)
         
         # Ver todas las tablas
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tablas = cursor.fetchall()
-        
-        for tabla in tablas:
-            nombre_tabla = tabla['name']
+        for nombre_tabla in repositorio.nombres_de_tablas(conn):
             print(f"\n🎯 TABLA: {nombre_tabla.upper()}")
             print("-" * 30)
             
             # Ver contenido de cada tabla
-            cursor.execute(f"SELECT * FROM {nombre_tabla}")
-            filas = cursor.fetchall()
+            columnas, filas = repositorio.filas_de_tabla(conn, nombre_tabla)
             
             if not filas:
                 print("   (vacía)")
                 continue
                 
             # Mostrar columnas
-            columnas = [desc[0] for desc in cursor.description]
             print(f"   Columnas: {', '.join(columnas)}")
             
             # Mostrar datos
@@ -46,4 +40,6 @@ def ver_base_datos():
         print("💡 Sugerencia: ¿Tienes Flask ejecutándose? Detenlo con Ctrl+C")
 
 if __name__ == '__main__':
-    ver_base_datos()
\ No newline at end of file
+    parser = almacen.agregar_opcion_sede(argparse.ArgumentParser(description='Muestra todas las tablas'))
+    almacen.usar_sede_de_argumentos(parser, parser.parse_args())
+    ver_base_datos()
@@ -1,21 +1,23 @@
 # ver_estaciones.py
-import sqlite3
+import argparse
+import almacen
+import repositorio
 
 def ver_estaciones():
-    conn = sqlite3.connect('turnos.db')
-    cursor = conn.cursor()
+    conn = almacen.conectar()
     
     print("📋 ESTACIONES EN LA BASE DE DATOS:")
     print("ID | Nombre")
     print("-" * 40)
     
-    cursor.execute("SELECT id, nombre FROM estaciones ORDER BY id")
-    estaciones = cursor.fetchall()
+    estaciones = repositorio.todas_las_estaciones(conn)
     
     for estacion in estaciones:
-        print(f"{estacion[0]:2} | {estacion[1]}")
+        print(f"{estacion['id']:2} | {estacion['nombre']}")
     
     conn.close()
 
 if __name__ == '__main__':
-    ver_estaciones()
\ No newline at end of file
+    parser = almacen.agregar_opcion_sede(argparse.ArgumentParser(description='Muestra las estaciones'))
+    almacen.usar_sede_de_argumentos(parser, parser.parse_args())
+    ver_estaciones()